@@ -0,0 +1,299 @@
+"""
+Batch render client.
+
+Submits many render jobs to the RunPod endpoint at once and saves each video
+as soon as its job finishes:
+
+    python batch_render.py renders.json --concurrency 4 --out-dir renders/
+
+The manifest is a JSON list of render specs (or {"jobs": [...]}). Each spec
+overrides the defaults from render.py's CONFIG and may name its output file:
+
+    [
+        {"template": "ai_cpu_activation", "duration": 4, "output": "short.mp4"},
+        {"template": "ai_cpu_activation", "samples": 256, "output": "final.mp4"}
+    ]
+
+At most --concurrency jobs are in flight; HTTP calls share one pooled session.
+Status is polled with exponential backoff and jitter (reset whenever the job
+changes state). With --webhook-url the endpoint also POSTs the result to a
+small receiver started on --webhook-port, so finished jobs are picked up
+without waiting for the next poll.
+
+Also usable from code:
+
+    results = asyncio.run(BatchClient(concurrency=8).render_all(specs, "renders"))
+
+Point RUNPOD_BASE_URL at a local stand-in (e.g. `python handler.py --rp_serve_api`)
+to try it without the real endpoint.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from render import BASE_URL, CONFIG, HEADERS, build_payload, format_progress, save_video
+
+TERMINAL_STATUSES = ("COMPLETED", "FAILED", "CANCELLED", "TIMED_OUT")
+
+
+def spec_payload(spec: dict) -> dict:
+    """Job payload for a render spec: CONFIG defaults overridden by the spec."""
+    payload = build_payload()
+    job_input = payload["input"]
+    overrides = {k: v for k, v in spec.items() if k != "output"}
+    if "template_url" in overrides:
+        job_input.pop("template", None)
+    elif "template" in overrides:
+        job_input.pop("template_url", None)
+    job_input.update(overrides)
+    return payload
+
+
+def load_manifest(path: str) -> list:
+    with open(path) as f:
+        manifest = json.load(f)
+    specs = manifest["jobs"] if isinstance(manifest, dict) else manifest
+    if not isinstance(specs, list) or not all(isinstance(s, dict) for s in specs):
+        raise ValueError("Manifest must be a list of render specs or {\"jobs\": [...]}")
+    return specs
+
+
+# =============================================================================
+# Webhook receiver
+# =============================================================================
+class WebhookReceiver:
+    """Minimal HTTP server that resolves a future per job when RunPod POSTs its result."""
+
+    def __init__(self, port: int):
+        self.port = port
+        self.server = None
+        self.waiters = {}
+
+    def waiter(self, job_id: str) -> asyncio.Future:
+        if job_id not in self.waiters:
+            self.waiters[job_id] = asyncio.get_running_loop().create_future()
+        return self.waiters[job_id]
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "0.0.0.0", self.port)
+        print(f"Webhook receiver listening on port {self.port}")
+
+    async def stop(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            await reader.readline()  # request line
+            length = 0
+            while True:
+                header = (await reader.readline()).decode("latin-1").strip()
+                if not header:
+                    break
+                name, _, value = header.partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            status_data = json.loads(await reader.readexactly(length)) if length else {}
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            print(f"Ignoring bad webhook request: {e}")
+            status_data = {}
+        finally:
+            writer.close()
+
+        job_id = status_data.get("id")
+        if job_id and status_data.get("status") in TERMINAL_STATUSES:
+            future = self.waiter(job_id)
+            if not future.done():
+                future.set_result(status_data)
+
+
+# =============================================================================
+# Client
+# =============================================================================
+class BatchClient:
+    """Async RunPod client that runs many render jobs with a bounded number in flight."""
+
+    def __init__(self, base_url: str = BASE_URL, concurrency: int = 4, poll_min: float = 1.0,
+                 poll_max: float = 15.0, timeout: float = CONFIG["timeout"], webhook_url: str = None,
+                 webhook_port: int = None):
+        """
+        Args:
+            base_url: Endpoint base URL (…/v2/<endpoint id> or a local stand-in)
+            concurrency: Maximum jobs submitted but not yet saved
+            poll_min: First status poll delay in seconds
+            poll_max: Longest delay between polls
+            timeout: Seconds before a job is cancelled
+            webhook_url: Public URL RunPod should POST results to (optional)
+            webhook_port: Local port the webhook receiver listens on
+        """
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.poll_min = poll_min
+        self.poll_max = poll_max
+        self.timeout = timeout
+        self.webhook_url = webhook_url
+        self.webhook = WebhookReceiver(webhook_port) if webhook_url and webhook_port else None
+
+        # One keep-alive connection pool shared by every request thread
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(concurrency * 2, 10))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    async def _call(self, method: str, path: str, **kwargs) -> dict:
+        def call():
+            response = self.session.request(method, f"{self.base_url}{path}", timeout=60, **kwargs)
+            response.raise_for_status()
+            return response.json()
+        return await asyncio.to_thread(call)
+
+    async def submit(self, spec: dict) -> str:
+        payload = spec_payload(spec)
+        if self.webhook_url:
+            payload["webhook"] = self.webhook_url
+        job = await self._call("POST", "/run", json=payload)
+        if not job.get("id"):
+            raise RuntimeError(f"No job ID in /run response: {job}")
+        return job["id"]
+
+    async def cancel(self, job_id: str):
+        try:
+            await self._call("POST", f"/cancel/{job_id}")
+        except requests.RequestException as e:
+            print(f"Cancel failed for {job_id}: {e}")
+
+    async def wait(self, job_id: str, label: str = "") -> dict:
+        """Poll until the job reaches a terminal status. Returns the final status payload."""
+        start_time = time.time()
+        delay = self.poll_min
+        last_status = None
+        webhook = self.webhook.waiter(job_id) if self.webhook else None
+
+        while True:
+            status_data = await self._call("GET", f"/status/{job_id}")
+            status = status_data.get("status")
+            if status in TERMINAL_STATUSES:
+                return status_data
+
+            progress = format_progress(status_data)
+            if status != last_status or progress:
+                print(f"[{int(time.time() - start_time)}s] {label}{status}" + (f" ({progress})" if progress else ""))
+            if status != last_status:
+                # New phase (e.g. queued -> running): look again soon
+                delay = self.poll_min
+                last_status = status
+
+            if time.time() - start_time > self.timeout:
+                await self.cancel(job_id)
+                return {"id": job_id, "status": "TIMED_OUT", "error": f"Job exceeded {self.timeout}s limit"}
+
+            sleep = delay * random.uniform(0.8, 1.2)
+            delay = min(delay * 1.5, self.poll_max)
+            if webhook:
+                try:
+                    return await asyncio.wait_for(asyncio.shield(webhook), sleep)
+                except asyncio.TimeoutError:
+                    continue
+            await asyncio.sleep(sleep)
+
+    async def render(self, spec: dict, output_path: str, semaphore: asyncio.Semaphore = None) -> dict:
+        """Submit one spec, wait for it and save the video. Never raises; errors are in the result."""
+        result = {"spec": spec, "output_path": output_path, "job_id": None, "status": None, "error": None}
+        start_time = time.time()
+        async with semaphore or asyncio.Semaphore(1):
+            try:
+                result["job_id"] = await self.submit(spec)
+                label = f"{os.path.basename(output_path)} {result['job_id']}: "
+                print(f"Submitted {label.rstrip(': ')}")
+                status_data = await self.wait(result["job_id"], label)
+                result["status"] = status_data.get("status")
+                output = status_data.get("output") or {}
+                if result["status"] != "COMPLETED":
+                    result["error"] = status_data.get("error") or result["status"]
+                elif not await asyncio.to_thread(save_video, output, output_path, self.session):
+                    result["error"] = "Job returned no video"
+                else:
+                    result["render_time_seconds"] = output.get("render_time_seconds")
+            except Exception as e:
+                result["error"] = str(e)
+        result["wall_seconds"] = round(time.time() - start_time, 1)
+        return result
+
+    async def render_all(self, specs: list, out_dir: str = ".") -> list:
+        """Render every spec; results are returned in spec order and reported as they finish."""
+        os.makedirs(out_dir, exist_ok=True)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if self.webhook:
+            await self.webhook.start()
+        try:
+            tasks = [
+                asyncio.create_task(self.render(
+                    spec, os.path.join(out_dir, spec.get("output") or f"render_{i:03d}.mp4"), semaphore
+                ))
+                for i, spec in enumerate(specs)
+            ]
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                if result["error"]:
+                    print(f"FAILED {result['output_path']}: {result['error']}")
+                else:
+                    print(f"Saved {result['output_path']} (render {result['render_time_seconds']}s, "
+                          f"wall {result['wall_seconds']}s)")
+            return [task.result() for task in tasks]
+        finally:
+            if self.webhook:
+                await self.webhook.stop()
+            self.session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a batch of jobs on the RunPod endpoint")
+    parser.add_argument("manifest", help="JSON list of render specs")
+    parser.add_argument("--out-dir", default="renders", help="Directory for the rendered videos")
+    parser.add_argument("--concurrency", type=int, default=4, help="Maximum jobs in flight")
+    parser.add_argument("--poll-min", type=float, default=1.0, help="First poll delay (seconds)")
+    parser.add_argument("--poll-max", type=float, default=15.0, help="Longest poll delay (seconds)")
+    parser.add_argument("--timeout", type=float, default=CONFIG["timeout"], help="Per-job timeout (seconds)")
+    parser.add_argument("--webhook-url", help="Public URL RunPod should POST results to")
+    parser.add_argument("--webhook-port", type=int, default=8080, help="Local port for the webhook receiver")
+    parser.add_argument("--summary", help="Write per-job results as JSON to this file")
+    args = parser.parse_args()
+
+    specs = load_manifest(args.manifest)
+    client = BatchClient(
+        concurrency=args.concurrency,
+        poll_min=args.poll_min,
+        poll_max=args.poll_max,
+        timeout=args.timeout,
+        webhook_url=args.webhook_url,
+        webhook_port=args.webhook_port,
+    )
+
+    start_time = time.time()
+    print(f"Rendering {len(specs)} jobs, {args.concurrency} at a time")
+    results = asyncio.run(client.render_all(specs, args.out_dir))
+    failed = [r for r in results if r["error"]]
+
+    print("\n" + "=" * 50)
+    print(f"{len(results) - len(failed)}/{len(results)} succeeded in {time.time() - start_time:.1f}s")
+    print("=" * 50)
+    if args.summary:
+        with open(args.summary, "w") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
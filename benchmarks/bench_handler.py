@@ -0,0 +1,295 @@
+"""
+Benchmark the handler pipeline around the actual render.
+
+Runs handler.handler() end to end - template resolution, check_gpu, the
+Blender subprocess running render_blend.py's real orchestration, ffmpeg,
+reading and base64-encoding the output, cleanup - against the stub
+`blender`, `ffmpeg` and `nvidia-smi` in benchmarks/stubs, so what's measured
+is the pipeline's own overhead rather than Cycles.
+
+    python benchmarks/bench_handler.py                       # default sizes, frames mode
+    python benchmarks/bench_handler.py --sizes 1M,64M --modes frames,stream,chunked
+    python benchmarks/bench_handler.py --output new.json --compare old.json
+
+Every case runs in a fresh Python process so peak RSS is per case. Results
+(per-phase wall time, peak RSS of the handler and of the largest child,
+throughput) are written as JSON for diffing between commits.
+
+Phases:
+    check_gpu      nvidia-smi probe
+    render         render_blender(): Blender subprocess incl. encode
+    blender        wall time of the Blender process itself
+    ffmpeg         summed wall time of all ffmpeg runs (they overlap in chunked mode)
+    launch         render - blender: process spawn and output plumbing in the handler
+    deliver        reading the MP4, base64 + sha256
+    other          everything else in handler() (template resolution, cleanup, ...)
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+STUBS_DIR = os.path.join(BENCH_DIR, "stubs")
+
+DEFAULT_SIZES = "1M,16M,128M,512M,2G"
+DEFAULT_MODES = "frames"
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    if text[-1] in _UNITS:
+        return int(float(text[:-1]) * _UNITS[text[-1]])
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit in ("G", "M", "K"):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f"{size // _UNITS[unit]}{unit}"
+    return str(size)
+
+
+# =============================================================================
+# One case (runs in its own process)
+# =============================================================================
+def _timed(phases: dict, name: str, fn):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def run_case(case: dict) -> dict:
+    """Run handler.handler() once for case and return its measurements."""
+    workdir = tempfile.mkdtemp(prefix="bench_handler_")
+    timings_file = os.path.join(workdir, "timings.jsonl")
+    template_path = os.path.join(workdir, "template.blend")
+    with open(template_path, "wb") as f:
+        f.write(b"BLENDER-v402" + os.urandom(64 * 1024))
+
+    frames = case["frames"]
+    os.environ.update({
+        "PATH": STUBS_DIR + os.pathsep + os.environ.get("PATH", ""),
+        "BLENDER_BINARY": os.path.join(STUBS_DIR, "blender"),
+        "RENDER_SCRIPT": os.path.join(REPO_DIR, "render_blend.py"),
+        "USE_XVFB": "0",
+        "BLENDER_WARM": "0",
+        "FRAME_CACHE_DIR": "",
+        "BENCH_TIMINGS_FILE": timings_file,
+        "BENCH_FRAME_BYTES": str(case["frame_bytes"]),
+        "BENCH_ENCODED_FRAME_BYTES": str(max(case["output_bytes"] // frames, 1)),
+    })
+
+    # Progress updates would go to the RunPod API - count them instead
+    progress_updates = []
+    runpod = types.ModuleType("runpod")
+    runpod.serverless = types.SimpleNamespace(
+        progress_update=lambda job, update: progress_updates.append(update),
+        start=lambda config: None,
+    )
+    sys.modules["runpod"] = runpod
+    sys.path.insert(0, REPO_DIR)
+    import handler
+
+    handler.TEMPLATES["bench"] = {"blend": template_path}
+    phases = {}
+    handler.check_gpu = _timed(phases, "check_gpu", handler.check_gpu)
+    handler.render_blender = _timed(phases, "render", handler.render_blender)
+    handler.deliver_output = _timed(phases, "deliver", handler.deliver_output)
+
+    fps = 24
+    job = {
+        "id": "bench",
+        "input": {
+            "template": "bench",
+            "resolution": [1920, 1080],
+            "samples": 128,
+            "fps": fps,
+            "frame_start": 1,
+            "frame_end": frames,
+            "output_mode": "inline",
+            "cache": "bypass",
+            "config": {"encode_mode": case["mode"]},
+        },
+    }
+    # The stub scene is 240 frames long; make sure the requested range fits
+    job["input"]["duration"] = -(-frames // fps)
+
+    start = time.perf_counter()
+    result = handler.handler(job)
+    total = time.perf_counter() - start
+    if "error" in result:
+        raise RuntimeError(f"Handler failed: {result['error']}")
+    file_size = result["file_size_bytes"]
+    handler_timings = result.get("timings", {})
+    del result
+
+    tools = {"blender": 0.0, "ffmpeg": 0.0}
+    with open(timings_file) as f:
+        for line in f:
+            entry = json.loads(line)
+            tools[entry["tool"]] += entry["seconds"]
+    os.remove(timings_file)
+    os.remove(template_path)
+    os.rmdir(workdir)
+
+    phases.update(tools)
+    phases["launch"] = phases["render"] - tools["blender"]
+    phases["other"] = total - phases["check_gpu"] - phases["render"] - phases["deliver"]
+    # ru_maxrss is in KiB on Linux
+    return {
+        "wall_seconds": total,
+        "phases": phases,
+        "file_size_bytes": file_size,
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "peak_child_rss_bytes": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024,
+        "throughput_mb_s": file_size / total / 1024 ** 2,
+        "deliver_mb_s": file_size / phases["deliver"] / 1024 ** 2 if phases["deliver"] else None,
+        "progress_updates": len(progress_updates),
+        # The handler's own per-phase breakdown (see metrics.PhaseTimer)
+        "handler_timings": handler_timings,
+    }
+
+
+# =============================================================================
+# Driver
+# =============================================================================
+def _median(values):
+    values = [v for v in values if v is not None]
+    if not values:
+        return None
+    # Byte counts stay integers
+    return statistics.median_low(values) if all(isinstance(v, int) for v in values) else statistics.median(values)
+
+
+def summarize(runs: list) -> dict:
+    """Median of every numeric measurement across repeated runs of one case."""
+    summary = {key: _median([r[key] for r in runs]) for key in runs[0] if key not in ("phases", "handler_timings")}
+    summary["phases"] = {key: _median([r["phases"][key] for r in runs]) for key in runs[0]["phases"]}
+    summary["handler_timings"] = {
+        key: _median([r["handler_timings"].get(key) for r in runs]) for key in runs[0]["handler_timings"]
+    }
+    for key, value in list(summary.items()):
+        if isinstance(value, float):
+            summary[key] = round(value, 4)
+    summary["phases"] = {k: round(v, 4) for k, v in summary["phases"].items()}
+    summary["handler_timings"] = {k: round(v, 4) for k, v in summary["handler_timings"].items() if v is not None}
+    return summary
+
+
+def run_in_subprocess(case: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run-case", json.dumps(case)],
+        capture_output=True, text=True,
+    )
+    results = [line for line in proc.stdout.splitlines() if line.startswith("BENCH_RESULT: ")]
+    if proc.returncode != 0 or not results:
+        tail = "\n".join((proc.stdout + proc.stderr).splitlines()[-30:])
+        raise RuntimeError(f"Case {case['name']} failed:\n{tail}")
+    return json.loads(results[-1][len("BENCH_RESULT: "):])
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str):
+    """Print per-case changes against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = {c["name"]: c for c in json.load(f)["cases"]}
+
+    print(f"\nCompared with {baseline_path}:")
+    print(f"{'case':<20} {'wall':>22} {'peak rss':>26} {'deliver':>22}")
+    for case in results["cases"]:
+        old = baseline.get(case["name"])
+        if not old:
+            print(f"{case['name']:<20} (new)")
+            continue
+
+        def change(new, before, unit="", scale=1):
+            if new is None or not before:
+                return "-"
+            return f"{before / scale:.2f}->{new / scale:.2f}{unit} ({(new - before) / before * 100:+.0f}%)"
+
+        print(f"{case['name']:<20} "
+              f"{change(case['wall_seconds'], old['wall_seconds'], 's'):>22} "
+              f"{change(case['peak_rss_bytes'], old['peak_rss_bytes'], 'M', 1024 ** 2):>26} "
+              f"{change(case['phases']['deliver'], old['phases'].get('deliver'), 's'):>22}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark handler overhead with stub Blender/ffmpeg")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="Output sizes, e.g. 1M,128M,2G")
+    parser.add_argument("--modes", default=DEFAULT_MODES, help="Encode modes: frames,stream,chunked")
+    parser.add_argument("--frames", type=int, default=48, help="Frames per render")
+    parser.add_argument("--frame-bytes", default="256K", help="Size of each rendered frame file")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case (median is reported)")
+    parser.add_argument("--output", default="bench_results.json", help="Results file")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        result = run_case(json.loads(args.run_case))
+        print(f"BENCH_RESULT: {json.dumps(result)}")
+        return
+
+    cases = [
+        {
+            "name": f"{mode}-{format_size(size)}",
+            "mode": mode,
+            "output_bytes": size,
+            "frames": args.frames,
+            "frame_bytes": parse_size(args.frame_bytes),
+        }
+        for mode in args.modes.split(",")
+        for size in (parse_size(s) for s in args.sizes.split(","))
+    ]
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cases": [],
+    }
+    print(f"{'case':<20} {'wall s':>8} {'render':>8} {'launch':>8} {'deliver':>8} {'other':>8} "
+          f"{'rss MB':>8} {'MB/s':>8}")
+    for case in cases:
+        runs = [run_in_subprocess(case) for _ in range(args.repeat)]
+        summary = {**case, **summarize(runs)}
+        results["cases"].append(summary)
+        phases = summary["phases"]
+        print(f"{case['name']:<20} {summary['wall_seconds']:>8.3f} {phases['render']:>8.3f} "
+              f"{phases['launch']:>8.3f} {phases['deliver']:>8.3f} {phases['other']:>8.3f} "
+              f"{summary['peak_rss_bytes'] / 1024 ** 2:>8.0f} {summary['throughput_mb_s']:>8.1f}")
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Stand-in for Blender's bpy module, used by the benchmark's stub `blender`.
+
+Implements just the API surface render_blend.py touches. "Rendering" a frame
+prints Cycles-style progress lines, optionally sleeps BENCH_FRAME_SECONDS and
+writes a BENCH_FRAME_BYTES image (PNG for animations, BMP for save_render),
+so the real orchestration - frame files, ffmpeg invocations, handlers - runs
+against realistic file sizes.
+
+The scene holds a small branded setup (a light, an emissive chip, the
+Channel_Name text) and enough of the node, light group and compositing API
+for branding.py; frames are written as .exr when the output format is
+multilayer EXR. Settings structs list their plain attributes through bl_rna,
+so blender_server.py can snapshot and restore them between jobs.
+"""
+
+import os
+import time
+import types
+
+FRAME_BYTES = int(os.environ.get("BENCH_FRAME_BYTES", 256 * 1024))
+FRAME_SECONDS = float(os.environ.get("BENCH_FRAME_SECONDS", 0))
+# BENCH_GPU=0 stands in for a CPU-only machine: Cycles finds no GPU backend
+GPU = os.environ.get("BENCH_GPU", "1") == "1"
+SAMPLE_LINES = 4
+
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_filler = os.urandom(1024 * 1024)
+
+
+def _write_image(path, header):
+    remaining = max(FRAME_BYTES - len(header), 0)
+    with open(path, "wb") as f:
+        f.write(header)
+        while remaining:
+            chunk = _filler[:min(remaining, len(_filler))]
+            f.write(chunk)
+            remaining -= len(chunk)
+
+
+def _bmp_header():
+    # "BM" + little-endian file size: enough for the ffmpeg stub to split a pipe into frames
+    return b"BM" + FRAME_BYTES.to_bytes(4, "little")
+
+
+_RNA_TYPES = {bool: "BOOLEAN", int: "INT", float: "FLOAT", str: "STRING"}
+
+
+class _RNA:
+    """bl_rna stand-in: the struct's plain attributes as writable properties, the rest as pointers."""
+
+    def __init__(self, struct):
+        self.properties = [
+            _Settings(identifier=name, type=_RNA_TYPES.get(type(value), "POINTER"), is_readonly=False,
+                      is_enum_flag=False, is_array=False)
+            for name, value in vars(struct).items() if not name.startswith("_")
+        ]
+
+
+class _Settings(types.SimpleNamespace):
+    @property
+    def bl_rna(self):
+        return _RNA(self)
+
+
+class _Sockets(dict):
+    """Node sockets by name (created on first use) or by index."""
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self.values())[key] if len(self) > key else self[f"Output {key}"]
+        if key not in self:
+            dict.__setitem__(self, key, _Settings(name=key, default_value=(0.0, 0.0, 0.0, 1.0), is_linked=False))
+        return dict.__getitem__(self, key)
+
+
+class _Node(_Settings):
+    def __init__(self, node_type, **kwargs):
+        super().__init__(type=node_type, inputs=_Sockets(), outputs=_Sockets(), **kwargs)
+
+
+class _NodeTree:
+    def __init__(self, nodes=()):
+        self.nodes = _Nodes(nodes)
+        self.links = types.SimpleNamespace(new=lambda from_socket, to_socket: None)
+
+
+class _Nodes(list):
+    def new(self, node_type):
+        node = _Node(node_type)
+        self.append(node)
+        return node
+
+
+class _Collection(list):
+    def get(self, name, default=None):
+        return next((item for item in self if item.name == name), default)
+
+    def add(self, name):
+        item = _Settings(name=name)
+        self.append(item)
+        return item
+
+    def new(self, name):
+        return self.add(name)
+
+
+def _emission_material(name, color):
+    node = _Node("EMISSION")
+    node.inputs["Color"].default_value = (*color, 1.0)
+    return _Settings(name=name, use_nodes=True, node_tree=_NodeTree([node]))
+
+
+class _Scene:
+    def __init__(self):
+        self.name = "Scene"
+        self.frame_start = 1
+        self.frame_end = 240
+        self.frame_step = 1
+        self.frame_current = 1
+        self.render = _Settings(
+            engine="CYCLES", resolution_x=1920, resolution_y=1080, resolution_percentage=100,
+            fps=24, filepath="/tmp/", use_overwrite=True, use_placeholder=False,
+            image_settings=_Settings(file_format="PNG", color_mode="RGBA", color_depth="8", exr_codec="ZIP"),
+        )
+        self.cycles = _Settings(device="CPU", samples=128, use_denoising=False, use_adaptive_sampling=True,
+                                adaptive_threshold=0.01, time_limit=0.0)
+        self.view_layers = [_Settings(name="ViewLayer", lightgroups=_Collection(),
+                                      cycles=_Settings(denoising_store_passes=False))]
+        self.eevee = _Settings(taa_render_samples=64)
+        self.display = _Settings(shading=_Settings(light="STUDIO"))
+        self.view_settings = _Settings(view_transform="AgX", look="None", exposure=0.0, gamma=1.0)
+        self.display_settings = _Settings(display_device="sRGB")
+        self.objects = []
+        self.world = None
+        self.camera = None
+        self.use_nodes = False
+        self.node_tree = _NodeTree()
+
+    @property
+    def bl_rna(self):
+        return _RNA(self)
+
+    def frame_set(self, frame):
+        self.frame_current = frame
+
+
+def _stats(frame, status):
+    line = (f"Fra:{frame} Mem:512.00M (Peak 768.00M) | Time:00:00.10 | Mem:512.00M, Peak:768.00M "
+            f"| Scene, ViewLayer | {status}")
+    print(line, flush=True)
+    for handler in app.handlers.render_stats:
+        handler(line)
+
+
+def _render_frame(scene, frame):
+    for handler in app.handlers.render_pre:
+        handler(scene)
+    _stats(frame, "Synchronizing object | Cube")
+    _stats(frame, "Building BVH")
+    samples = scene.cycles.samples
+    # Like Cycles, stop sampling once the frame's time limit is used up (0 = none)
+    time_limit = getattr(scene.cycles, "time_limit", 0)
+    started = time.perf_counter()
+    for i in range(1, SAMPLE_LINES + 1):
+        _stats(frame, f"Sample {samples * i // SAMPLE_LINES}/{samples}")
+        if time_limit and time.perf_counter() - started >= time_limit:
+            break
+        if FRAME_SECONDS:
+            time.sleep(FRAME_SECONDS / SAMPLE_LINES)
+    for handler in app.handlers.render_post:
+        handler(scene)
+
+
+def _render(animation=False, scene="", **kwargs):
+    scene = data.scenes.get(scene) if scene else context.scene
+    if not animation:
+        _render_frame(scene, scene.frame_current)
+        return {"FINISHED"}
+
+    ext = "exr" if scene.render.image_settings.file_format.startswith("OPEN_EXR") else "png"
+    for frame in range(scene.frame_start, scene.frame_end + 1, scene.frame_step):
+        path = f"{scene.render.filepath}{frame:04d}.{ext}"
+        if os.path.exists(path) and not scene.render.use_overwrite:
+            print(f"Skipping existing frame \"{path}\"", flush=True)
+            continue
+        scene.frame_set(frame)
+        _render_frame(scene, frame)
+        _write_image(path, _PNG_SIGNATURE)
+        print(f"Saved: '{path}'", flush=True)
+        print(" Time: 00:00.10 (Saving: 00:00.01)", flush=True)
+        for handler in app.handlers.render_write:
+            handler(scene)
+    return {"FINISHED"}
+
+
+class _RenderResult:
+    def save_render(self, filepath, scene=None):
+        _write_image(filepath, _bmp_header())
+
+
+class _Device(types.SimpleNamespace):
+    pass
+
+
+class _CyclesPreferences:
+    def __init__(self):
+        self.compute_device_type = "NONE"
+        self._gpu = _Device(name="NVIDIA GeForce RTX 4090", type="OPTIX", use=False)
+        self._cpu = _Device(name="AMD EPYC 7B13", type="CPU", use=False)
+
+    def get_devices(self):
+        return [self._gpu] if GPU else [], []
+
+    def get_devices_for_type(self, device_type):
+        return self.devices
+
+    @property
+    def devices(self):
+        return [self._gpu, self._cpu] if GPU and self.compute_device_type == "OPTIX" else [self._cpu]
+
+
+class _Scenes(_Collection):
+    def new(self, name):
+        scene = _Scene()
+        scene.name = name
+        self.append(scene)
+        return scene
+
+
+_scene = _Scene()
+_materials = _Collection([
+    _emission_material("Chip_Glow", (0.072, 0.584, 0.871)),
+    _emission_material("Channel_Text_Material", (0.072, 0.584, 0.871)),
+])
+_objects = _Collection([
+    _Settings(name="Light", type="LIGHT", lightgroup="", data=_Settings(name="Light", color=(0.93, 0.212, 0.0))),
+    _Settings(name="Chip", type="MESH", lightgroup="", material_slots=[_Settings(material=_materials[0])]),
+    _Settings(name="Channel_Name", type="FONT", lightgroup="", hide_render=False,
+              material_slots=[_Settings(material=_materials[1])]),
+])
+_scene.objects = list(_objects)
+_scene.world = _Settings(name="World", lightgroup="")
+
+context = types.SimpleNamespace(
+    scene=_scene,
+    preferences=types.SimpleNamespace(
+        addons={"cycles": types.SimpleNamespace(preferences=_CyclesPreferences())}
+    ),
+)
+class _Images(dict):
+    def load(self, filepath, check_existing=False):
+        image = _Settings(name=os.path.basename(filepath), filepath=filepath, source="FILE")
+        self[image.name] = image
+        return image
+
+    def remove(self, image):
+        self.pop(image.name, None)
+
+
+data = types.SimpleNamespace(
+    scenes=_Scenes([_scene]), images=_Images({"Render Result": _RenderResult()}), objects=_objects,
+    materials=_materials,
+)
+ops = types.SimpleNamespace(
+    render=types.SimpleNamespace(render=_render),
+    wm=types.SimpleNamespace(open_mainfile=lambda filepath, **kwargs: None),
+)
+app = types.SimpleNamespace(version_string="4.2.0", handlers=types.SimpleNamespace(
+    render_pre=[], render_post=[], render_stats=[], render_write=[],
+))
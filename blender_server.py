@@ -0,0 +1,212 @@
+"""
+Long-lived Blender render server.
+
+Started once per worker instead of launching Blender for every job:
+
+    xvfb-run -a blender --background --python blender_server.py -- \
+        --socket /tmp/blender_render.sock
+
+It listens on a Unix socket and serves one newline-delimited JSON request per
+connection:
+
+    {"cmd": "ping"}
+    {"cmd": "render", "template": "/path/to.blend", "argv": ["--output", ...]}
+
+"argv" is the same argument list render_blend.py takes after '--'. The last
+used template stays loaded; switching templates re-opens the file. Between
+jobs every scene setting render_blend.py may touch is restored from a snapshot
+taken right after the file was loaded, so jobs can't leak state into each
+other. GPU detection happens once for the lifetime of the process.
+
+Responses:
+    {"success": true, "frame_start": 1, "frame_end": 96, "timings": {...}, "template_loaded": false, "log": "..."}
+    {"success": false, "error": "...", "log": "..."}
+"""
+
+import bpy
+import contextlib
+import io
+import json
+import os
+import socket
+import sys
+import time
+import traceback
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import render_blend
+
+LOG_TAIL_CHARS = 2000
+
+
+# =============================================================================
+# Scene state snapshot / restore
+# =============================================================================
+def _settings_structs(scene):
+    """Every RNA struct whose properties a render job may change."""
+    return {
+        "scene": scene,
+        "render": scene.render,
+        "image_settings": scene.render.image_settings,
+        "cycles": scene.cycles,
+        "eevee": scene.eevee,
+        "display": scene.display,
+        "view_settings": scene.view_settings,
+    }
+
+
+def _snapshot_struct(struct) -> dict:
+    values = {}
+    for prop in struct.bl_rna.properties:
+        if prop.is_readonly or prop.type in ('POINTER', 'COLLECTION'):
+            continue
+        try:
+            value = getattr(struct, prop.identifier)
+        except AttributeError:
+            continue
+        if prop.type == 'ENUM' and prop.is_enum_flag:
+            value = set(value)
+        elif getattr(prop, "is_array", False):
+            value = tuple(value)
+        values[prop.identifier] = value
+    return values
+
+
+def snapshot_scenes() -> dict:
+    return {
+        scene.name: {name: _snapshot_struct(struct) for name, struct in _settings_structs(scene).items()}
+        for scene in bpy.data.scenes
+    }
+
+
+def restore_scenes(snapshot: dict):
+    for scene in bpy.data.scenes:
+        saved = snapshot.get(scene.name)
+        if not saved:
+            continue
+        for name, struct in _settings_structs(scene).items():
+            for identifier, value in saved[name].items():
+                try:
+                    setattr(struct, identifier, value)
+                except (AttributeError, TypeError, ValueError):
+                    # Context-dependent or driver-locked properties - leave as is
+                    pass
+
+
+# =============================================================================
+# Server
+# =============================================================================
+class RenderServer:
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.template_path = None
+        self.template_mtime = None
+        self.snapshot = None
+
+    def load_template(self, template_path, force=False) -> bool:
+        """Make template_path the loaded file. Returns True if it had to be (re)loaded."""
+        mtime = os.path.getmtime(template_path)
+        if not force and template_path == self.template_path and mtime == self.template_mtime:
+            restore_scenes(self.snapshot)
+            return False
+
+        start = time.time()
+        bpy.ops.wm.open_mainfile(filepath=template_path, load_ui=False)
+        self.template_path = template_path
+        self.template_mtime = mtime
+        self.snapshot = snapshot_scenes()
+        print(f"Loaded template {template_path} in {time.time() - start:.2f}s")
+        return True
+
+    def handle(self, request: dict) -> dict:
+        if request.get("cmd") == "ping":
+            return {"success": True, "template": self.template_path}
+        if request.get("cmd") != "render":
+            return {"success": False, "error": f"Unknown command: {request.get('cmd')}"}
+
+        log = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(_Tee(sys.stdout, log)):
+                template_path = request["template"]
+                if not os.path.exists(template_path):
+                    raise RuntimeError(f"Template not found: {template_path}")
+                load_start = time.perf_counter()
+                loaded = self.load_template(template_path, force=request.get("reload", False))
+                load_seconds = time.perf_counter() - load_start
+                args = render_blend.parse_args(["--", *request.get("argv", [])])
+                result = render_blend.render(args)
+                # Open (or snapshot restore) of the template
+                result["timings"]["template_load"] = round(load_seconds, 3)
+            return {"success": True, "template_loaded": loaded, **result, "log": log.getvalue()[-LOG_TAIL_CHARS:]}
+        except Exception as e:
+            traceback.print_exc()
+            # A failed job may have left the scene half-configured - reload next time
+            self.template_path = None
+            return {
+                "success": False,
+                "error": f"{e}\n{traceback.format_exc()}",
+                "log": log.getvalue()[-LOG_TAIL_CHARS:],
+            }
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(1)
+        print(f"Blender render server listening on {self.socket_path}")
+
+        while True:
+            conn, _ = server.accept()
+            with conn, conn.makefile("rwb") as stream:
+                line = stream.readline()
+                if not line:
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    response = {"success": False, "error": f"Bad request: {e}"}
+                else:
+                    if request.get("cmd") == "shutdown":
+                        stream.write(b'{"success": true}\n')
+                        break
+                    response = self.handle(request)
+                try:
+                    stream.write(json.dumps(response).encode() + b"\n")
+                    stream.flush()
+                except OSError as e:
+                    # Client gave up (e.g. handler timeout) - keep serving
+                    print(f"Could not send response: {e}")
+
+        server.close()
+        os.remove(self.socket_path)
+
+
+class _Tee(io.TextIOBase):
+    """Write to the real stdout and a capture buffer at the same time."""
+
+    def __init__(self, *streams):
+        self.streams = streams
+
+    def write(self, text):
+        for stream in self.streams:
+            stream.write(text)
+        return len(text)
+
+    def flush(self):
+        for stream in self.streams:
+            stream.flush()
+
+
+def main():
+    socket_path = "/tmp/blender_render.sock"
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+    if "--socket" in argv and argv.index("--socket") + 1 < len(argv):
+        socket_path = argv[argv.index("--socket") + 1]
+
+    RenderServer(socket_path).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
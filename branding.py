@@ -0,0 +1,410 @@
+"""
+Render once, brand many: per-channel branding composited over base layers.
+
+Templates like ai_cpu_activation bake the channel branding into the .blend
+(scripts/ai_cpu_activation.py): the Channel_Name text, and a palette of
+emission and light colors. With a "branding" config the job instead renders
+unbranded base layers once and brands them in the compositor:
+
+    "branding": {
+        "palette": {"#4cc9f0": "#00ff88", "#ff006e": "#ffd000"},  # template color -> channel color
+        "text": "My Channel",                                     # 2D overlay (optional)
+        "text_color": "#ffffff",
+        "text_size": 0.06,          # Fraction of the frame height
+        "text_position": [0.5, 0.45],  # Center, as fractions (default: where the text object is)
+        "text_object": "Channel_Name",
+        "font": "dejavu/DejaVuSans-Bold.ttf"  # Under BRANDING_FONT_DIR
+    }
+
+Base layers: light contributions are linear in the emitter's color, so every
+light and emissive object whose color is one flat palette color is put in a
+Cycles light group for that color and rendered with its color set to white.
+Everything else that emits (world, color-ramp emissions, mixed objects)
+goes into the "base" group. Frames are multilayer EXRs with one Combined
+pass per light group plus denoising data; they depend only on the template
+and render settings, so the frame cache shares them across every branding.
+
+Compositing: each group's pass is multiplied by its channel color (or its
+original one), the passes are summed and denoised, and the view transform is
+applied - a few milliseconds per frame instead of a Cycles render. The text
+object is hidden in the base layers; the channel name is drawn over the
+frames by ffmpeg during the encode.
+
+Limits: color-ramp emissions stay as rendered; the text is flat-colored
+instead of the template's gradient material, and neither reflects in nor is
+occluded by the scene.
+
+Used from render_blend.py inside Blender; handler.py only uses validate().
+
+Configured per worker through the environment:
+    BRANDING_FONT_DIR   Directory job fonts are resolved in (default: /usr/share/fonts)
+"""
+
+import contextlib
+import os
+import re
+
+try:
+    import bpy
+except ImportError:
+    # Outside Blender (handler.py): validation only
+    bpy = None
+
+BRANDING_FONT_DIR = os.environ.get("BRANDING_FONT_DIR", "/usr/share/fonts")
+
+BRANDING_KEYS = ("palette", "text", "text_color", "text_size", "text_position", "text_object", "font")
+BASE_LIGHTGROUP = "base"
+GROUP_PREFIX = "brand_"
+TEXT_OBJECT = "Channel_Name"
+DEFAULT_FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+DEFAULT_TEXT_SIZE = 0.06
+
+_HEX = re.compile(r"^#?([0-9a-fA-F]{6})$")
+# Font paths go into an ffmpeg filter unquoted, so only these characters are allowed
+_FONT_PATH = re.compile(r"^[\w./-]+$")
+FONT_EXTENSIONS = (".ttf", ".otf", ".ttc")
+WHITE = (1.0, 1.0, 1.0)
+
+
+# =============================================================================
+# Colors
+# =============================================================================
+def srgb_to_linear(c: float) -> float:
+    if c <= 0.04045:
+        return c / 12.92
+    return ((c + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(c: float) -> float:
+    if c <= 0.0031308:
+        return c * 12.92
+    return 1.055 * c ** (1 / 2.4) - 0.055
+
+
+def hex_to_linear(value: str) -> tuple:
+    """'#4cc9f0' -> linear RGB, as the branding scripts set it."""
+    match = _HEX.match(value or "")
+    if not match:
+        raise ValueError(f"Not a #rrggbb color: {value!r}")
+    digits = match.group(1)
+    return tuple(srgb_to_linear(int(digits[i:i + 2], 16) / 255) for i in (0, 2, 4))
+
+
+def linear_to_hex(color) -> str:
+    return "#" + "".join(f"{round(min(max(linear_to_srgb(c), 0.0), 1.0) * 255):02x}" for c in color[:3])
+
+
+def resolve_font(font: str) -> str:
+    """
+    Path of a job's font: relative to BRANDING_FONT_DIR, or an absolute path inside it.
+
+    Raises ValueError for anything else (paths outside the directory, missing
+    files, characters that would need escaping in the drawtext filter).
+    """
+    root = os.path.realpath(BRANDING_FONT_DIR)
+    path = os.path.realpath(os.path.join(root, font))
+    if os.path.commonpath([root, path]) != root or not path.lower().endswith(FONT_EXTENSIONS):
+        raise ValueError(f"branding.font must be a font file under {BRANDING_FONT_DIR}: {font!r}")
+    if not _FONT_PATH.match(path) or not os.path.isfile(path):
+        raise ValueError(f"branding.font not found under {BRANDING_FONT_DIR}: {font!r}")
+    return path
+
+
+def _number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def validate(branding: dict) -> str:
+    """Check a job's branding config. Returns an error message or None."""
+    if not isinstance(branding, dict):
+        return "branding must be an object"
+    unknown = set(branding) - set(BRANDING_KEYS)
+    if unknown:
+        return f"branding: unknown keys {sorted(unknown)}. Available: {list(BRANDING_KEYS)}"
+    palette = branding.get("palette") or {}
+    if not isinstance(palette, dict):
+        return "branding.palette must map template colors to channel colors"
+    for color in [*palette, *palette.values(), *([branding["text_color"]] if branding.get("text_color") else [])]:
+        if not isinstance(color, str) or not _HEX.match(color):
+            return f"branding: not a #rrggbb color: {color!r}"
+    for key in ("text", "text_object", "font"):
+        if branding.get(key) is not None and not isinstance(branding[key], str):
+            return f"branding.{key} must be a string, got {branding[key]!r}"
+    size = branding.get("text_size")
+    if size is not None and (not _number(size) or not 0 < size < 1):
+        return "branding.text_size is a fraction of the frame height (0-1)"
+    position = branding.get("text_position")
+    if position is not None and (
+            not isinstance(position, (list, tuple)) or len(position) != 2
+            or not all(_number(v) and 0 <= v <= 1 for v in position)):
+        return "branding.text_position is [x, y] as fractions of the frame (0-1)"
+    if branding.get("font"):
+        try:
+            resolve_font(branding["font"])
+        except ValueError as e:
+            return str(e)
+    return None
+
+
+def _emission_colors(material) -> list:
+    """
+    Color sockets that make material emissive: (socket, linked) pairs.
+
+    Emission nodes, and Principled BSDFs with a non-zero emission strength.
+    """
+    if not material or not material.use_nodes or not material.node_tree:
+        return []
+    sockets = []
+    for node in material.node_tree.nodes:
+        if node.type == 'EMISSION':
+            sockets.append(node.inputs['Color'])
+        elif node.type == 'BSDF_PRINCIPLED' and 'Emission Color' in node.inputs:
+            strength = node.inputs.get('Emission Strength')
+            if strength is not None and (strength.is_linked or strength.default_value > 0):
+                sockets.append(node.inputs['Emission Color'])
+    return [(socket, socket.is_linked) for socket in sockets]
+
+
+# =============================================================================
+# Base layers
+# =============================================================================
+class BaseLayers:
+    """Splits the scene's emitters into per-color light groups for compositing."""
+
+    def __init__(self, scene, text_object: str = TEXT_OBJECT):
+        """
+        Args:
+            scene: Scene being rendered
+            text_object: Object drawn as a 2D overlay instead (hidden in the base layers)
+        """
+        self.scene = scene
+        self.view_layer = scene.view_layers[0]
+        self.text_object = bpy.data.objects.get(text_object) if text_object else None
+        self.groups = {}     # light group name -> original linear color
+        self._undo = []      # Callables restoring what prepare() changed
+
+    def _set(self, owner, attr, value):
+        old = getattr(owner, attr)
+        if not isinstance(old, (str, bool, int, float)):
+            # Copy bpy arrays (colors), they are views of the property
+            old = tuple(old)
+        self._undo.append(lambda: setattr(owner, attr, old))
+        setattr(owner, attr, value)
+
+    def _group(self, color) -> str:
+        name = GROUP_PREFIX + linear_to_hex(color)[1:]
+        self.groups.setdefault(name, tuple(color[:3]))
+        return name
+
+    def prepare(self) -> dict:
+        """
+        Assign light groups, whiten the brandable emitters and hide the text.
+
+        Returns {light group: template color as #rrggbb}.
+        """
+        scene = self.scene
+        objects = [obj for obj in scene.objects if obj.type in ('MESH', 'CURVE', 'FONT', 'SURFACE', 'META')]
+
+        # A material is brandable if it emits one flat color; an object if all its emission shares one
+        material_color = {}
+        unbrandable = set()
+        for material in bpy.data.materials:
+            sockets = _emission_colors(material)
+            colors = {tuple(round(c, 6) for c in socket.default_value[:3]) for socket, linked in sockets if not linked}
+            if any(linked for _, linked in sockets) or len(colors) > 1:
+                unbrandable.add(material.name)
+            elif colors:
+                material_color[material.name] = colors.pop()
+
+        def emissive(obj):
+            return [slot.material for slot in obj.material_slots
+                    if slot.material and (slot.material.name in material_color or slot.material.name in unbrandable)]
+
+        # Whitening a material affects every user, so one mixed user makes the material (and its users) stay
+        while True:
+            mixed = [obj for obj in objects if obj is not self.text_object and (
+                any(m.name in unbrandable for m in emissive(obj))
+                or len({material_color[m.name] for m in emissive(obj)}) > 1)]
+            spread = {m.name for obj in mixed for m in emissive(obj)} - unbrandable
+            if not spread:
+                break
+            unbrandable |= spread
+            for name in spread:
+                material_color.pop(name, None)
+
+        for obj in objects:
+            materials = emissive(obj)
+            if materials and all(m.name in material_color for m in materials):
+                self._set(obj, "lightgroup", self._group(material_color[materials[0].name]))
+            else:
+                self._set(obj, "lightgroup", BASE_LIGHTGROUP)
+        for material in bpy.data.materials:
+            if material.name in material_color:
+                for socket, _ in _emission_colors(material):
+                    self._set(socket, "default_value", (*WHITE, 1.0))
+
+        for obj in scene.objects:
+            if obj.type == 'LIGHT':
+                self._set(obj, "lightgroup", self._group(obj.data.color))
+        # Light data can be shared between objects
+        for light in {obj.data.name: obj.data for obj in scene.objects if obj.type == 'LIGHT'}.values():
+            self._set(light, "color", WHITE)
+        if scene.world:
+            self._set(scene.world, "lightgroup", BASE_LIGHTGROUP)
+
+        if self.text_object:
+            self._set(self.text_object, "hide_render", True)
+
+        existing = {group.name for group in self.view_layer.lightgroups}
+        for name in [BASE_LIGHTGROUP, *self.groups]:
+            if name not in existing:
+                group = self.view_layer.lightgroups.add(name=name)
+                self._undo.append(lambda group=group: self.view_layer.lightgroups.remove(group))
+        # Denoised after compositing, from the albedo/normal passes
+        self._set(scene.cycles, "use_denoising", False)
+        self._set(self.view_layer.cycles, "denoising_store_passes", True)
+        settings = scene.render.image_settings
+        self._set(settings, "file_format", 'OPEN_EXR_MULTILAYER')
+        self._set(settings, "color_depth", '16')
+        self._set(settings, "exr_codec", 'DWAA')
+
+        print(f"Base layers: {len(self.groups)} brand light groups "
+              f"{ {name: linear_to_hex(color) for name, color in self.groups.items()} }")
+        return {name: linear_to_hex(color) for name, color in self.groups.items()}
+
+    def restore(self):
+        """Undo prepare() - the warm Blender server keeps the scene for later jobs."""
+        while self._undo:
+            try:
+                self._undo.pop()()
+            except (AttributeError, TypeError, ValueError, RuntimeError, ReferenceError):
+                pass
+
+    def text_position(self):
+        """Screen position of the text object at the first frame as [x, y] fractions from top left, or None."""
+        if not self.text_object or not self.scene.camera:
+            return None
+        try:
+            from bpy_extras.object_utils import world_to_camera_view
+        except ImportError:
+            return None
+        self.scene.frame_set(self.scene.frame_start)
+        co = world_to_camera_view(self.scene, self.scene.camera, self.text_object.matrix_world.translation)
+        return [round(co.x, 4), round(1 - co.y, 4)]
+
+
+# =============================================================================
+# Compositing
+# =============================================================================
+@contextlib.contextmanager
+def _without_render_handlers():
+    """Keep budget, telemetry and checkpoint handlers out of the compositing render."""
+    handlers = bpy.app.handlers
+    saved = {name: list(getattr(handlers, name)) for name in ("render_pre", "render_post", "render_stats",
+                                                              "render_write")}
+    for name in saved:
+        getattr(handlers, name).clear()
+    try:
+        yield
+    finally:
+        for name, callbacks in saved.items():
+            getattr(handlers, name)[:] = callbacks
+
+
+def composite(scene, frames_dir: str, output_dir: str, groups: dict, palette: dict) -> dict:
+    """
+    Brand the base layers in frames_dir into PNG frames in output_dir.
+
+    Args:
+        scene: The rendered scene (frame range, resolution, color management)
+        frames_dir: Multilayer EXR frames (frame_0001.exr ...)
+        output_dir: Where frame_0001.png ... are written
+        groups: {light group: template color} from BaseLayers.prepare()
+        palette: {template color: channel color}, #rrggbb; unlisted colors stay
+
+    Returns {light group: #rrggbb color used}.
+    """
+    palette = {linear_to_hex(hex_to_linear(k)): linear_to_hex(hex_to_linear(v)) for k, v in palette.items()}
+    colors = {name: palette.get(color, color) for name, color in groups.items()}
+
+    comp = bpy.data.scenes.new("Branding")
+    image = None
+    try:
+        render = comp.render
+        render.engine = 'BLENDER_WORKBENCH'
+        render.resolution_x = scene.render.resolution_x
+        render.resolution_y = scene.render.resolution_y
+        render.resolution_percentage = scene.render.resolution_percentage
+        render.fps = scene.render.fps
+        comp.frame_start, comp.frame_end, comp.frame_step = scene.frame_start, scene.frame_end, scene.frame_step
+        for attr in ("view_transform", "look", "exposure", "gamma"):
+            setattr(comp.view_settings, attr, getattr(scene.view_settings, attr))
+        comp.display_settings.display_device = scene.display_settings.display_device
+        render.image_settings.file_format = 'PNG'
+        render.image_settings.color_mode = 'RGB'
+        render.filepath = os.path.join(output_dir, "frame_")
+
+        first = os.path.join(frames_dir, f"frame_{scene.frame_start:04d}.exr")
+        image = bpy.data.images.load(first, check_existing=False)
+        image.source = 'SEQUENCE'
+
+        comp.use_nodes = True
+        tree = comp.node_tree
+        tree.nodes.clear()
+        layers = tree.nodes.new('CompositorNodeImage')
+        layers.image = image
+        layers.frame_start = scene.frame_start
+        layers.frame_offset = scene.frame_start - 1
+        layers.frame_duration = scene.frame_end - scene.frame_start + 1
+
+        total = layers.outputs[f"Combined_{BASE_LIGHTGROUP}"]
+        for name, color in colors.items():
+            tint = tree.nodes.new('CompositorNodeRGB')
+            tint.outputs[0].default_value = (*hex_to_linear(color), 1.0)
+            multiply = tree.nodes.new('CompositorNodeMixRGB')
+            multiply.blend_type = 'MULTIPLY'
+            tree.links.new(layers.outputs[f"Combined_{name}"], multiply.inputs[1])
+            tree.links.new(tint.outputs[0], multiply.inputs[2])
+            add = tree.nodes.new('CompositorNodeMixRGB')
+            add.blend_type = 'ADD'
+            tree.links.new(total, add.inputs[1])
+            tree.links.new(multiply.outputs[0], add.inputs[2])
+            total = add.outputs[0]
+
+        denoise = tree.nodes.new('CompositorNodeDenoise')
+        tree.links.new(total, denoise.inputs['Image'])
+        tree.links.new(layers.outputs["Denoising Normal"], denoise.inputs['Normal'])
+        tree.links.new(layers.outputs["Denoising Albedo"], denoise.inputs['Albedo'])
+        output = tree.nodes.new('CompositorNodeComposite')
+        tree.links.new(denoise.outputs[0], output.inputs['Image'])
+
+        print(f"Compositing branding: {colors}")
+        with _without_render_handlers():
+            bpy.ops.render.render(animation=True, scene=comp.name)
+    finally:
+        bpy.data.scenes.remove(comp)
+        if image:
+            bpy.data.images.remove(image)
+    return colors
+
+
+def text_overlay(branding: dict, position, text_path: str) -> str:
+    """
+    ffmpeg drawtext filter for the channel name, or None without text.
+
+    The text is written to text_path and read with textfile= (no expansion), so
+    it needs no escaping; the font is resolved under BRANDING_FONT_DIR.
+    """
+    text = branding.get("text")
+    if not text:
+        return None
+    x, y = branding.get("text_position") or position or [0.5, 0.5]
+    color = linear_to_hex(hex_to_linear(branding.get("text_color") or "#ffffff"))
+    font = resolve_font(branding["font"]) if branding.get("font") else DEFAULT_FONT
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return (
+        f"drawtext=fontfile={font}:textfile={text_path}:expansion=none:fontcolor=0x{color[1:]}"
+        f":fontsize=h*{branding.get('text_size') or DEFAULT_TEXT_SIZE}"
+        f":x=w*{x}-text_w/2:y=h*{y}-text_h/2"
+    )
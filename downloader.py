@@ -0,0 +1,468 @@
+"""
+Streaming, resumable template downloader.
+
+Templates are written to disk in chunks instead of being held in memory:
+
+- Large files on servers that accept Range requests are split into parts and
+  fetched in parallel, each part written at its offset with os.pwrite.
+- Smaller files (or servers without Range support) stream sequentially.
+- Raw bytes land in <dest>.part next to a small <dest>.part.json state file,
+  so a dropped connection - or a failed job - resumes where it stopped as long
+  as the server's ETag/Last-Modified still matches (sent as If-Range).
+- gzip and zstd payloads (Content-Encoding or magic bytes) are decompressed
+  as the bytes arrive; the sha256 is computed over the decoded .blend.
+"""
+
+import hashlib
+import http.client
+import json
+import os
+import threading
+import urllib.request
+import urllib.error
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+USER_AGENT = "RunPod-Blender/1.0"
+CHUNK_SIZE = 1024 * 1024
+TIMEOUT = 120
+MAX_RETRIES = 3
+
+# Errors that mean "connection dropped" rather than "request rejected"
+_INTERRUPTED = (OSError, EOFError, http.client.HTTPException)
+
+# Files at least this large are fetched as parallel Range requests
+PARALLEL_MIN_BYTES = int(os.environ.get("DOWNLOAD_PARALLEL_MIN_BYTES", 32 * 1024 * 1024))
+PARALLEL_PART_BYTES = int(os.environ.get("DOWNLOAD_PARALLEL_PART_BYTES", 16 * 1024 * 1024))
+PARALLEL_WORKERS = int(os.environ.get("DOWNLOAD_PARALLEL_WORKERS", 4))
+
+GZIP_MAGIC = b"\x1f\x8b"
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+# =============================================================================
+# Decoding
+# =============================================================================
+class _GzipCodec:
+    def __init__(self):
+        self._obj = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+
+    def decompress(self, data: bytes) -> bytes:
+        out = []
+        while data:
+            out.append(self._obj.decompress(data))
+            # Concatenated gzip members - start a fresh decompressor on the rest
+            data = self._obj.unused_data if self._obj.eof else b""
+            if data:
+                self._obj = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+        return b"".join(out)
+
+    def finish(self) -> bytes:
+        if not self._obj.eof:
+            raise Exception("Truncated gzip stream")
+        return self._obj.flush()
+
+
+class _ZstdCodec:
+    def __init__(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception("zstd-compressed template requires the 'zstandard' package")
+        self._zstd = zstandard
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        out = []
+        while data:
+            out.append(self._obj.decompress(data))
+            # Multi-frame files (e.g. Blender's own compressed .blend) - continue past each frame
+            data = self._obj.unused_data if self._obj.eof else b""
+            if data:
+                self._obj = self._zstd.ZstdDecompressor().decompressobj()
+        return b"".join(out)
+
+    def finish(self) -> bytes:
+        return self._obj.flush()
+
+
+class StreamDecoder:
+    """
+    Incrementally decode raw download bytes and hash the decoded output.
+
+    The codec is picked from Content-Encoding, or sniffed from the first bytes.
+    Uncompressed data is only hashed - the caller renames the .part file into
+    place instead of copying it.
+    """
+
+    def __init__(self, dest_path: str, content_encoding: str = None):
+        self.dest_path = dest_path
+        self.content_encoding = (content_encoding or "").lower() or None
+        self.sha = hashlib.sha256()
+        self.size = 0
+        self.compression = None
+        self._codec = None
+        self._out = None
+        self._head = b""
+        self._started = False
+
+    @property
+    def identity(self) -> bool:
+        return self._started and self._codec is None
+
+    def _start(self, head: bytes):
+        self._started = True
+        if self.content_encoding in ("gzip", "x-gzip") or head.startswith(GZIP_MAGIC):
+            self.compression = "gzip"
+            self._codec = _GzipCodec()
+        elif self.content_encoding == "zstd" or head.startswith(ZSTD_MAGIC):
+            self.compression = "zstd"
+            self._codec = _ZstdCodec()
+        if self._codec:
+            self._out = open(self.dest_path, "wb")
+
+    def _emit(self, data: bytes):
+        if not data:
+            return
+        self.sha.update(data)
+        self.size += len(data)
+        if self._out:
+            self._out.write(data)
+
+    def feed(self, data: bytes):
+        if not self._started:
+            self._head += data
+            if len(self._head) < len(ZSTD_MAGIC):
+                return
+            data, self._head = self._head, b""
+            self._start(data)
+        self._emit(self._codec.decompress(data) if self._codec else data)
+
+    def finish(self):
+        if not self._started:
+            self._start(self._head)
+            self._emit(self._codec.decompress(self._head) if self._codec else self._head)
+        if self._codec:
+            self._emit(self._codec.finish())
+        self.close()
+
+    def close(self):
+        if self._out:
+            self._out.close()
+            self._out = None
+
+    def hexdigest(self) -> str:
+        return self.sha.hexdigest()
+
+
+# =============================================================================
+# Resume state
+# =============================================================================
+def _load_state(state_path: str, url: str) -> dict:
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return state if state.get("url") == url else None
+
+
+def _save_state(state_path: str, state: dict):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, state_path)
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# =============================================================================
+# HTTP
+# =============================================================================
+def _open(url: str, headers: dict):
+    """
+    Open url, returning None on 304 Not Modified.
+
+    Connection failures are raised as one of _INTERRUPTED so callers can
+    retry them; anything else is raised as a plain exception.
+    """
+    req = urllib.request.Request(url, headers=headers)
+    try:
+        return urllib.request.urlopen(req, timeout=TIMEOUT)
+    except urllib.error.HTTPError as e:
+        if e.code == 304:
+            return None
+        raise Exception(f"HTTP error downloading template: {e.code} {e.reason}")
+    except urllib.error.URLError as e:
+        if isinstance(e.reason, OSError):
+            raise ConnectionError(f"Connection error downloading template: {e.reason}")
+        raise Exception(f"URL error downloading template: {e.reason}")
+
+
+def _total_size(response) -> int:
+    """Full resource size from Content-Range (206) or Content-Length (200)."""
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        return int(total) if total.isdigit() else None
+    length = response.headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+
+def _range_start(response) -> int:
+    content_range = response.headers.get("Content-Range", "")
+    try:
+        return int(content_range.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return 0
+
+
+# =============================================================================
+# Download strategies
+# =============================================================================
+def _download_sequential(url, headers, response, total, part_path, state, decoder) -> int:
+    """
+    Stream a single response into part_path, feeding the decoder as bytes arrive.
+
+    On a dropped connection the request is retried from the last written byte
+    (when the server supports ranges). Returns bytes transferred this call.
+    """
+    offset = _range_start(response) if response.status == 206 else 0
+    mode = "r+b" if offset else "wb"
+    if not os.path.exists(part_path):
+        mode = "wb"
+
+    # Replay what an earlier attempt already stored so decoding stays in order
+    if offset:
+        with open(part_path, "rb") as f:
+            remaining = offset
+            while remaining:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    raise Exception("Partial download is shorter than expected")
+                decoder.feed(chunk)
+                remaining -= len(chunk)
+
+    transferred = 0
+    attempts = 0
+    with open(part_path, mode) as f:
+        f.seek(offset)
+        f.truncate()
+        while True:
+            try:
+                if response is None:
+                    response = _open(url, {
+                        **headers,
+                        "Range": f"bytes={offset}-",
+                        "If-Range": state["validator"],
+                    })
+                    if response is None or response.status != 206:
+                        if response is not None:
+                            response.close()
+                        raise Exception("Template changed on the server during download")
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    decoder.feed(chunk)
+                    offset += len(chunk)
+                    transferred += len(chunk)
+                if total is not None and offset < total:
+                    raise EOFError(f"connection closed at byte {offset} of {total}")
+                response.close()
+                return transferred
+            except _INTERRUPTED as e:
+                if response is not None:
+                    response.close()
+                    response = None
+                f.flush()
+                attempts += 1
+                if not state or attempts > MAX_RETRIES:
+                    raise Exception(f"Download interrupted after {offset} bytes: {e}")
+                print(f"Download interrupted at {offset} bytes ({e}), resuming ({attempts}/{MAX_RETRIES})")
+
+
+def _download_parallel(url, headers, total, part_path, state_path, state) -> tuple:
+    """
+    Fetch [0, total) as parallel Range requests written in place.
+
+    Completed parts are recorded in the state file so a later call only
+    fetches what is missing. Returns (bytes transferred, bytes resumed).
+    """
+    parts = [
+        (i, start, min(start + PARALLEL_PART_BYTES, total) - 1)
+        for i, start in enumerate(range(0, total, PARALLEL_PART_BYTES))
+    ]
+    done = set(state.get("done", []))
+    todo = [p for p in parts if p[0] not in done]
+    resumed = sum(end - start + 1 for index, start, end in parts if index in done)
+    print(f"Parallel download: {len(todo)}/{len(parts)} parts of {PARALLEL_PART_BYTES} bytes, "
+          f"{PARALLEL_WORKERS} workers")
+
+    fd = os.open(part_path, os.O_RDWR | os.O_CREAT, 0o644)
+    os.ftruncate(fd, total)
+    lock = threading.Lock()
+    transferred = [0]
+
+    def fetch_part(part):
+        index, start, end = part
+        position = start
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response = _open(url, {
+                    **headers,
+                    "Range": f"bytes={position}-{end}",
+                    "If-Range": state["validator"],
+                })
+                if response is None or response.status != 206:
+                    if response is not None:
+                        response.close()
+                    raise Exception("Template changed on the server during download")
+                with response:
+                    while position <= end:
+                        chunk = response.read(min(CHUNK_SIZE, end - position + 1))
+                        if not chunk:
+                            raise EOFError(f"connection closed at byte {position}")
+                        os.pwrite(fd, chunk, position)
+                        position += len(chunk)
+                        with lock:
+                            transferred[0] += len(chunk)
+                break
+            except _INTERRUPTED as e:
+                if attempt == MAX_RETRIES:
+                    raise Exception(f"Part {index} failed after {MAX_RETRIES} retries: {e}")
+                print(f"Part {index} interrupted at byte {position} ({e}), retrying")
+        with lock:
+            done.add(index)
+            state["done"] = sorted(done)
+            _save_state(state_path, state)
+
+    try:
+        with ThreadPoolExecutor(max_workers=PARALLEL_WORKERS) as pool:
+            for future in [pool.submit(fetch_part, p) for p in todo]:
+                future.result()
+    finally:
+        os.close(fd)
+    return transferred[0], resumed
+
+
+def _decode_file(part_path: str, decoder: StreamDecoder):
+    with open(part_path, "rb") as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            decoder.feed(chunk)
+
+
+def download(url: str, dest_path: str, headers: dict = None, expected_sha256: str = None) -> dict:
+    """
+    Download url to dest_path, streaming to disk and decompressing on the fly.
+
+    Args:
+        url: Template URL
+        dest_path: Where the decoded file is written
+        headers: Extra request headers (e.g. If-None-Match for cache revalidation)
+        expected_sha256: Optional hex digest the decoded file must match
+
+    Returns {"not_modified": True} on 304, otherwise a dict with sha256, size,
+    etag, last_modified, compression, bytes_downloaded, bytes_resumed and parallel.
+    Raises exception on failure; partial data is kept for the next attempt.
+    """
+    part_path = dest_path + ".part"
+    state_path = part_path + ".json"
+    base_headers = {"User-Agent": USER_AGENT, **(headers or {})}
+
+    state = _load_state(state_path, url)
+    if state and not os.path.exists(part_path):
+        state = None
+
+    request_headers = dict(base_headers)
+    resume_from = 0
+    if state:
+        request_headers["If-Range"] = state["validator"]
+        if state["mode"] == "sequential":
+            resume_from = os.path.getsize(part_path)
+    request_headers["Range"] = f"bytes={resume_from}-"
+
+    print(f"Downloading template from: {url}")
+    response = _open(url, request_headers)
+    if response is None:
+        return {"not_modified": True}
+
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    validator = etag or last_modified
+    encoding = response.headers.get("Content-Encoding")
+    total = _total_size(response)
+    ranged = response.status == 206 and validator is not None
+
+    if not ranged or (state and state["validator"] != validator):
+        # Server ignored the range or the file changed - start over
+        state = None
+        if response.status == 206 and _range_start(response) > 0:
+            response.close()
+            response = _open(url, {**base_headers, "Range": "bytes=0-"})
+            if response is None:
+                return {"not_modified": True}
+    bytes_resumed = 0
+    parallel = (
+        ranged and not encoding and total is not None and total >= PARALLEL_MIN_BYTES
+        and (state is None or state["mode"] == "parallel")
+    )
+
+    if ranged and state is None:
+        state = {"url": url, "validator": validator, "mode": "parallel" if parallel else "sequential", "done": []}
+        _save_state(state_path, state)
+
+    decoder = StreamDecoder(dest_path, encoding)
+    try:
+        if parallel:
+            response.close()
+            bytes_downloaded, bytes_resumed = _download_parallel(
+                url, base_headers, total, part_path, state_path, state
+            )
+            _decode_file(part_path, decoder)
+        else:
+            if response.status == 206:
+                bytes_resumed = _range_start(response)
+            bytes_downloaded = _download_sequential(
+                url, base_headers, response, total, part_path, state, decoder
+            )
+        decoder.finish()
+    except Exception:
+        decoder.close()
+        _remove(dest_path)
+        if state is None:
+            # Nothing resumable - don't leave garbage behind
+            _remove(part_path)
+        raise
+
+    digest = decoder.hexdigest()
+    if expected_sha256 and digest != expected_sha256.lower():
+        _remove(part_path, state_path, dest_path)
+        raise Exception(f"Template checksum mismatch: expected {expected_sha256}, got {digest}")
+
+    if decoder.identity:
+        os.replace(part_path, dest_path)
+    _remove(part_path, state_path)
+
+    print(f"Downloaded template: {decoder.size} bytes"
+          f" ({bytes_downloaded} transferred, {bytes_resumed} resumed"
+          f"{', ' + decoder.compression if decoder.compression else ''}"
+          f"{', parallel' if parallel else ''}) -> {dest_path}")
+    return {
+        "sha256": digest,
+        "size": decoder.size,
+        "etag": etag,
+        "last_modified": last_modified,
+        "compression": decoder.compression,
+        "bytes_downloaded": bytes_downloaded,
+        "bytes_resumed": bytes_resumed,
+        "parallel": parallel,
+    }
@@ -0,0 +1,246 @@
+"""
+Video encoder selection for render_blend.py.
+
+A job asks for a codec and, optionally, quality settings:
+
+    codec           h264 (default), hevc or av1
+    encoder         "auto" (default) or an ffmpeg encoder name, e.g. libx264
+    preset          x264-style speed preset: ultrafast ... veryslow (default fast)
+    crf             Constant quality (default depends on the encoder)
+    bitrate         Target bitrate instead of crf, e.g. "8M"
+    encode_threads  ffmpeg threads (0 = ffmpeg decides)
+    gop             Keyframe interval in frames
+
+"auto" takes the first encoder of the codec's chain that actually works on
+this machine - the GPU's NVENC first, so the encode doesn't compete with
+Cycles for host CPU, then the CPU encoders:
+
+    h264   h264_nvenc -> libx264
+    hevc   hevc_nvenc -> libx265
+    av1    av1_nvenc  -> libsvtav1 -> libaom-av1
+
+An ffmpeg build listing an NVENC encoder doesn't mean there is a GPU (or a
+driver) to run it, so every candidate is probed with a tiny test encode. The
+result is saved to ENCODER_PROBE_FILE for later Blender launches on the
+worker. Set ENCODER_DISABLE=h264_nvenc,... to rule encoders out, e.g. to
+exercise the fallback on a GPU machine.
+
+    python encoders.py [codec]     # print the probe and the chosen encoder
+
+Used from render_blend.py inside Blender, so it must stay dependency-free.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+FFMPEG = os.environ.get("FFMPEG_BINARY", "ffmpeg")
+ENCODER_PROBE_FILE = os.environ.get("ENCODER_PROBE_FILE", "/tmp/ffmpeg_encoder_probe.json")
+ENCODER_DISABLE = {name for name in os.environ.get("ENCODER_DISABLE", "").split(",") if name}
+
+CODECS = {
+    "h264": ("h264_nvenc", "libx264"),
+    "hevc": ("hevc_nvenc", "libx265"),
+    "av1": ("av1_nvenc", "libsvtav1", "libaom-av1"),
+}
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+
+# Same visual quality is a different number per encoder
+DEFAULT_CRF = {"libx264": 23, "libx265": 28, "libsvtav1": 35, "libaom-av1": 35, "nvenc": 23}
+
+# x264 preset -> NVENC p1 (fastest) .. p7, SVT-AV1 13 (fastest) .. 0, libaom cpu-used 8 .. 0
+_NVENC_PRESET = dict(zip(PRESETS, ("p1", "p1", "p2", "p3", "p4", "p5", "p6", "p7", "p7")))
+_SVTAV1_PRESET = dict(zip(PRESETS, ("12", "11", "10", "9", "8", "6", "4", "2", "1")))
+_AOM_CPU_USED = dict(zip(PRESETS, ("8", "8", "7", "6", "5", "4", "3", "2", "1")))
+
+_BITRATE = re.compile(r"^\d+(\.\d+)?[kKmM]?$")
+_ENCODER_LINE = re.compile(r"^\s*V\S*\s+(\S+)")
+_PROGRESS = re.compile(r"frame=\s*(\d+)\s+fps=\s*([\d.]+)")
+
+_probe = None
+
+
+def _ffmpeg_id() -> str:
+    """Identifies the ffmpeg binary, so a probe is redone when it changes."""
+    path = shutil.which(FFMPEG) or FFMPEG
+    try:
+        return f"{os.path.realpath(path)}:{os.path.getmtime(path)}"
+    except OSError:
+        return path
+
+
+def listed_encoders() -> set:
+    """Video encoders this ffmpeg build lists."""
+    result = subprocess.run([FFMPEG, "-hide_banner", "-encoders"], capture_output=True, text=True, timeout=30)
+    names = set()
+    for line in result.stdout.splitlines():
+        match = _ENCODER_LINE.match(line)
+        if match and match.group(1) != "=":
+            names.add(match.group(1))
+    return names
+
+
+def test_encode(encoder: str) -> bool:
+    """Encode a few frames of a test pattern; False if the encoder can't run here."""
+    cmd = [
+        FFMPEG, "-hide_banner", "-loglevel", "error",
+        "-f", "lavfi", "-i", "color=c=black:s=256x256:r=24:d=0.25",
+        "-c:v", encoder, "-pix_fmt", "yuv420p", "-f", "null", "-",
+    ]
+    try:
+        return subprocess.run(cmd, capture_output=True, text=True, timeout=60).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+
+def probe() -> dict:
+    """
+    {"ffmpeg": id, "working": [encoder, ...]} for every encoder in CODECS.
+
+    Cached in memory and in ENCODER_PROBE_FILE (redone when ffmpeg changes).
+    """
+    global _probe
+    ffmpeg_id = _ffmpeg_id()
+    if _probe and _probe["ffmpeg"] == ffmpeg_id:
+        return _probe
+    try:
+        with open(ENCODER_PROBE_FILE) as f:
+            cached = json.load(f)
+        if cached.get("ffmpeg") == ffmpeg_id:
+            _probe = cached
+            return _probe
+    except (OSError, ValueError):
+        pass
+
+    listed = listed_encoders()
+    candidates = [name for chain in CODECS.values() for name in chain if name in listed]
+    _probe = {"ffmpeg": ffmpeg_id, "working": [name for name in candidates if test_encode(name)]}
+    print(f"Encoder probe: {_probe['working']} work (listed: {sorted(set(candidates))})")
+    try:
+        tmp_path = f"{ENCODER_PROBE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(_probe, f)
+        os.replace(tmp_path, ENCODER_PROBE_FILE)
+    except OSError as e:
+        print(f"Could not save encoder probe: {e}")
+    return _probe
+
+
+def validate_settings(settings: dict) -> str:
+    """Check a job's (or a rendition's) codec and encoder settings. Returns an error message or None."""
+    codec = settings.get("codec") or "h264"
+    if not isinstance(codec, str) or codec not in CODECS:
+        return f"Unknown codec: {codec}. Available: {list(CODECS)}"
+    encoder = settings.get("encoder")
+    if encoder is not None and not isinstance(encoder, str):
+        return f"encoder must be \"auto\" or an ffmpeg encoder name, got {encoder!r}"
+    preset = settings.get("preset")
+    if preset is not None and (not isinstance(preset, str) or preset not in PRESETS):
+        return f"Unknown preset: {preset}. Available: {list(PRESETS)}"
+    if settings.get("crf") is not None and settings.get("bitrate"):
+        return "Set either crf or bitrate, not both"
+    for key in ("crf", "encode_threads", "gop"):
+        value = settings.get(key)
+        if value is None:
+            continue
+        if not isinstance(value, int) or isinstance(value, bool):
+            return f"{key} must be an integer, got {value!r}"
+        if value < 0:
+            return f"{key} must not be negative"
+    bitrate = settings.get("bitrate")
+    if bitrate and (isinstance(bitrate, bool) or not _BITRATE.match(str(bitrate))):
+        return f"bitrate must be a number of bits/s, e.g. \"8M\", got {bitrate!r}"
+    return None
+
+
+def select_encoder(codec: str = "h264", requested: str = "auto", working=None) -> dict:
+    """
+    Pick the encoder for codec.
+
+    Args:
+        codec: h264, hevc or av1
+        requested: "auto" or an encoder name (used if it works, else the chain applies)
+        working: Encoders known to work (default: probe())
+
+    Returns {"codec", "encoder", "fallback", "reason"}; fallback is True when a
+    preferred encoder (the requested one, or NVENC) was unavailable.
+    Raises RuntimeError if nothing in the chain works.
+    """
+    if codec not in CODECS:
+        raise RuntimeError(f"Unknown codec: {codec}. Available: {list(CODECS)}")
+    if working is None:
+        working = probe()["working"]
+    usable = [name for name in working if name not in ENCODER_DISABLE]
+
+    chain = list(CODECS[codec])
+    if requested and requested != "auto":
+        chain = [requested] + [name for name in chain if name != requested]
+    for position, encoder in enumerate(chain):
+        if encoder in usable:
+            skipped = chain[:position]
+            return {
+                "codec": codec,
+                "encoder": encoder,
+                "fallback": bool(skipped),
+                "reason": f"{', '.join(skipped)} unavailable" if skipped else None,
+            }
+    raise RuntimeError(f"No working {codec} encoder (tried {', '.join(chain)})")
+
+
+def video_args(encoder: str, preset: str = None, crf: int = None, bitrate: str = None,
+               threads: int = None, gop: int = None) -> list:
+    """ffmpeg output arguments for encoder with the given quality settings."""
+    preset = preset or "fast"
+    if preset not in PRESETS:
+        raise RuntimeError(f"Unknown preset: {preset}. Available: {list(PRESETS)}")
+
+    args = ["-c:v", encoder]
+    nvenc = encoder.endswith("_nvenc")
+    if nvenc:
+        args += ["-preset", _NVENC_PRESET[preset]]
+    elif encoder == "libsvtav1":
+        args += ["-preset", _SVTAV1_PRESET[preset]]
+    elif encoder == "libaom-av1":
+        args += ["-cpu-used", _AOM_CPU_USED[preset], "-row-mt", "1"]
+    else:
+        args += ["-preset", preset]
+
+    if bitrate:
+        args += ["-b:v", str(bitrate)]
+        if nvenc:
+            args += ["-rc", "vbr"]
+    else:
+        crf = crf if crf is not None else DEFAULT_CRF["nvenc" if nvenc else encoder]
+        if nvenc:
+            # Constant quality: -cq plays the role of crf, with no bitrate cap
+            args += ["-rc", "vbr", "-cq", str(crf), "-b:v", "0"]
+        else:
+            args += ["-crf", str(crf)]
+            if encoder == "libaom-av1":
+                args += ["-b:v", "0"]
+
+    if threads:
+        args += ["-threads", str(threads)]
+    if gop:
+        args += ["-g", str(gop)]
+    if encoder in ("libx265", "hevc_nvenc"):
+        # Playable in QuickTime/Safari
+        args += ["-tag:v", "hvc1"]
+    return args + ["-pix_fmt", "yuv420p"]
+
+
+def encode_fps(ffmpeg_output: str) -> float:
+    """Final encode speed from ffmpeg's progress lines, or None."""
+    matches = _PROGRESS.findall(ffmpeg_output or "")
+    # ffmpeg reports fps=0.0 for encodes that finish within its first progress interval
+    if not matches or not float(matches[-1][1]):
+        return None
+    return float(matches[-1][1])
+
+
+if __name__ == "__main__":
+    codec = sys.argv[1] if len(sys.argv) > 1 else "h264"
+    print(json.dumps({"probe": probe(), "selected": select_encoder(codec)}, indent=2))
@@ -0,0 +1,144 @@
+"""
+Per-frame render cache.
+
+Frames are pixel-identical across jobs as long as the template and every
+render-affecting setting match - the frame range is not one of them. So
+rendered PNGs are kept per render key:
+
+    <root>/<key>/frame_0001.png ...
+
+(frame_0001.exr ... for the multilayer base layers of branded renders, see
+branding.py).
+
+Before rendering, cached frames are linked into the job's frames directory
+and Blender is told not to overwrite existing files, so only the missing
+frames are rendered. Extending an 8 s clip to 10 s renders just the last 2 s.
+Every frame is also added to the cache as soon as Blender writes it, and
+chunked mode keeps its encoded segments there too:
+
+    <root>/<key>/segment_0001_0048_<encode settings hash>.mp4 ...
+
+so with the cache on a persistent volume a render that times out or whose
+worker is preempted is a checkpoint: the retry restores the finished frames
+and segments and picks up where it stopped. Whole keys are evicted once they
+are older than max_age, then least recently used first once the cache
+exceeds max_bytes.
+
+Used from render_blend.py inside Blender, so it must stay dependency-free.
+"""
+
+import os
+import shutil
+import time
+
+
+def frame_file(frame: int, ext: str = "png") -> str:
+    return f"frame_{frame:04d}.{ext}"
+
+
+def segment_file(start: int, end: int, tag: str) -> str:
+    return f"segment_{start:04d}_{end:04d}_{tag}.mp4"
+
+
+def _link_or_copy(src: str, dst: str):
+    tmp_path = dst + ".tmp"
+    try:
+        os.link(src, tmp_path)
+    except OSError:
+        # Different filesystem (e.g. cache on a network volume)
+        shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class FrameCache:
+    def __init__(self, root: str, key: str, max_bytes: int, max_age: float = 0, ext: str = "png"):
+        """
+        Args:
+            root: Cache directory (shared by all keys)
+            key: Render key of this job's frames
+            max_bytes: Size cap for the whole cache
+            max_age: Seconds since last use after which a key is dropped (0 = no limit)
+            ext: Frame file extension
+        """
+        self.root = root
+        self.key = key
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.ext = ext
+        self.key_dir = os.path.join(root, key)
+
+    def restore(self, frames_dir: str, frames) -> list:
+        """Link cached frames into frames_dir. Returns the frame numbers reused."""
+        if not os.path.isdir(self.key_dir):
+            return []
+        # Directory mtime is the LRU clock for eviction
+        os.utime(self.key_dir)
+
+        reused = []
+        for frame in frames:
+            cached = os.path.join(self.key_dir, frame_file(frame, self.ext))
+            if os.path.exists(cached):
+                _link_or_copy(cached, os.path.join(frames_dir, frame_file(frame, self.ext)))
+                reused.append(frame)
+        return reused
+
+    def store_frame(self, frames_dir: str, frame: int, replace: bool = False) -> bool:
+        """Checkpoint one rendered frame. Returns True if it was added."""
+        rendered = os.path.join(frames_dir, frame_file(frame, self.ext))
+        cached = os.path.join(self.key_dir, frame_file(frame, self.ext))
+        if not os.path.exists(rendered) or (os.path.exists(cached) and not replace):
+            return False
+        os.makedirs(self.key_dir, exist_ok=True)
+        _link_or_copy(rendered, cached)
+        return True
+
+    def store(self, frames_dir: str, frames, replace: bool = False):
+        """Add rendered frames from frames_dir to the cache, then enforce the size cap."""
+        os.makedirs(self.key_dir, exist_ok=True)
+        stored = sum(self.store_frame(frames_dir, frame, replace) for frame in frames)
+        os.utime(self.key_dir)
+        print(f"Frame cache: stored {stored} new frames under {self.key[:12]}")
+        self.evict()
+
+    def restore_segment(self, start: int, end: int, tag: str, path: str) -> bool:
+        """Link a checkpointed encoded segment (tag = encode settings) to path. False if there is none."""
+        cached = os.path.join(self.key_dir, segment_file(start, end, tag))
+        if not os.path.exists(cached):
+            return False
+        _link_or_copy(cached, path)
+        return True
+
+    def store_segment(self, path: str, start: int, end: int, tag: str):
+        os.makedirs(self.key_dir, exist_ok=True)
+        _link_or_copy(path, os.path.join(self.key_dir, segment_file(start, end, tag)))
+
+    def evict(self):
+        evict(self.root, self.max_bytes, self.max_age, keep=self.key)
+
+
+def evict(root: str, max_bytes: int, max_age: float = 0, keep: str = None):
+    """
+    Garbage-collect the cache: drop whole keys unused for max_age seconds,
+    then least recently used first until it fits in max_bytes.
+    """
+    if not os.path.isdir(root):
+        return
+    entries = []
+    total = 0
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not os.path.isdir(path):
+            continue
+        size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+        entries.append((os.path.getmtime(path), name, path, size))
+        total += size
+
+    expired = time.time() - max_age if max_age else None
+    for mtime, name, path, size in sorted(entries):
+        if total <= max_bytes and (expired is None or mtime >= expired):
+            break
+        if name == keep:
+            continue
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        print(f"Frame cache: evicted {name[:12]} ({size} bytes)")
@@ -0,0 +1,199 @@
+"""
+Per-frame render telemetry.
+
+Inside Blender, FrameTelemetry hooks bpy.app.handlers:
+
+    render_pre    frame starts (wall clock)
+    render_stats  every status line Cycles reports, e.g.
+                  "Fra:12 Mem:812.3M (Peak 1024.0M) | Time:00:01.23 | ... | Building BVH"
+                  "... | Sample 64/128"
+    render_post   frame done
+
+and records per frame: wall seconds, samples reached, peak memory, and the
+time spent before the first sample (scene sync, BVH build, kernel loading),
+with BVH and kernel time also broken out. The records are written to a JSON
+sidecar; the handler reads it back and summarize() reduces it to
+p50/p95/max per metric plus the slowest and outlier frames.
+
+Used from render_blend.py inside Blender, so it must stay dependency-free.
+"""
+
+import contextlib
+import json
+import os
+import re
+import time
+
+_PEAK_MEM = re.compile(r"Peak[: ]+([\d.]+)([KMG])")
+_SAMPLE = re.compile(r"Sample (\d+)/(\d+)")
+_MB = {"K": 1 / 1024, "M": 1, "G": 1024}
+
+# A frame slower than this multiple of the median is reported as an outlier
+OUTLIER_FACTOR = 3.0
+
+
+def _status_kind(stats: str) -> str:
+    """Which setup phase a render_stats line belongs to."""
+    status = stats.rsplit("|", 1)[-1].lower()
+    if _SAMPLE.search(stats) or "denois" in status:
+        return "sampling"
+    if "bvh" in status:
+        return "bvh"
+    if "kernel" in status:
+        return "kernel"
+    return "sync"
+
+
+class FrameTelemetry:
+    """Collects one record per rendered frame through Blender's render handlers."""
+
+    def __init__(self, scene):
+        self.scene = scene
+        self.frames = []
+        self.current = None
+        self._last_stats_time = None
+        self._last_kind = None
+
+    def register(self, handlers):
+        """Add the callbacks to bpy.app.handlers."""
+        handlers.render_pre.append(self.on_render_pre)
+        handlers.render_post.append(self.on_render_post)
+        handlers.render_stats.append(self.on_render_stats)
+
+    def unregister(self, handlers):
+        for name, callback in (("render_pre", self.on_render_pre), ("render_post", self.on_render_post),
+                               ("render_stats", self.on_render_stats)):
+            if callback in getattr(handlers, name):
+                getattr(handlers, name).remove(callback)
+
+    @contextlib.contextmanager
+    def paused(self, handlers):
+        """Leave renders inside the block out of the records."""
+        self.unregister(handlers)
+        try:
+            yield
+        finally:
+            self.register(handlers)
+
+    def on_render_pre(self, scene, *args):
+        now = time.perf_counter()
+        self.current = {
+            "frame": scene.frame_current,
+            "started": now,
+            "seconds": None,
+            "setup_seconds": None,
+            "bvh_seconds": 0.0,
+            "kernel_seconds": 0.0,
+            "samples": 0,
+            "peak_mem_mb": None,
+        }
+        self._last_stats_time = now
+        self._last_kind = "sync"
+
+    def on_render_stats(self, stats, *args):
+        frame = self.current
+        if frame is None:
+            return
+        now = time.perf_counter()
+        # Time since the previous status line belongs to the previous status
+        elapsed = now - self._last_stats_time
+        if self._last_kind in ("bvh", "kernel"):
+            frame[f"{self._last_kind}_seconds"] += elapsed
+        self._last_stats_time = now
+
+        kind = _status_kind(stats)
+        if kind == "sampling" and frame["setup_seconds"] is None:
+            frame["setup_seconds"] = now - frame["started"]
+        self._last_kind = kind
+
+        sample = _SAMPLE.search(stats)
+        if sample:
+            frame["samples"] = max(frame["samples"], int(sample.group(1)))
+        peak = _PEAK_MEM.search(stats)
+        if peak:
+            peak_mb = float(peak.group(1)) * _MB[peak.group(2)]
+            frame["peak_mem_mb"] = max(frame["peak_mem_mb"] or 0.0, peak_mb)
+
+    def on_render_post(self, scene, *args):
+        frame = self.current
+        if frame is None:
+            return
+        frame["seconds"] = time.perf_counter() - frame.pop("started")
+        if not frame["samples"]:
+            # No sample lines seen (e.g. EEVEE): assume the configured count
+            frame["samples"] = getattr(getattr(scene, "cycles", None), "samples", 0)
+        for key in ("seconds", "setup_seconds", "bvh_seconds", "kernel_seconds", "peak_mem_mb"):
+            if frame[key] is not None:
+                frame[key] = round(frame[key], 4)
+        self.frames.append(frame)
+        self.current = None
+
+    def write(self, path: str, **meta):
+        """Write the per-frame records (plus meta) as a JSON sidecar."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({**meta, "frames": self.frames}, f)
+        os.replace(tmp_path, path)
+
+
+# =============================================================================
+# Summary (handler side)
+# =============================================================================
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of values (which must not be empty)."""
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def summarize(frames: list) -> dict:
+    """p50/p95/max of every per-frame metric, plus the slowest and outlier frames."""
+    if not frames:
+        return {"frames": 0}
+
+    summary = {"frames": len(frames)}
+    for key in ("seconds", "setup_seconds", "bvh_seconds", "kernel_seconds", "samples", "peak_mem_mb"):
+        values = [f[key] for f in frames if f.get(key) is not None]
+        if values:
+            summary[key] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": max(values),
+            }
+
+    timed = [f for f in frames if f.get("seconds") is not None]
+    slowest = sorted(timed, key=lambda f: f["seconds"], reverse=True)[:3]
+    summary["slowest_frames"] = [{"frame": f["frame"], "seconds": f["seconds"]} for f in slowest]
+    if timed:
+        median = percentile([f["seconds"] for f in timed], 50)
+        summary["outlier_frames"] = [
+            f["frame"] for f in timed if median and f["seconds"] > OUTLIER_FACTOR * median
+        ]
+    return summary
+
+
+def load_frames(path: str) -> list:
+    """Per-frame records of a sidecar written by FrameTelemetry.write(), or None if it's missing/unreadable."""
+    try:
+        with open(path) as f:
+            return json.load(f).get("frames", [])
+    except (OSError, ValueError):
+        return None
+
+
+def merge_frames(path: str, frames: list):
+    """Put frames recorded by earlier Blender runs of the same job in front of a sidecar's own."""
+    with open(path) as f:
+        data = json.load(f)
+    data["frames"] = frames + data.get("frames", [])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def load_summary(path: str) -> dict:
+    """Summary of a sidecar written by FrameTelemetry.write(), or None if it's missing/unreadable."""
+    frames = load_frames(path)
+    return summarize(frames) if frames is not None else None
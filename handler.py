@@ -9,21 +9,42 @@ Request format:
         "template": "ai_cpu_activation",  # Use baked-in template by name
         # OR
         "template_url": "https://raw.githubusercontent.com/.../template.blend",  # Download at runtime
+        "template_sha256": "...",  # Optional - verify (and cache-match) the downloaded template
 
         "duration": 8,
         "resolution": [1920, 1080],
         "samples": 128,
-        "config": {}  # Optional template-specific config
+
+        # Optional - render only part of the animation and return that segment
+        "frame_start": 1, "frame_end": 96,
+        # OR
+        "shard_index": 0, "shard_count": 4,
+
+        # Optional - several sizes/crops/codecs from one render; the response then has "outputs"
+        "outputs": [{"name": "vertical", "resolution": [1080, 1920], "crop": "9:16"}, ...],
+
+        "output_mode": "auto",  # Optional - "inline" (base64), "s3" (upload, return URL) or "auto"
+        "cache": "use",  # Optional - render-result cache: "use", "refresh" (re-render, store) or "bypass"
+
+        "config": {}  # Optional template-specific config, e.g. {"encode_mode": "stream"}
     }
 }
 
 Response format:
 {
     "output": {
-        "video_base64": "...",  # Base64 encoded MP4
+        "video_base64": "...",  # Base64 encoded MP4 (inline output)
+        # OR (s3 output)
+        "video_url": "https://...", "video_key": "renders/<job id>.mp4",
+        "video_sha256": "...",
         "duration": 8,
         "resolution": [1920, 1080],
-        "render_time_seconds": 180
+        "render_time_seconds": 180,
+        "frame_start": 1, "frame_end": 96,  # Frames actually rendered
+        "template_cache": {"status": "hit", "bytes_saved": 123456789, ...},  # template_url only
+        "render_cache": {"status": "hit", "key": "...", "backend": "local"},
+        "timings": {"template": 0.4, "check_gpu": 0.05, "blender_startup": 3.1, "render": 170.2,
+                    "encode": 4.8, "deliver": 0.9, "total": 181.3, ...}  # Seconds per phase
     }
 }
 """
@@ -31,18 +52,44 @@ Response format:
 import runpod
 import subprocess
 import base64
+import hashlib
 import time
 import os
 import json
+import socket
 import tempfile
-import urllib.request
-import urllib.error
+import threading
 from pathlib import Path
 
-# Blend file templates (branded versions)
-TEMPLATES = {
-    "ai_cpu_activation": "/workspace/templates/ai_cpu_activation_branded.blend",
-}
+import branding
+import encoders
+import frame_cache
+import renditions
+import storage
+from frame_telemetry import load_frames, load_summary, merge_frames
+from metrics import PhaseTimer, record_job, record_warmup, start_metrics_server
+from render_predictor import append_history, frame_range, frames_rendered, history_record, load_history, predict, \
+    split_ranges
+from render_progress import RenderProgress
+from result_cache import (CACHE_MODES, file_hash, frame_cache_key, get_render_cache, render_cache_key,
+                          rendition_cache_key)
+from template_cache import get_template_cache
+from template_registry import load_registry, validate_request, verify
+from template_variants import get_variant_cache, resolve_params
+from warm_blender import WarmBlender
+
+# Blend file templates (branded versions): name -> manifest, see template_registry.py
+TEMPLATES = load_registry()
+DEFAULT_TEMPLATE = "ai_cpu_activation"
+
+# Overridable so the pipeline can run against stub executables
+BLENDER_BINARY = os.environ.get("BLENDER_BINARY", "blender")
+RENDER_SCRIPT = os.environ.get("RENDER_SCRIPT", "/workspace/render_blend.py")
+USE_XVFB = os.environ.get("USE_XVFB", "1") == "1"
+
+# Keep one Blender process alive per worker and send it jobs over a socket
+BLENDER_WARM = os.environ.get("BLENDER_WARM", "0") == "1"
+_warm_blender = None
 
 # No defaults - all parameters must be passed from calling script
 # This ensures single source of truth and no hidden behavior
@@ -51,67 +98,332 @@ DEFAULT_CONFIG = {
     "resolution": None,    # Required from caller
     "samples": None,       # Required from caller
     "fps": None,           # Required from caller
+    "frame_start": None,   # None = whole animation
+    "frame_end": None,
+    "shard_index": None,   # Alternative to frame_start/frame_end
+    "shard_count": None,
+    "noise_threshold": None,   # Adaptive sampling; "samples" is then the maximum
+    "min_samples": None,
+    "frame_time_limit": None,  # Seconds of sampling per frame
+    "time_budget": None,       # Seconds for rendering all frames of the job
+    "quality": None,           # "draft" for a cheap proxy (see config.draft_* below)
+    "frame_step": None,        # Render every Nth frame: drafts drop the rest, final renders interpolate them
+    "codec": None,             # h264 (default), hevc or av1; the encoder is picked per worker
+    "outputs": None,           # Renditions encoded from the one render (see renditions.py)
 }
 
+SHARD_KEYS = ("frame_start", "frame_end", "shard_index", "shard_count")
+SAMPLING_KEYS = ("noise_threshold", "min_samples", "frame_time_limit", "time_budget")
+# Draft tier and temporal subsampling: "quality"/"frame_step" are top-level inputs, the rest go in "config"
+QUALITIES = ("final", "draft")
+QUALITY_KEYS = ("quality", "draft_engine", "draft_scale", "frame_step", "interpolation_check", "output_format")
+# Video encoder: "codec" is a top-level input, the rest go in "config"
+ENCODE_KEYS = ("codec", "encoder", "preset", "crf", "bitrate", "encode_threads", "gop")
 
-def download_template(url: str) -> str:
-    """
-    Download a .blend template from URL to a temp file.
+# How the MP4 gets back to the caller. "auto" inlines small files as base64 and
+# uploads anything larger than INLINE_MAX_BYTES to the configured bucket.
+OUTPUT_MODES = ("inline", "s3", "auto")
+DEFAULT_OUTPUT_MODE = os.environ.get("OUTPUT_MODE") or ("auto" if storage.storage_configured() else "inline")
+INLINE_MAX_BYTES = int(os.environ.get("INLINE_MAX_BYTES", 10 * 1024 * 1024))
 
-    Returns path to downloaded file.
-    Raises exception on failure.
-    """
-    print(f"Downloading template from: {url}")
+# Per-frame render cache shared by all jobs on this worker ("" disables it). Frames
+# are added as they render, so on a persistent volume (e.g. /runpod-volume/frame_cache)
+# it doubles as the checkpoint that timed-out or preempted renders resume from.
+FRAME_CACHE_DIR = os.environ.get("FRAME_CACHE_DIR", "/tmp/frame_cache")
+FRAME_CACHE_MAX_BYTES = int(os.environ.get("FRAME_CACHE_MAX_BYTES", 50 * 1024 ** 3))
+FRAME_CACHE_MAX_AGE = float(os.environ.get("FRAME_CACHE_MAX_AGE", 7 * 24 * 3600))
 
-    # Create temp file with .blend extension
-    fd, temp_path = tempfile.mkstemp(suffix=".blend")
-    os.close(fd)
+# Wall-clock limit for one Blender render
+RENDER_TIMEOUT = int(os.environ.get("RENDER_TIMEOUT", 3600))
 
-    try:
-        # Download with timeout
-        req = urllib.request.Request(url, headers={"User-Agent": "RunPod-Blender/1.0"})
-        with urllib.request.urlopen(req, timeout=120) as response:
-            content = response.read()
-
-        # Write to temp file
-        with open(temp_path, "wb") as f:
-            f.write(content)
-
-        file_size = os.path.getsize(temp_path)
-        print(f"Downloaded template: {file_size} bytes -> {temp_path}")
-        return temp_path
-
-    except urllib.error.HTTPError as e:
-        os.remove(temp_path)
-        raise Exception(f"HTTP error downloading template: {e.code} {e.reason}")
-    except urllib.error.URLError as e:
-        os.remove(temp_path)
-        raise Exception(f"URL error downloading template: {e.reason}")
-    except Exception as e:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
-        raise Exception(f"Failed to download template: {e}")
+# Admission control (see admit()): what happens to a job predicted to run past
+# RENDER_TIMEOUT - "reject" it, "downgrade" it to a time_budget that fits, "split" it
+# into frame-range renders that fit and encode the cached frames at the end, or "off"
+ADMISSION_POLICIES = ("reject", "downgrade", "split", "off")
+ADMISSION_POLICY = os.environ.get("ADMISSION_POLICY", "split")
+# Share of RENDER_TIMEOUT a predicted render has to fit in
+ADMISSION_HEADROOM = float(os.environ.get("ADMISSION_HEADROOM", 0.9))
+# $ per second of this worker's GPU, for the cost in estimates (0 = not reported)
+GPU_COST_PER_SECOND = float(os.environ.get("GPU_COST_PER_SECOND", 0))
+
+# Per-frame telemetry sidecars (<job id>.json), newest TELEMETRY_KEEP kept ("" disables)
+TELEMETRY_DIR = os.environ.get("TELEMETRY_DIR", "/tmp/render_telemetry")
+TELEMETRY_KEEP = int(os.environ.get("TELEMETRY_KEEP", 500))
+
+# One-time worker warmup before the first job (see warmup())
+WARMUP = os.environ.get("WARMUP", "1") == "1"
+WARMUP_TEMPLATE_URLS = [url for url in os.environ.get("WARMUP_TEMPLATE_URLS", "").split(",") if url]
+# Written by render_blend.py's first full GPU probe, read by every later Blender launch
+DEVICE_PROBE_FILE = os.environ.get("BLENDER_DEVICE_PROBE", "/tmp/blender_device_probe.json")
+
+# Smallest render that still initializes the GPU and loads Cycles kernels
+WARMUP_CONFIG = {
+    **DEFAULT_CONFIG,
+    "resolution": [64, 64],
+    "samples": 1,
+    "fps": 24,
+    "frame_start": 1,
+    "frame_end": 1,
+    "encode_mode": "stream",
+}
+
+_gpu_name = None  # nvidia-smi result, probed once per worker ("" = no GPU)
+_gpu_memory_mb = None
+_warmup_report = None
 
 
 def check_gpu():
-    """Check if GPU is available."""
+    """
+    Check if GPU is available. nvidia-smi runs once per worker; the answer
+    (name, and the smallest GPU's memory for admission control) is cached.
+    """
+    global _gpu_name, _gpu_memory_mb
+    if _gpu_name is not None:
+        return bool(_gpu_name)
+
+    _gpu_name = ""
     try:
         result = subprocess.run(
-            ["nvidia-smi", "--query-gpu=name", "--format=csv,noheader"],
+            ["nvidia-smi", "--query-gpu=name,memory.total", "--format=csv,noheader,nounits"],
             capture_output=True,
             text=True,
             timeout=10
         )
         if result.returncode == 0:
-            gpu_name = result.stdout.strip()
-            print(f"GPU detected: {gpu_name}")
-            return True
+            gpus = [line.rsplit(",", 1) for line in result.stdout.strip().splitlines()]
+            _gpu_name = "\n".join(gpu[0].strip() for gpu in gpus)
+            memory = [float(gpu[1]) for gpu in gpus if len(gpu) == 2 and gpu[1].strip().isdigit()]
+            _gpu_memory_mb = min(memory) if memory else None
+            print(f"GPU detected: {_gpu_name} ({_gpu_memory_mb} MB)")
     except Exception as e:
         print(f"GPU check failed: {e}")
-    return False
+    return bool(_gpu_name)
+
+
+def pipeline_version() -> str:
+    """Identifies the render pipeline for cache keys - changes whenever render_blend.py does."""
+    if os.path.exists(RENDER_SCRIPT):
+        return file_hash(RENDER_SCRIPT)[:16]
+    return "unknown"
+
+
+def validate_frame_range(config: dict) -> str:
+    """Check frame range / shard parameters. Returns an error message or None."""
+    for key in SHARD_KEYS:
+        value = config[key]
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            return f"{key} must be an integer, got {value!r}"
+    has_range = config["frame_start"] is not None or config["frame_end"] is not None
+    has_shard = config["shard_index"] is not None or config["shard_count"] is not None
+
+    if has_range and has_shard:
+        return "Use either frame_start/frame_end or shard_index/shard_count, not both"
+    if has_range:
+        start, end = config["frame_start"], config["frame_end"]
+        if start is None or end is None:
+            return "frame_start and frame_end must be given together"
+        if start > end:
+            return f"frame_start ({start}) must not be after frame_end ({end})"
+    if has_shard:
+        index, count = config["shard_index"], config["shard_count"]
+        if index is None or count is None:
+            return "shard_index and shard_count must be given together"
+        if count < 1 or not 0 <= index < count:
+            return f"Invalid shard {index} of {count}"
+    return None
 
 
-def render_blender(template_path: str, output_path: str, config: dict) -> dict:
+def validate_sampling(config: dict) -> str:
+    """Check adaptive sampling / time budget parameters. Returns an error message or None."""
+    for key in SAMPLING_KEYS:
+        value = config[key]
+        if value is not None and (not isinstance(value, (int, float)) or value <= 0):
+            return f"{key} must be a positive number"
+    if config["min_samples"] is not None and config["noise_threshold"] is None:
+        return "min_samples requires noise_threshold"
+    min_samples, samples = config["min_samples"], config["samples"]
+    if min_samples is not None and samples is not None and min_samples > samples:
+        return f"min_samples ({config['min_samples']}) must not exceed samples ({config['samples']})"
+    return None
+
+
+def validate_quality(config: dict) -> str:
+    """Check draft tier parameters. Returns an error message or None."""
+    quality = config["quality"] or "final"
+    if quality not in QUALITIES:
+        return f"Unknown quality: {quality}. Available: {list(QUALITIES)}"
+    output_format = config.get("output_format") or "mp4"
+    if not isinstance(output_format, str) or output_format not in storage.CONTENT_TYPES:
+        return f"Unknown output_format: {output_format}. Available: {list(storage.CONTENT_TYPES)}"
+    if output_format != "mp4" and quality != "draft":
+        return f"output_format {output_format} is only available with quality draft"
+    for key in ("frame_step", "interpolation_check"):
+        value = config.get(key)
+        if value is not None and (not isinstance(value, int) or isinstance(value, bool)):
+            return f"{key} must be an integer, got {value!r}"
+    scale = config.get("draft_scale")
+    if scale is not None and (not isinstance(scale, (int, float)) or isinstance(scale, bool)):
+        return f"draft_scale must be a number, got {scale!r}"
+    if scale is not None and not 1 <= scale <= 100:
+        return f"draft_scale must be a percentage (1-100), got {scale}"
+    if config["frame_step"] is not None and config["frame_step"] < 1:
+        return "frame_step must be at least 1"
+    if config.get("interpolation_check") is not None and config["interpolation_check"] < 0:
+        return "interpolation_check must not be negative"
+    return None
+
+
+def validate_encoding(config: dict) -> str:
+    """Check codec and encoder settings. Returns an error message or None."""
+    return encoders.validate_settings(config)
+
+
+def prepare_outputs(config: dict) -> str:
+    """
+    Normalize a multi-rendition job's outputs in place (the render resolution
+    defaults to the largest uncropped rendition). Returns an error message or None.
+    """
+    if (config["quality"] or "final") != "final":
+        return "outputs are only available with quality final"
+    if not config["resolution"]:
+        config["resolution"] = renditions.render_resolution(config["outputs"])
+        if not config["resolution"]:
+            return "Missing required parameter: resolution (every rendition is cropped)"
+    try:
+        config["outputs"] = renditions.normalize(config["outputs"], config)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+def blender_command() -> list:
+    """Command prefix that launches Blender, with xvfb-run for GPU initialization."""
+    cmd = []
+    if USE_XVFB:
+        cmd += ["xvfb-run", "-a", "--server-args=-screen 0 1920x1080x24"]
+    return cmd + [BLENDER_BINARY]
+
+
+def build_render_args(output_path: str, config: dict, frame_key: str = None,
+                      frame_cache_refresh: bool = False, telemetry_path: str = None) -> list:
+    """render_blend.py arguments (everything after '--') for a job config."""
+    resolution = config["resolution"]
+    args = [
+        "--output", output_path,
+        "--width", str(resolution[0]),
+        "--height", str(resolution[1]),
+        "--samples", str(config["samples"]),
+        "--fps", str(config["fps"]),
+    ]
+    # Only add duration if explicitly set (otherwise use file's animation)
+    if config.get("duration"):
+        args.extend(["--duration", str(config["duration"])])
+    # Encode mode: "frames" (default), "stream" (pipe frames into ffmpeg while
+    # rendering) or "chunked" (encode finished segments in parallel)
+    if config.get("encode_mode"):
+        args.extend(["--encode-mode", config["encode_mode"]])
+    if config.get("segment_frames"):
+        args.extend(["--segment-frames", str(config["segment_frames"])])
+    if config.get("encode_workers"):
+        args.extend(["--encode-workers", str(config["encode_workers"])])
+    # Frame sub-range or shard (otherwise the whole animation)
+    for key in SHARD_KEYS:
+        if config.get(key) is not None:
+            args.extend([f"--{key.replace('_', '-')}", str(config[key])])
+    # Adaptive sampling and time limits (otherwise a fixed sample count), draft tier, encoder
+    for key in SAMPLING_KEYS + QUALITY_KEYS + ENCODE_KEYS:
+        if config.get(key) is not None:
+            args.extend([f"--{key.replace('_', '-')}", str(config[key])])
+    # Branding composited over cached base layers instead of baked into the render
+    if config.get("branding"):
+        args.extend(["--branding", json.dumps(config["branding"])])
+    # Every rendition in one ffmpeg pass; output_path is the first one's file
+    if config.get("outputs"):
+        args.extend(["--renditions", json.dumps(config["outputs"])])
+    # Per-frame cache: reuse frames rendered by earlier jobs with the same settings
+    if frame_key and FRAME_CACHE_DIR:
+        args.extend([
+            "--frame-cache-dir", FRAME_CACHE_DIR,
+            "--frame-cache-key", frame_key,
+            "--frame-cache-max-bytes", str(FRAME_CACHE_MAX_BYTES),
+            "--frame-cache-max-age", str(FRAME_CACHE_MAX_AGE),
+        ])
+        if frame_cache_refresh:
+            args.append("--frame-cache-refresh")
+    if telemetry_path:
+        args.extend(["--telemetry-file", telemetry_path])
+    return args
+
+
+def checkpointed_frames(frame_key: str) -> int:
+    """Frames of frame_key in the frame cache, i.e. what a resubmitted job would not re-render."""
+    if not FRAME_CACHE_DIR:
+        return 0
+    try:
+        return sum(1 for name in os.listdir(os.path.join(FRAME_CACHE_DIR, frame_key)) if name.startswith("frame_"))
+    except OSError:
+        return 0
+
+
+def prune_telemetry():
+    """Keep only the newest TELEMETRY_KEEP sidecars."""
+    try:
+        sidecars = sorted(Path(TELEMETRY_DIR).glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for path in sidecars[:-TELEMETRY_KEEP or None]:
+            path.unlink()
+    except OSError as e:
+        print(f"WARNING: could not prune telemetry: {e}")
+
+
+def get_warm_blender():
+    """The worker's warm Blender server, (re)started on demand. None if disabled or broken."""
+    global _warm_blender
+    if not BLENDER_WARM:
+        return None
+    if _warm_blender is None:
+        _warm_blender = WarmBlender(blender_command())
+    try:
+        _warm_blender.start()
+    except Exception as e:
+        print(f"WARNING: warm Blender unavailable, launching per job: {e}")
+        return None
+    return _warm_blender
+
+
+def render_warm(warm, template_path: str, output_path: str, render_args: list, progress: RenderProgress) -> dict:
+    """Render through the warm Blender server. Same return shape as render_blender()."""
+    print(f"Rendering on warm Blender: {template_path} {' '.join(render_args)}")
+    start_time = time.time()
+    try:
+        response = warm.render(template_path, render_args, timeout=RENDER_TIMEOUT, on_line=progress.feed)
+    except socket.timeout:
+        return {"success": False, "error": f"Render timed out after {RENDER_TIMEOUT}s"}
+    except Exception as e:
+        return {"success": False, "error": f"Warm Blender failed: {e}", "stdout": progress.tail()}
+
+    render_time = time.time() - start_time
+    if response.get("success") and os.path.exists(output_path):
+        blender_result = {k: v for k, v in response.items() if k not in ("success", "log", "template_loaded")}
+        return {
+            "success": True,
+            "render_time_seconds": round(render_time, 2),
+            "file_size_bytes": os.path.getsize(output_path),
+            **blender_result,
+            "template_loaded": response.get("template_loaded"),
+            "warm": True,
+            "stdout": progress.tail(),
+        }
+    return {
+        "success": False,
+        "error": response.get("error") or "Render failed - no output file",
+        "stdout": progress.tail(),
+        "render_time_seconds": round(render_time, 2),
+    }
+
+
+def render_blender(template_path: str, output_path: str, config: dict, frame_key: str = None,
+                   frame_cache_refresh: bool = False, progress: RenderProgress = None,
+                   telemetry_path: str = None) -> dict:
     """
     Execute Blender render for a .blend template file.
 
@@ -119,6 +431,10 @@ def render_blender(template_path: str, output_path: str, config: dict) -> dict:
         template_path: Full path to .blend file
         output_path: Where to save rendered MP4
         config: Render configuration dict
+        frame_key: Per-frame cache key (None = no frame cache)
+        frame_cache_refresh: Re-render every frame and replace cached ones
+        progress: Receives Blender's output as it renders (log-only if None)
+        telemetry_path: Where render_blend.py writes per-frame telemetry (None = off)
 
     Returns dict with success status and timing info.
     """
@@ -140,78 +456,548 @@ def render_blender(template_path: str, output_path: str, config: dict) -> dict:
     if not fps:
         return {"success": False, "error": "Missing required parameter: fps"}
 
-    # Build Blender command with xvfb-run for GPU initialization
+    render_args = build_render_args(output_path, config, frame_key, frame_cache_refresh, telemetry_path)
+    progress = progress or RenderProgress()
+
+    warm = get_warm_blender()
+    if warm:
+        return render_warm(warm, template_path, output_path, render_args, progress)
+
     cmd = [
-        "xvfb-run",
-        "-a",
-        "--server-args=-screen 0 1920x1080x24",
-        "blender",
+        *blender_command(),
         "--background",
         template_path,  # Load the .blend file
-        "--python", "/workspace/render_blend.py",
+        "--python", RENDER_SCRIPT,
         "--",
-        "--output", output_path,
-        "--width", str(resolution[0]),
-        "--height", str(resolution[1]),
-        "--samples", str(samples),
-        "--fps", str(fps),
+        *render_args,
     ]
-    # Only add duration if explicitly set (otherwise use file's animation)
-    if config.get("duration"):
-        cmd.extend(["--duration", str(config["duration"])])
 
     print(f"Executing: {' '.join(cmd)}")
     start_time = time.time()
 
     try:
-        # Run with output streaming so we can see Blender's GPU detection
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            timeout=3600  # 1 hour max
+        # Stream output line by line: live progress, bounded memory
+        proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace", bufsize=1
         )
+        timed_out = threading.Event()
+
+        def kill():
+            timed_out.set()
+            proc.kill()
+
+        watchdog = threading.Timer(RENDER_TIMEOUT, kill)
+        watchdog.start()
+        try:
+            for line in proc.stdout:
+                progress.feed(line)
+            returncode = proc.wait()
+        finally:
+            watchdog.cancel()
 
         render_time = time.time() - start_time
+        if timed_out.is_set():
+            return {"success": False, "error": f"Render timed out after {RENDER_TIMEOUT}s", "stdout": progress.tail()}
 
-        # Print Blender output for debugging
-        if result.stdout:
-            print("=== BLENDER STDOUT ===")
-            for line in result.stdout.split('\n')[-50:]:  # Last 50 lines
-                print(line)
-        if result.stderr:
-            print("=== BLENDER STDERR ===")
-            for line in result.stderr.split('\n')[-20:]:  # Last 20 lines
-                print(line)
-
-        if result.returncode == 0 and os.path.exists(output_path):
+        if returncode == 0 and os.path.exists(output_path):
             file_size = os.path.getsize(output_path)
+            blender_result = dict(progress.result)
+            timings = dict(blender_result.get("timings") or {})
+            started_at = blender_result.pop("script_started_at", None)
+            if started_at:
+                # Process launch, Blender init and .blend load (before render_blend.py runs)
+                timings["blender_startup"] = round(started_at - start_time, 3)
             return {
                 "success": True,
                 "render_time_seconds": round(render_time, 2),
                 "file_size_bytes": file_size,
-                "stdout": result.stdout[-2000:] if result.stdout else None,
+                **blender_result,
+                "timings": timings,
+                "stdout": progress.tail(),
             }
         else:
             return {
                 "success": False,
-                "error": result.stderr or "Render failed - no output file",
-                "stdout": result.stdout[-2000:] if result.stdout else None,
+                "error": f"Blender exited with code {returncode}:\n{progress.tail()}" if returncode
+                else "Render failed - no output file",
+                "stdout": progress.tail(),
                 "render_time_seconds": round(render_time, 2),
             }
 
-    except subprocess.TimeoutExpired:
-        return {"success": False, "error": "Render timed out after 1 hour"}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
+def deliver_output(output_path: str, job_id: str, output_mode: str, output_format: str = "mp4",
+                   name: str = None) -> dict:
+    """
+    Hand the rendered MP4 (or draft GIF) back to the caller.
+
+    Returns the video fields of the job output: video_base64 for inline
+    delivery, or video_url/video_key for an upload - plus video_sha256 and
+    output_mode in both cases. name tells a job's renditions apart in the
+    uploaded key.
+    """
+    file_size = os.path.getsize(output_path)
+    if output_mode == "auto":
+        output_mode = "inline" if file_size <= INLINE_MAX_BYTES else "s3"
+
+    if output_mode == "s3":
+        upload = storage.upload_file(
+            output_path, f"{job_id}{'-' + name if name else ''}.{output_format}",
+            content_type=storage.CONTENT_TYPES[output_format],
+        )
+        return {
+            "video_url": upload["url"],
+            "video_key": upload["key"],
+            "video_bucket": upload["bucket"],
+            "video_sha256": upload["sha256"],
+            "output_mode": "s3",
+        }
+
+    # Read and encode output
+    with open(output_path, "rb") as f:
+        video_bytes = f.read()
+
+    return {
+        "video_base64": base64.b64encode(video_bytes).decode("utf-8"),
+        "video_sha256": hashlib.sha256(video_bytes).hexdigest(),
+        "output_mode": "inline",
+    }
+
+
+def deliver_cached(render_cache, cached: dict, job_id: str, output_mode: str, name: str = None) -> dict:
+    """
+    Deliver a render-cache entry.
+
+    Local entries are delivered like a fresh render. Object-store entries are
+    already in the bucket, so s3 delivery just returns their URL; inline
+    delivery downloads them first.
+    """
+    output_format = cached["meta"].get("output_format") or "mp4"
+    if "path" in cached:
+        return deliver_output(cached["path"], job_id, output_mode, output_format, name)
+
+    if output_mode == "s3" or (output_mode == "auto" and cached["size"] > INLINE_MAX_BYTES):
+        return {
+            "video_url": cached["url"],
+            "video_key": cached["key"],
+            "video_bucket": storage.OUTPUT_BUCKET,
+            "video_sha256": cached["meta"].get("video_sha256"),
+            "output_mode": "s3",
+        }
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+        local_path = tmp.name
+    try:
+        render_cache.fetch(cached, local_path)
+        return deliver_output(local_path, job_id, "inline", output_format, name)
+    finally:
+        os.remove(local_path)
+
+
+def warmup() -> dict:
+    """
+    One-time worker warmup, run before the first job is accepted.
+
+    - probes the GPU with nvidia-smi (check_gpu() caches the answer)
+    - reads every baked template (page cache + the content hash used for cache
+      keys, checked against its registry manifest) and pre-fetches
+      WARMUP_TEMPLATE_URLS into the template cache
+    - garbage-collects frame cache checkpoints older than FRAME_CACHE_MAX_AGE
+    - renders one tiny frame of the default template: render_blend.py saves its
+      device probe for later launches, Cycles compiles/loads its kernels and a
+      warm Blender keeps the template loaded
+
+    Failures are reported, never fatal. Returns the report, which jobs include
+    as "worker_warmup".
+    """
+    global _warmup_report
+    print("Warming up worker...")
+    timer = PhaseTimer()
+    errors = []
+
+    with timer.phase("check_gpu"):
+        check_gpu()
+
+    with timer.phase("templates"):
+        for name, manifest in TEMPLATES.items():
+            try:
+                error = verify(manifest)
+            except OSError as e:
+                error = str(e)
+            if error:
+                errors.append(f"Template {name}: {error}")
+        for url in WARMUP_TEMPLATE_URLS:
+            try:
+                get_template_cache().fetch(url)
+            except Exception as e:
+                errors.append(f"Template {url}: {e}")
+
+    if FRAME_CACHE_DIR:
+        # Checkpoints of renders that were never resumed
+        with timer.phase("frame_cache_gc"):
+            try:
+                frame_cache.evict(FRAME_CACHE_DIR, FRAME_CACHE_MAX_BYTES, FRAME_CACHE_MAX_AGE)
+            except OSError as e:
+                errors.append(f"Frame cache GC: {e}")
+
+    if BLENDER_WARM:
+        with timer.phase("blender_start"):
+            get_warm_blender()
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+        output_path = tmp.name
+    try:
+        if TEMPLATES:
+            with timer.phase("prime_render"):
+                result = render_blender(next(iter(TEMPLATES.values()))["blend"], output_path, WARMUP_CONFIG)
+            if not result["success"]:
+                errors.append(f"Warmup render failed: {result.get('error', '')[-500:]}")
+    finally:
+        if os.path.exists(output_path):
+            os.remove(output_path)
+
+    device_probe = None
+    try:
+        with open(DEVICE_PROBE_FILE) as f:
+            device_probe = json.load(f)
+    except (OSError, ValueError):
+        pass
+
+    timings = timer.as_dict()
+    _warmup_report = {
+        "seconds": timings.pop("total"),
+        "steps": timings,
+        "gpu": _gpu_name or None,
+        "device_type": device_probe.get("device_type") if device_probe else None,
+        "errors": errors,
+    }
+    print(f"Warmup finished in {_warmup_report['seconds']}s: {_warmup_report}")
+    record_warmup(_warmup_report["seconds"])
+    return _warmup_report
+
+
 def handler(job):
     """
     RunPod serverless handler function.
 
-    Called for each incoming request.
+    Called for each incoming request. Successful outputs include per-phase
+    "timings"; every job is recorded in the worker's metrics.
     """
+    timer = PhaseTimer()
+    result = run_job(job, timer)
+    timings = timer.as_dict()
+    if "error" in result:
+        status = "error"
+    else:
+        status = "cache_hit" if (result.get("render_cache") or {}).get("status") == "hit" else "success"
+        result["timings"] = timings
+        result["worker_warmup"] = _warmup_report
+    print(f"Timings: {timings}")
+    try:
+        record_job(status, timings, result)
+    except Exception as e:
+        print(f"WARNING: could not record metrics: {e}")
+    return result
+
+
+def admit(config: dict, admission: dict, frame_key: str) -> dict:
+    """
+    Predict a render from the worker's history and decide whether to run it.
+
+    Args:
+        config: Job config
+        admission: {"template": history key, "scene": registry scene or None}
+        frame_key: Frame cache key (frames already cached are not predicted)
+
+    Returns {"action": "accept" | "reject" | "downgrade" | "split",
+    "estimate": dict or None} plus "error" for a rejection, "time_budget" for
+    a downgrade and "chunks" (frame ranges) for a split; the estimate repeats
+    the decision. Jobs without a prediction (drafts, unknown frame range, too
+    little history) are accepted.
+    """
+    span = frame_range(config, admission["scene"])
+    if (config["quality"] or "final") != "final" or not span:
+        return {"action": "accept", "estimate": None}
+    frames = max(frames_rendered(*span, config["frame_step"]) - checkpointed_frames(frame_key), 0)
+    gpu = _gpu_name if check_gpu() else ""
+    estimate = predict(load_history(), admission["template"], gpu, config, frames)
+    if not estimate:
+        return {"action": "accept", "estimate": None}
+    estimate["frame_range"] = list(span)
+    if GPU_COST_PER_SECOND:
+        estimate["cost"] = round(estimate["seconds"] * GPU_COST_PER_SECOND, 4)
+
+    policy = config.get("admission") or ADMISSION_POLICY
+    limit = RENDER_TIMEOUT * ADMISSION_HEADROOM
+    decision = {"action": "accept"}
+    if policy == "off":
+        pass
+    elif gpu and _gpu_memory_mb and estimate["peak_vram_mb"] and estimate["peak_vram_mb"] > _gpu_memory_mb:
+        decision = {"action": "reject",
+                    "error": f"Predicted to need {estimate['peak_vram_mb']:.0f} MB of GPU memory, "
+                             f"the GPU has {_gpu_memory_mb:.0f} MB - lower the resolution"}
+    elif estimate["seconds"] > limit:
+        decision = {"action": "reject",
+                    "error": f"Predicted render time {estimate['seconds']:.0f}s is more than {ADMISSION_HEADROOM:.0%} "
+                             f"of the {RENDER_TIMEOUT}s render timeout - lower samples or resolution, "
+                             f"set a time_budget or render it in shards"}
+        # RenderBudget shortens sampling so the frames fit what Blender's fixed costs leave over
+        time_budget = round(limit - estimate["fixed_seconds"], 1)
+        # Every chunk is a Blender run with its own fixed costs
+        per_chunk = int((limit - estimate["fixed_seconds"]) // estimate["frame_seconds"])
+        if policy == "downgrade" and time_budget > estimate["setup_seconds"] * frames:
+            decision = {"action": "downgrade", "time_budget": time_budget}
+        elif policy == "split" and per_chunk >= 1 and FRAME_CACHE_DIR and config.get("encode_mode") != "stream":
+            decision = {"action": "split", "chunks": split_ranges(*span, config["frame_step"], per_chunk)}
+
+    estimate.update(decision)
+    print(f"Estimate: {estimate}")
+    return {**decision, "estimate": estimate}
+
+
+def render_job(job, timer: PhaseTimer, template_path: str, output_path: str, config: dict, frame_key: str,
+               cache_mode: str, admission: dict = None) -> tuple:
+    """
+    Run Blender for a job with live progress. Returns (render_result, telemetry_path).
+
+    With admission ({"template", "scene"}, see admit()) the render is predicted
+    first and rejected, downgraded to a time budget or split into frame-range
+    renders sharing the frame cache; render_result["estimate"] then holds the
+    prediction, the decision and the actual Blender time. Unsplit final
+    renders are added to the prediction history.
+    """
+    decision = admit(config, admission, frame_key) if admission else {"action": "accept", "estimate": None}
+    estimate = decision["estimate"]
+    if decision["action"] == "reject":
+        print(f"Rejected: {decision['error']}")
+        return {"success": False, "error": decision["error"], "estimate": estimate}, None
+    if decision["action"] == "downgrade":
+        print(f"Downgraded to a {decision['time_budget']}s time budget")
+        config = {**config, "time_budget": decision["time_budget"]}
+        # Frames sampled under the budget must not be served to full-quality jobs
+        frame_key = f"job-{job['id']}-budget"
+
+    print(f"Starting render to: {output_path}")
+    progress = RenderProgress(on_update=lambda update: runpod.serverless.progress_update(job, update))
+    telemetry_path = os.path.join(TELEMETRY_DIR, f"{job['id']}.json") if TELEMETRY_DIR else None
+    chunk_frames, chunk_rendered = [], 0
+    started = time.perf_counter()
+    with timer.phase("blender"):
+        for index, (start, end) in enumerate(decision.get("chunks") or []):
+            # Each chunk only fills the frame cache; the last run below encodes the whole range
+            print(f"Chunk {index + 1}/{len(decision['chunks'])}: frames {start}-{end}")
+            root, ext = os.path.splitext(output_path)
+            chunk_path = f"{root}.chunk{ext}"
+            chunk_config = {**config, "frame_start": start, "frame_end": end,
+                            "shard_index": None, "shard_count": None, "outputs": None}
+            try:
+                render_result = render_blender(
+                    template_path, chunk_path, chunk_config, frame_key,
+                    frame_cache_refresh=cache_mode == "refresh", progress=progress, telemetry_path=telemetry_path,
+                )
+            finally:
+                if os.path.exists(chunk_path):
+                    os.remove(chunk_path)
+            for phase, seconds in (render_result.get("timings") or {}).items():
+                timer.add(phase, seconds)
+            if not render_result["success"]:
+                return {**render_result, "estimate": estimate}, telemetry_path
+            chunk_rendered += render_result.get("frames_rendered") or 0
+            chunk_frames += (load_frames(telemetry_path) or []) if telemetry_path else []
+
+        render_result = render_blender(
+            template_path, output_path, config, frame_key,
+            frame_cache_refresh=cache_mode == "refresh" and not decision.get("chunks"), progress=progress,
+            telemetry_path=telemetry_path,
+        )
+    blender_seconds = time.perf_counter() - started
+    # Phases measured inside Blender (startup, GPU setup, render, encode, ...)
+    for phase, seconds in (render_result.get("timings") or {}).items():
+        timer.add(phase, seconds)
+    render_result["estimate"] = estimate
+    if not render_result["success"]:
+        return render_result, telemetry_path
+    progress.update(force=True)
+
+    if estimate:
+        estimate["actual_seconds"] = round(blender_seconds, 1)
+        estimate["error_ratio"] = round(blender_seconds / estimate["seconds"], 3) if estimate["seconds"] else None
+    frames = load_frames(telemetry_path) if telemetry_path else None
+    if decision.get("chunks"):
+        # Report the job as if it had been a single run. Its repeated Blender startups
+        # would skew fixed_seconds, so split renders stay out of the history.
+        render_result["frames_rendered"] = (render_result.get("frames_rendered") or 0) + chunk_rendered
+        render_result["frames_reused"] = max((render_result.get("frames_reused") or 0) - chunk_rendered, 0)
+        if chunk_frames and frames is not None:
+            merge_frames(telemetry_path, chunk_frames)
+    elif admission and frames and (config["quality"] or "final") == "final":
+        try:
+            record = history_record(admission["template"], _gpu_name, config, frames, blender_seconds)
+            if record:
+                append_history(record)
+        except OSError as e:
+            print(f"WARNING: could not record render history: {e}")
+    return render_result, telemetry_path
+
+
+def render_error(render_result: dict, frame_key: str) -> dict:
+    """
+    Job output for a failed or rejected render, pointing out checkpointed
+    frames a resubmit resumes from, with the render's estimate if it had one.
+    """
+    error = render_result.get("error", "Render failed")
+    checkpointed = checkpointed_frames(frame_key)
+    if checkpointed:
+        error += f"\n{checkpointed} frames are checkpointed - resubmit the job to resume"
+    if render_result.get("estimate"):
+        return {"error": error, "estimate": render_result["estimate"]}
+    return {"error": error}
+
+
+def render_fields(config: dict, render_result: dict, has_gpu: bool, telemetry_path: str) -> dict:
+    """Job output fields describing the render itself."""
+    fields = {
+        "duration": config["duration"],
+        "resolution": config["resolution"],
+        "render_time_seconds": render_result["render_time_seconds"],
+        "frame_start": render_result.get("frame_start"),
+        "frame_end": render_result.get("frame_end"),
+        "frames_rendered": render_result.get("frames_rendered"),
+        "frames_reused": render_result.get("frames_reused"),
+        "segments_reused": render_result.get("segments_reused"),
+        "shard_index": config["shard_index"],
+        "shard_count": config["shard_count"],
+        "gpu_used": has_gpu,
+        # Effective samples per frame and whether the time budget held
+        "sampling": render_result.get("sampling"),
+        # Draft settings plus the estimated full-quality render time and speedup
+        "draft": render_result.get("draft"),
+        # SSIM/PSNR of interpolated frames vs. a full render (frame_step > 1)
+        "interpolation": render_result.get("interpolation"),
+        # Light groups of the base layers and the colors composited over them
+        "branding": render_result.get("branding"),
+        # p50/p95/max of per-frame time, samples, peak memory, sync/BVH/kernel time
+        "frame_telemetry": load_summary(telemetry_path) if telemetry_path else None,
+        # Predicted time/VRAM/cost, the admission decision and the actual Blender time
+        "estimate": render_result.get("estimate"),
+    }
+    if telemetry_path:
+        prune_telemetry()
+    return fields
+
+
+def run_renditions(job, timer: PhaseTimer, config: dict, template_path: str, source: dict, template_hash: str,
+                   template_cache_info: dict, frame_key: str, cache_mode: str, output_mode: str,
+                   admission: dict) -> dict:
+    """
+    Render a multi-rendition job: renditions found in the render cache are
+    delivered from it, the rest come out of one render and one ffmpeg pass.
+    """
+    render_cache = get_render_cache() if template_hash else None
+    keys, hits = {}, {}
+    if render_cache:
+        try:
+            with timer.phase("cache_lookup"):
+                for rendition in config["outputs"]:
+                    key = rendition_cache_key(template_hash, config, rendition, pipeline_version())
+                    keys[rendition["name"]] = key
+                    cached = render_cache.lookup(key) if cache_mode == "use" else None
+                    if cached:
+                        hits[rendition["name"]] = cached
+        except Exception as e:
+            print(f"WARNING: render cache unavailable: {e}")
+            render_cache, keys, hits = None, {}, {}
+    missing = [r for r in config["outputs"] if r["name"] not in hits]
+    print(f"Renditions: {len(hits)} cached, {len(missing)} to render")
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+        output_path = tmp.name
+    paths = dict(zip([r["name"] for r in missing], renditions.output_paths(output_path, missing)))
+
+    try:
+        result = {**source}
+        rendered = {}
+        if missing:
+            render_result, telemetry_path = render_job(
+                job, timer, template_path, output_path, {**config, "outputs": missing}, frame_key, cache_mode,
+                admission,
+            )
+            if not render_result["success"]:
+                return render_error(render_result, frame_key)
+            result.update(render_fields(config, render_result, check_gpu(), telemetry_path))
+            if render_result["estimate"] and render_result["estimate"]["action"] == "downgrade":
+                # Not what these keys stand for - keep the downgraded renditions out of the cache
+                keys = {}
+            # One encode pass produced every rendition
+            encode_seconds = (render_result.get("timings") or {}).get("encode")
+            rendered = {
+                r["name"]: {**r, "encode_seconds": encode_seconds, "encode_fps": render_result["encode"]["fps"]}
+                for r in render_result.get("renditions") or []
+            }
+        else:
+            # Every rendition was cached; report the render that produced the first one
+            first = hits[config["outputs"][0]["name"]]["meta"]
+            result.update({k: v for k, v in first.items() if k not in ("rendition", "video_sha256")})
+            result["render_time_seconds"] = 0
+
+        outputs, store_errors = [], {}
+        for rendition in config["outputs"]:
+            name = rendition["name"]
+            cached = hits.get(name)
+            status = "hit" if cached else ("miss" if name in keys else "bypass")
+            if not cached:
+                entry = {**rendition, **rendered[name], "file_size_bytes": os.path.getsize(paths[name])}
+                if render_cache and name in keys:
+                    try:
+                        with timer.phase("cache_store"):
+                            meta = {**result, "rendition": entry, "video_sha256": storage.file_sha256(paths[name])}
+                            cached = render_cache.store(keys[name], paths[name], meta)
+                    except Exception as e:
+                        print(f"WARNING: could not store rendition {name} in cache: {e}")
+                        store_errors[name] = str(e)
+            else:
+                entry = {**cached["meta"]["rendition"], "name": name}
+
+            deliver_start = time.perf_counter()
+            try:
+                with timer.phase("deliver"):
+                    if cached:
+                        video_output = deliver_cached(render_cache, cached, job["id"], output_mode, name)
+                    else:
+                        video_output = deliver_output(paths[name], job["id"], output_mode, "mp4", name)
+            except Exception as e:
+                return {"error": f"Failed to deliver output {name}: {e}"}
+            outputs.append({
+                **entry,
+                **video_output,
+                "deliver_seconds": round(time.perf_counter() - deliver_start, 3),
+                "render_cache": status,
+            })
+
+        statuses = {o["render_cache"] for o in outputs}
+        return {
+            **result,
+            "file_size_bytes": sum(o["file_size_bytes"] for o in outputs),
+            "outputs": outputs,
+            "warm_blender": render_result.get("warm", False) if missing else False,
+            "template_cache": template_cache_info,
+            "render_cache": {
+                "status": statuses.pop() if len(statuses) == 1 else "partial",
+                "backend": render_cache.name if render_cache else None,
+                "store_errors": store_errors or None,
+            },
+        }
+
+    finally:
+        for path in paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def run_job(job, timer: PhaseTimer) -> dict:
+    """Render one job, adding the time spent in each phase to timer."""
     print(f"Received job: {job['id']}")
 
     job_input = job.get("input", {})
@@ -219,6 +1005,10 @@ def handler(job):
     # Extract parameters
     template_name = job_input.get("template")
     template_url = job_input.get("template_url")
+    template_sha256 = job_input.get("template_sha256")
+    template_params = job_input.get("template_params")
+    output_mode = job_input.get("output_mode") or DEFAULT_OUTPUT_MODE
+    cache_mode = job_input.get("cache") or "use"
     config = {**DEFAULT_CONFIG}
 
     if "duration" in job_input:
@@ -229,75 +1019,196 @@ def handler(job):
         config["samples"] = job_input["samples"]
     if "fps" in job_input:
         config["fps"] = job_input["fps"]
+    for key in SHARD_KEYS + SAMPLING_KEYS + ("quality", "frame_step", "codec", "outputs"):
+        if key in job_input:
+            config[key] = job_input[key]
     if "config" in job_input:
         config.update(job_input["config"])
 
+    error = (validate_frame_range(config) or validate_sampling(config) or validate_quality(config)
+             or validate_encoding(config))
+    if not error and config.get("branding") is not None:
+        error = branding.validate(config["branding"])
+        if not error and (config["quality"] or "final") != "final":
+            error = "branding is only available with quality final"
+    if not error and config["outputs"] is not None:
+        error = prepare_outputs(config)
+    if error:
+        return {"error": error}
+    if output_mode not in OUTPUT_MODES:
+        return {"error": f"Unknown output_mode: {output_mode}. Available: {list(OUTPUT_MODES)}"}
+    if cache_mode not in CACHE_MODES:
+        return {"error": f"Unknown cache mode: {cache_mode}. Available: {list(CACHE_MODES)}"}
+    if config.get("admission") is not None and config["admission"] not in ADMISSION_POLICIES:
+        return {"error": f"Unknown admission policy: {config['admission']}. Available: {list(ADMISSION_POLICIES)}"}
+
     # Resolve template path
-    downloaded_template = None
+    template_cache_info = None
+    manifest = None
+    if template_params is not None and template_url:
+        return {"error": "template_params needs a named template, not template_url"}
     if template_url:
-        # Download template from URL
+        # Download template from URL (or reuse the cached copy on warm workers)
         print(f"Template URL: {template_url}")
         try:
-            template_path = download_template(template_url)
-            downloaded_template = template_path  # Track for cleanup
+            with timer.phase("template"):
+                template_path, template_cache_info = get_template_cache().fetch(
+                    template_url, expected_sha256=template_sha256
+                )
         except Exception as e:
             return {"error": f"Failed to download template: {e}"}
-    elif template_name:
-        # Use baked-in template by name
+    else:
+        # Use baked-in template by name (default: DEFAULT_TEMPLATE)
+        template_name = template_name or DEFAULT_TEMPLATE
         if template_name not in TEMPLATES:
             return {"error": f"Unknown template: {template_name}. Available: {list(TEMPLATES.keys())}"}
-        template_path = TEMPLATES[template_name]
+        manifest = TEMPLATES[template_name]
+        template_path = manifest["blend"]
         print(f"Template: {template_name} -> {template_path}")
-    else:
-        # Default to first available template
-        template_name = "ai_cpu_activation"
-        template_path = TEMPLATES[template_name]
-        print(f"Template: {template_name} (default) -> {template_path}")
+
+        # The manifest knows the animation, so bad requests fail before Blender starts
+        error = validate_request(manifest, config)
+        if error:
+            return {"error": f"Template {template_name}: {error}"}
+
+    if template_params is not None:
+        # Re-branded variant of the named template, baked once and cached by its parameters
+        try:
+            values = resolve_params(manifest, template_params)
+        except ValueError as e:
+            return {"error": f"Template {template_name}: {e}"}
+        if values:
+            try:
+                with timer.phase("template"):
+                    template_path, template_cache_info = get_variant_cache().get_or_build(
+                        manifest, values, BLENDER_BINARY
+                    )
+            except Exception as e:
+                return {"error": f"Failed to build template variant: {e}"}
 
     print(f"Config: {config}")
 
-    # Check GPU
-    has_gpu = check_gpu()
+    # Content hash of the template keys both the render and the frame cache
+    template_hash = None
+    if cache_mode != "bypass":
+        try:
+            with timer.phase("cache_lookup"):
+                template_hash = template_cache_info["sha256"] if template_cache_info else file_hash(template_path)
+        except OSError as e:
+            print(f"WARNING: could not hash template, caches disabled: {e}")
+    # Check GPU (CPU renders cap the samples, which the frame cache key has to reflect)
+    with timer.phase("check_gpu"):
+        has_gpu = check_gpu()
     if not has_gpu:
         print("WARNING: No GPU detected, render will be slow")
 
+    if template_hash:
+        frame_key = frame_cache_key(template_hash, config, pipeline_version(), has_gpu)
+    else:
+        # No shared frame cache, but a retry of this job can still resume its own frames
+        frame_key = f"job-{job['id']}"
+
+    source = {"template": template_name or "from_url", "template_url": template_url}
+    # Render history and predictions are per template (content hash for downloaded ones)
+    admission = {
+        "template": (template_hash or template_url) if template_url else template_name,
+        "scene": manifest.get("scene") if manifest else None,
+    }
+    if job_input.get("estimate_only"):
+        # Prediction and admission decision only - nothing is rendered
+        return {**source, "estimate": admit(config, admission, frame_key)["estimate"]}
+    if config["outputs"]:
+        return run_renditions(job, timer, config, template_path, source, template_hash, template_cache_info,
+                              frame_key, cache_mode, output_mode, admission)
+
+    # Render-result cache: identical jobs return the stored MP4 without starting Blender
+    render_cache = get_render_cache() if template_hash else None
+    cache_key = None
+    if render_cache:
+        try:
+            with timer.phase("cache_lookup"):
+                cache_key = render_cache_key(template_hash, config, pipeline_version())
+                cached = render_cache.lookup(cache_key) if cache_mode == "use" else None
+        except Exception as e:
+            print(f"WARNING: render cache unavailable: {e}")
+            render_cache = cached = None
+        if cached:
+            print(f"Render cache hit: {cache_key[:12]}")
+            try:
+                with timer.phase("deliver"):
+                    video_output = deliver_cached(render_cache, cached, job["id"], output_mode)
+            except Exception as e:
+                return {"error": f"Failed to deliver output: {e}"}
+            return {
+                **cached["meta"],
+                **video_output,
+                "render_time_seconds": 0,
+                "cached_render_time_seconds": cached["meta"].get("render_time_seconds"),
+                "template_cache": template_cache_info,
+                "render_cache": {"status": "hit", "key": cache_key, "backend": render_cache.name},
+            }
+
     # Create temp output file
-    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+    output_format = config.get("output_format") or "mp4"
+    with tempfile.NamedTemporaryFile(suffix=f".{output_format}", delete=False) as tmp:
         output_path = tmp.name
 
     try:
-        # Render
-        print(f"Starting render to: {output_path}")
-        render_result = render_blender(template_path, output_path, config)
-
+        render_result, telemetry_path = render_job(
+            job, timer, template_path, output_path, config, frame_key, cache_mode, admission
+        )
         if not render_result["success"]:
-            return {"error": render_result.get("error", "Render failed")}
+            return render_error(render_result, frame_key)
+
+        result = {
+            **source,
+            **render_fields(config, render_result, has_gpu, telemetry_path),
+            "file_size_bytes": render_result["file_size_bytes"],
+            "output_format": output_format,
+            # Codec, the encoder actually used (and why, if it fell back) and encode fps
+            "encode": render_result.get("encode"),
+        }
 
-        # Read and encode output
-        with open(output_path, "rb") as f:
-            video_bytes = f.read()
+        cached = store_error = None
+        if render_result["estimate"] and render_result["estimate"]["action"] == "downgrade":
+            # Not what cache_key stands for - keep the downgraded render out of the cache
+            cache_key = None
+        if render_cache and cache_key:
+            try:
+                with timer.phase("cache_store"):
+                    meta = {**result, "video_sha256": storage.file_sha256(output_path)}
+                    cached = render_cache.store(cache_key, output_path, meta)
+                print(f"Stored render in cache: {cache_key[:12]}")
+            except Exception as e:
+                print(f"WARNING: could not store render in cache: {e}")
+                store_error = str(e)
 
-        video_base64 = base64.b64encode(video_bytes).decode("utf-8")
+        try:
+            with timer.phase("deliver"):
+                if cached:
+                    video_output = deliver_cached(render_cache, cached, job["id"], output_mode)
+                else:
+                    video_output = deliver_output(output_path, job["id"], output_mode, output_format)
+        except Exception as e:
+            return {"error": f"Failed to deliver output: {e}"}
 
         return {
-            "video_base64": video_base64,
-            "template": template_name or "from_url",
-            "template_url": template_url,
-            "duration": config["duration"],
-            "resolution": config["resolution"],
-            "render_time_seconds": render_result["render_time_seconds"],
-            "file_size_bytes": render_result["file_size_bytes"],
-            "gpu_used": has_gpu,
+            **result,
+            **video_output,
+            "warm_blender": render_result.get("warm", False),
+            "template_cache": template_cache_info,
+            "render_cache": {
+                "status": "miss" if cached else "bypass",
+                "key": cache_key,
+                "backend": render_cache.name if render_cache else None,
+                "store_error": store_error,
+            },
         }
 
     finally:
-        # Cleanup output file
+        # Cleanup output file (downloaded templates stay in the cache)
         if os.path.exists(output_path):
             os.remove(output_path)
-        # Cleanup downloaded template
-        if downloaded_template and os.path.exists(downloaded_template):
-            os.remove(downloaded_template)
-            print(f"Cleaned up downloaded template: {downloaded_template}")
 
 
 # For local testing
@@ -317,14 +1228,14 @@ def test_local():
     if "error" in result:
         print(f"Error: {result['error']}")
     else:
-        print(f"Success!")
+        print("Success!")
         print(f"  Render time: {result['render_time_seconds']}s")
         print(f"  File size: {result['file_size_bytes']} bytes")
 
         video_bytes = base64.b64decode(result["video_base64"])
         with open("test_output.mp4", "wb") as f:
             f.write(video_bytes)
-        print(f"  Saved to: test_output.mp4")
+        print("  Saved to: test_output.mp4")
 
 
 if __name__ == "__main__":
@@ -334,4 +1245,10 @@ if __name__ == "__main__":
         test_local()
     else:
         print("Starting RunPod Blender serverless worker...")
+        start_metrics_server()
+        # Probe devices, prime kernels and load templates before the first job arrives
+        if WARMUP:
+            warmup()
+        else:
+            get_warm_blender()
         runpod.serverless.start({"handler": handler})
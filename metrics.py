@@ -0,0 +1,213 @@
+"""
+Per-job phase timings and Prometheus metrics for the worker.
+
+PhaseTimer collects wall time per phase of one job (template download, GPU
+check, Blender startup, rendering, encode, delivery, ...). Every finished job
+is also recorded in process-wide counters and histograms, exported in the
+Prometheus text format:
+
+    METRICS_FILE   Rewritten after every job (node_exporter textfile collector style)
+    METRICS_PORT   Serve GET /metrics on this port (0 = off)
+
+Metrics:
+    blender_jobs_total{status}                 Jobs by outcome: success, cache_hit, error
+    blender_job_seconds                        Handler wall time per job
+    blender_phase_seconds{phase}               Wall time per job phase
+    blender_output_bytes_total                 Bytes of video produced
+    blender_frames_total{source}               Frames rendered / reused from the frame cache
+    blender_warmup_seconds                     Duration of the worker's startup warmup
+    blender_admissions_total{action}           Predicted jobs by decision: accept, reject, downgrade, split
+    blender_prediction_ratio                   Actual / predicted Blender time of predicted renders
+
+No client library needed; the text format is written directly.
+"""
+
+import contextlib
+import http.server
+import os
+import tempfile
+import threading
+import time
+
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+
+# Phases range from milliseconds (cache lookups) to an hour (renders)
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1200, 3600)
+# 1 = exact prediction; below 1 the render was faster than predicted
+RATIO_BUCKETS = (0.25, 0.5, 0.67, 0.8, 0.9, 1.1, 1.25, 1.5, 2, 4)
+
+
+class PhaseTimer:
+    """Wall time per phase of one job."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def add(self, name: str, seconds: float):
+        if seconds is not None:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def as_dict(self) -> dict:
+        timings = {name: round(seconds, 3) for name, seconds in self.phases.items()}
+        timings["total"] = round(time.perf_counter() - self.started, 3)
+        return timings
+
+
+# =============================================================================
+# Registry
+# =============================================================================
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_labels(labels)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[tuple(sorted(labels.items()))] = value
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = tuple(sorted(labels.items()))
+        series = self.series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, series):
+                lines.append(f"{self.name}_bucket{_labels(labels + (('le', bound),))} {count}")
+            lines.append(f"{self.name}_bucket{_labels(labels + (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {round(series[-2], 6)}")
+            lines.append(f"{self.name}_count{_labels(labels)} {series[-1]}")
+        return lines
+
+
+_lock = threading.Lock()
+jobs_total = Counter("blender_jobs_total", "Jobs handled, by outcome.")
+job_seconds = Histogram("blender_job_seconds", "Handler wall time per job in seconds.")
+phase_seconds = Histogram("blender_phase_seconds", "Wall time per job phase in seconds.")
+output_bytes_total = Counter("blender_output_bytes_total", "Bytes of rendered video produced.")
+frames_total = Counter("blender_frames_total", "Frames rendered or reused from the frame cache.")
+warmup_seconds = Gauge("blender_warmup_seconds", "Duration of the worker's startup warmup.")
+admissions_total = Counter("blender_admissions_total", "Jobs with a render prediction, by admission decision.")
+prediction_ratio = Histogram("blender_prediction_ratio", "Actual over predicted Blender time per render.",
+                             RATIO_BUCKETS)
+METRICS = (jobs_total, job_seconds, phase_seconds, output_bytes_total, frames_total, warmup_seconds,
+           admissions_total, prediction_ratio)
+
+
+def render_metrics() -> str:
+    with _lock:
+        return "\n".join(line for metric in METRICS for line in metric.render()) + "\n"
+
+
+def record_job(status: str, timings: dict, output: dict = None):
+    """Add one finished job to the metrics and export them."""
+    output = output or {}
+    with _lock:
+        jobs_total.inc(status=status)
+        for phase, seconds in timings.items():
+            if phase == "total":
+                job_seconds.observe(seconds)
+            else:
+                phase_seconds.observe(seconds, phase=phase)
+        if output.get("file_size_bytes"):
+            output_bytes_total.inc(output["file_size_bytes"])
+        if status == "success":
+            # Cache hits report the frame counts of the original render
+            frames_total.inc(output.get("frames_rendered") or 0, source="rendered")
+            frames_total.inc(output.get("frames_reused") or 0, source="reused")
+        # Cache hits carry the estimate of the render that produced them
+        estimate = (output.get("estimate") or {}) if status != "cache_hit" else {}
+        if estimate.get("action"):
+            admissions_total.inc(action=estimate["action"])
+        if estimate.get("error_ratio"):
+            prediction_ratio.observe(estimate["error_ratio"])
+    if METRICS_FILE:
+        write_metrics_file(METRICS_FILE)
+
+
+def record_warmup(seconds: float):
+    with _lock:
+        warmup_seconds.set(seconds)
+    if METRICS_FILE:
+        write_metrics_file(METRICS_FILE)
+
+
+def write_metrics_file(path: str):
+    """Atomically replace path with the current metrics (never a half-written file)."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".prom.tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port: int = METRICS_PORT):
+    """Serve /metrics from a background thread (no-op if port is 0)."""
+    if not port:
+        return None
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics on http://0.0.0.0:{port}/metrics")
+    return server
@@ -8,6 +8,9 @@ The handler.py has no defaults - all values come from here.
 import os
 import requests
 import base64
+import hashlib
+import subprocess
+import tempfile
 import time
 from dotenv import load_dotenv
 
@@ -26,6 +29,15 @@ CONFIG = {
     "resolution": [1920, 1080],
     "samples": 128,
     "fps": 24,              # Match template fps (ai_cpu_activation is 24fps)
+    "quality": None,        # "draft" = quick low-res proxy to check timing/framing
+
+    # Output delivery: None = worker default, "inline" (base64 in the response),
+    # "s3" (worker uploads to its bucket and returns a URL) or "auto"
+    "output_mode": None,
+
+    # Sharding - split the animation across this many workers and stitch the
+    # returned segments locally (needs ffmpeg on this machine). 1 = single job.
+    "shards": 1,
 
     # Polling settings
     "poll_interval": 10,    # Seconds between status checks
@@ -41,25 +53,23 @@ if not RUNPOD_API_KEY:
     print("ERROR: Set RUNPOD_API_KEY in environment or .env")
     exit(1)
 
-BASE_URL = f"https://api.runpod.ai/v2/{ENDPOINT_ID}"
+# Overridable to point the client at a local stand-in for the RunPod API
+BASE_URL = os.environ.get("RUNPOD_BASE_URL") or f"https://api.runpod.ai/v2/{ENDPOINT_ID}"
 HEADERS = {
     "Authorization": f"Bearer {RUNPOD_API_KEY}",
     "Content-Type": "application/json",
 }
 
+# Inline videos are decoded in slices of this many base64 chars (multiple of 4)
+BASE64_SLICE = 4 * 1024 * 1024
 
-def run_render():
-    """Submit render job to RunPod and poll for completion."""
-    print("=" * 50)
-    print(f"Blender 4.2 + CUDA Render")
-    print(f"Template: {CONFIG['template'] or 'from URL'}")
-    print(f"Duration: {CONFIG['duration'] or 'full animation'}")
-    print(f"Resolution: {CONFIG['resolution']}")
-    print(f"Samples: {CONFIG['samples']}")
-    print(f"FPS: {CONFIG['fps']}")
-    print("=" * 50)
+# Shards whose workers picked different encoders (NVENC on one, the CPU
+# fallback on another) can't be joined with -c copy; they are re-encoded with these
+STITCH_ENCODERS = {"h264": "libx264", "hevc": "libx265", "av1": "libsvtav1"}
 
-    # Build payload from CONFIG - all parameters explicit
+
+def build_payload():
+    """Build the job input from CONFIG - all parameters explicit."""
     payload = {
         "input": {
             "resolution": CONFIG["resolution"],
@@ -78,8 +88,17 @@ def run_render():
     if CONFIG["duration"]:
         payload["input"]["duration"] = CONFIG["duration"]
 
-    # Submit job (async)
-    print("Submitting job...")
+    if CONFIG["output_mode"]:
+        payload["input"]["output_mode"] = CONFIG["output_mode"]
+
+    if CONFIG["quality"]:
+        payload["input"]["quality"] = CONFIG["quality"]
+
+    return payload
+
+
+def submit_job(payload):
+    """Submit a job (async). Returns the job ID, or None on failure."""
     response = requests.post(
         f"{BASE_URL}/run",
         headers=HEADERS,
@@ -89,10 +108,114 @@ def run_render():
     if response.status_code != 200:
         print(f"ERROR: HTTP {response.status_code}")
         print(response.text)
-        return
+        return None
+
+    return response.json().get("id")
+
+
+def get_status(job_id):
+    """Fetch the current status payload for a job."""
+    status_response = requests.get(
+        f"{BASE_URL}/status/{job_id}",
+        headers=HEADERS,
+    )
+    return status_response.json()
+
+
+def cancel_job(job_id):
+    """Best-effort cancel of a queued or running job."""
+    try:
+        requests.post(f"{BASE_URL}/cancel/{job_id}", headers=HEADERS)
+    except requests.RequestException as e:
+        print(f"Cancel failed for {job_id}: {e}")
+
+
+def save_video(output, output_path, session=None):
+    """
+    Write the job's video to output_path.
+
+    Uploaded outputs (video_url) are streamed straight to disk; inline ones
+    are base64-decoded in slices. Either way the sha256 is checked when provided.
+    """
+    sha = hashlib.sha256()
+    if output.get("video_url"):
+        with (session or requests).get(output["video_url"], stream=True, timeout=300) as response:
+            response.raise_for_status()
+            with open(output_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1024 * 1024):
+                    sha.update(chunk)
+                    f.write(chunk)
+    elif output.get("video_base64"):
+        encoded = output["video_base64"]
+        with open(output_path, "wb") as f:
+            # Slices are a multiple of 4 chars, so each decodes on its own
+            for i in range(0, len(encoded), BASE64_SLICE):
+                chunk = base64.b64decode(encoded[i:i + BASE64_SLICE])
+                sha.update(chunk)
+                f.write(chunk)
+    else:
+        return False
+
+    expected = output.get("video_sha256")
+    if expected and sha.hexdigest() != expected:
+        os.remove(output_path)
+        raise ValueError(f"Video checksum mismatch: expected {expected}, got {sha.hexdigest()}")
+    return True
+
+
+def print_failure(status_data):
+    print("\n" + "=" * 50)
+    print("FAILED")
+    print("=" * 50)
+    print(f"Error: {status_data.get('error')}")
+    # Show full response for debugging
+    output = status_data.get("output", {})
+    if output:
+        print("\nOutput details:")
+        for k, v in output.items():
+            if k != "video_base64":  # Skip the big base64 blob
+                print(f"  {k}: {v}")
+
+
+def format_progress(status_data):
+    """One-line summary of the worker's latest progress update, or "" if there is none."""
+    progress = status_data.get("output")
+    if status_data.get("status") != "IN_PROGRESS" or not isinstance(progress, dict):
+        return ""
+    parts = []
+    if progress.get("frames_total"):
+        parts.append(f"frame {progress.get('frames_done')}/{progress['frames_total']}")
+    if progress.get("samples") and progress.get("sample") is not None:
+        parts.append(f"sample {progress['sample']}/{progress['samples']}")
+    if progress.get("seconds_per_frame"):
+        parts.append(f"{progress['seconds_per_frame']}s/frame")
+    if progress.get("eta_seconds") is not None:
+        parts.append(f"ETA {int(progress['eta_seconds'])}s")
+    return ", ".join(parts)
+
+
+def print_settings():
+    print("=" * 50)
+    print("Blender 4.2 + CUDA Render")
+    print(f"Template: {CONFIG['template'] or 'from URL'}")
+    print(f"Duration: {CONFIG['duration'] or 'full animation'}")
+    print(f"Resolution: {CONFIG['resolution']}")
+    print(f"Samples: {CONFIG['samples']}")
+    print(f"FPS: {CONFIG['fps']}")
+    if CONFIG["shards"] > 1:
+        print(f"Shards: {CONFIG['shards']}")
+    print("=" * 50)
+
 
-    data = response.json()
-    job_id = data.get("id")
+def run_render():
+    """Submit render job to RunPod and poll for completion."""
+    print_settings()
+
+    # Submit job (async)
+    print("Submitting job...")
+    job_id = submit_job(build_payload())
+    if not job_id:
+        return
     print(f"Job ID: {job_id}")
 
     # Poll for completion
@@ -100,15 +223,11 @@ def run_render():
     while True:
         elapsed = int(time.time() - start_time)
 
-        status_response = requests.get(
-            f"{BASE_URL}/status/{job_id}",
-            headers=HEADERS,
-        )
-
-        status_data = status_response.json()
+        status_data = get_status(job_id)
         status = status_data.get("status")
 
-        print(f"[{elapsed}s] Status: {status}")
+        progress = format_progress(status_data)
+        print(f"[{elapsed}s] Status: {status}" + (f" ({progress})" if progress else ""))
 
         if status == "COMPLETED":
             output = status_data.get("output", {})
@@ -122,29 +241,19 @@ def run_render():
             print(f"Render time: {output.get('render_time_seconds')}s")
             print(f"File size: {output.get('file_size_bytes'):,} bytes")
             print(f"GPU used: {output.get('gpu_used')}")
+            draft = output.get("draft")
+            if draft and draft.get("speedup"):
+                print(f"Draft: ~{draft['speedup']}x faster than full quality "
+                      f"(est. {draft['estimated_full_render_seconds']}s)")
 
             # Save video
-            video_base64 = output.get("video_base64")
-            if video_base64:
-                video_bytes = base64.b64decode(video_base64)
-                output_path = "output.mp4"
-                with open(output_path, "wb") as f:
-                    f.write(video_bytes)
+            output_path = f"output.{output.get('output_format') or 'mp4'}"
+            if save_video(output, output_path):
                 print(f"\nSaved to: {output_path}")
             break
 
         elif status == "FAILED":
-            print("\n" + "=" * 50)
-            print("FAILED")
-            print("=" * 50)
-            print(f"Error: {status_data.get('error')}")
-            # Show full response for debugging
-            output = status_data.get("output", {})
-            if output:
-                print(f"\nOutput details:")
-                for k, v in output.items():
-                    if k != "video_base64":  # Skip the big base64 blob
-                        print(f"  {k}: {v}")
+            print_failure(status_data)
             break
 
         elif elapsed > CONFIG["timeout"]:
@@ -154,7 +263,145 @@ def run_render():
         time.sleep(CONFIG["poll_interval"])
 
 
+def stitch_segments(segment_paths, output_path, reencode_codec=None):
+    """
+    Join shard MP4s in order with ffmpeg's concat demuxer.
+
+    The streams are copied unless reencode_codec is set, in which case they
+    are re-encoded with that codec's CPU encoder (segments from different
+    encoders have different SPS/PPS, profiles and GOPs).
+    """
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        for path in segment_paths:
+            f.write(f"file '{os.path.abspath(path)}'\n")
+        list_path = f.name
+
+    if reencode_codec:
+        encode_args = ["-c:v", STITCH_ENCODERS[reencode_codec], "-preset", "fast", "-crf", "18",
+                       "-pix_fmt", "yuv420p"]
+    else:
+        encode_args = ["-c", "copy"]
+    try:
+        result = subprocess.run(
+            ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", list_path, *encode_args, output_path],
+            capture_output=True,
+            text=True,
+        )
+    finally:
+        os.remove(list_path)
+
+    if result.returncode != 0:
+        print(f"FFmpeg stderr: {result.stderr}")
+        return False
+    return True
+
+
+def run_sharded_render(shard_count):
+    """
+    Fan a render out over shard_count jobs and stitch the segments.
+
+    All shards are submitted at once so they run on parallel workers; each
+    renders a contiguous frame range and returns its own MP4. Wall-clock time
+    scales with worker count instead of clip length.
+    """
+    print_settings()
+
+    print(f"Submitting {shard_count} shard jobs...")
+    jobs = {}  # shard_index -> job_id
+    for shard_index in range(shard_count):
+        payload = build_payload()
+        payload["input"]["shard_index"] = shard_index
+        payload["input"]["shard_count"] = shard_count
+        job_id = submit_job(payload)
+        if not job_id:
+            for other in jobs.values():
+                cancel_job(other)
+            return
+        jobs[shard_index] = job_id
+        print(f"  Shard {shard_index}: {job_id}")
+
+    start_time = time.time()
+    pending = dict(jobs)
+    render_seconds = 0.0
+    with tempfile.TemporaryDirectory(prefix="blender_shards_") as segments_dir:
+        segment_paths = {}
+        encodes = {}  # shard_index -> (codec, encoder) the worker used
+        while pending:
+            elapsed = int(time.time() - start_time)
+
+            for shard_index, job_id in list(pending.items()):
+                status_data = get_status(job_id)
+                status = status_data.get("status")
+
+                if status == "COMPLETED":
+                    output = status_data.get("output", {})
+                    segment_path = os.path.join(segments_dir, f"segment_{shard_index:03d}.mp4")
+                    if not save_video(output, segment_path):
+                        print(f"Shard {shard_index} returned no video")
+                        for other in pending.values():
+                            cancel_job(other)
+                        return
+                    segment_paths[shard_index] = segment_path
+                    encode = output.get("encode") or {}
+                    encodes[shard_index] = (encode.get("codec"), encode.get("encoder"))
+                    render_seconds += output.get("render_time_seconds") or 0
+                    del pending[shard_index]
+                    print(f"[{elapsed}s] Shard {shard_index} done: frames "
+                          f"{output.get('frame_start')}-{output.get('frame_end')} "
+                          f"in {output.get('render_time_seconds')}s")
+
+                elif status == "FAILED":
+                    print(f"Shard {shard_index} failed")
+                    print_failure(status_data)
+                    for other in pending.values():
+                        if other != job_id:
+                            cancel_job(other)
+                    return
+
+                else:
+                    progress = format_progress(status_data)
+                    if progress:
+                        print(f"[{elapsed}s] Shard {shard_index}: {progress}")
+
+            if not pending:
+                break
+
+            print(f"[{elapsed}s] {shard_count - len(pending)}/{shard_count} shards complete")
+
+            if elapsed > CONFIG["timeout"]:
+                print(f"Timeout: Jobs exceeded {CONFIG['timeout']}s limit")
+                for job_id in pending.values():
+                    cancel_job(job_id)
+                return
+
+            time.sleep(CONFIG["poll_interval"])
+
+        output_path = "output.mp4"
+        ordered = [segment_paths[i] for i in range(shard_count)]
+        reencode_codec = None
+        if len(set(encodes.values())) > 1:
+            reencode_codec = encodes[0][0] or "h264"
+            print(f"Shards used different encoders {sorted(set(encodes.values()), key=str)}, "
+                  f"re-encoding with {STITCH_ENCODERS[reencode_codec]}")
+        print("Stitching segments...")
+        if not stitch_segments(ordered, output_path, reencode_codec):
+            print("ERROR: Failed to stitch segments")
+            return
+
+    wall_seconds = time.time() - start_time
+    print("\n" + "=" * 50)
+    print("SUCCESS!")
+    print("=" * 50)
+    print(f"Shards: {shard_count}")
+    print(f"Wall time: {wall_seconds:.1f}s (sum of shard render time: {render_seconds:.1f}s)")
+    print(f"File size: {os.path.getsize(output_path):,} bytes")
+    print(f"\nSaved to: {output_path}")
+
+
 if __name__ == "__main__":
     # All render parameters come from CONFIG at top of file
     # Edit CONFIG directly to change settings - single source of truth
-    run_render()
+    if CONFIG["shards"] > 1:
+        run_sharded_render(CONFIG["shards"])
+    else:
+        run_render()
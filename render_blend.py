@@ -5,36 +5,190 @@ Usage:
     blender --background template.blend --python render_blend.py -- \
         --output /path/to/output.mp4 \
         --duration 8 \
-        --samples 128
+        --samples 128 \
+        --encode-mode stream
 
 This script:
 1. Loads the .blend file (passed to blender via command line)
 2. Configures render settings (GPU, resolution, samples)
 3. Adjusts animation length if duration specified
-4. Renders to MP4
+4. Restricts the frame range to one shard if requested
+5. Renders to MP4
+
+Sampling:
+    --samples is the maximum. --noise-threshold (with --min-samples) turns on
+    Cycles adaptive sampling, --frame-time-limit caps the sampling time per
+    frame, and --time-budget spreads a budget in seconds over the whole clip,
+    re-planning each frame's time limit from the time actually used so far;
+    see render_budget.py. The effective samples are reported in RESULT.
+
+Draft quality:
+    --quality draft renders a cheap proxy for checking timing and framing:
+    --draft-scale percent of the resolution, Simplify on (subdivision,
+    particles, 512px textures), few bounces and samples, every
+    --frame-step'th frame (played back at the same speed), optionally on
+    --draft-engine eevee/workbench, streamed into a low-bitrate MP4 or, with
+    --output-format gif, a GIF. RESULT then includes the estimated full-quality
+    render time and the speedup.
+
+Temporal subsampling:
+    --frame-step N on a final-quality render renders only every Nth frame and
+    ffmpeg's motion-compensated minterpolate synthesizes the frames between
+    them at the full --fps (frames mode). To judge the result, the skipped
+    frames of a --interpolation-check intervals long window in the middle of
+    the clip are also rendered and compared with the synthesized ones
+    (SSIM/PSNR), reported in RESULT as "interpolation".
+
+Encoders:
+    --codec h264/hevc/av1 is encoded with NVENC when the GPU can, otherwise
+    the CPU encoder (or --encoder picks one); --preset, --crf or --bitrate,
+    --encode-threads and --gop tune it. See encoders.py. RESULT reports the
+    encoder used, whether it was a fallback, and the encode fps.
+
+Renditions:
+    --renditions '[{"name", "resolution", "crop", "codec", ...}, ...]'
+    (normalized by the handler, see renditions.py) encodes every rendition in
+    one ffmpeg pass over the rendered frames: --output is the first one's
+    file, the others get their name inserted before the extension. Chunked
+    mode falls back to frames mode.
+
+Branding:
+    --branding '{"palette": {...}, "text": ...}' renders unbranded base layers
+    (multilayer EXR, a light group per palette color; shared across brandings
+    through the frame cache) and composites the branding over them before the
+    encode, which draws the text. Uses frames mode; see branding.py.
+
+Frame telemetry:
+    With --telemetry-file, per-frame wall time, samples, peak memory and
+    sync/BVH/kernel time are recorded through bpy.app.handlers and written
+    to that JSON sidecar; see frame_telemetry.py.
+
+Frame cache:
+    With --frame-cache-dir/--frame-cache-key (frames and chunked modes), frames
+    rendered by earlier jobs with the same key are reused and only the missing
+    ones are rendered; see frame_cache.py. Frames (and chunked mode's encoded
+    segments) are added as soon as they are written, so a render that is
+    killed part way resumes from the cache when it is retried.
+
+Sharding:
+    --frame-start/--frame-end render an explicit sub-range, while
+    --shard-index/--shard-count split the (duration-adjusted) animation into
+    shard_count contiguous ranges and render only one of them.
+
+When run directly, a final "RESULT: {json}" line reports the rendered frame
+range, frame counts and per-phase timings back to the handler.
+
+Encode modes:
+    frames  - render the animation to PNG files, then encode them (default)
+    stream  - render frame by frame and pipe each finished frame into a
+              long-running ffmpeg, so encoding overlaps rendering and no
+              frame directory is written
+    chunked - render to PNG frames, encoding each finished N-frame segment
+              on a bounded pool of ffmpeg processes while rendering continues,
+              then join the segments with the concat demuxer (no re-encode)
 """
 
 import bpy
 import sys
-import math
 import subprocess
 import tempfile
 import shutil
 import os
+import hashlib
+import json
+import re
+import time
+import contextlib
+
+# Wall-clock time this script started - after Blender's startup and .blend load
+SCRIPT_STARTED_AT = time.time()
+
+# Sibling modules live next to this script (Blender doesn't add it to sys.path)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from frame_cache import FrameCache, frame_file
+from frame_telemetry import FrameTelemetry
+from render_budget import RenderBudget, configure_sampling
+from encoders import encode_fps, select_encoder, video_args as encoder_video_args
+from renditions import ffmpeg_outputs, output_paths
+from branding import BaseLayers, composite as composite_branding, text_overlay
+
+ENCODE_MODES = ("frames", "stream", "chunked")
+
+# x264 settings shared by every encode path
+X264_ARGS = ["-c:v", "libx264", "-preset", "fast", "-crf", "23", "-pix_fmt", "yuv420p"]
 
+# Draft proxies: small files, fast to encode and to send back
+DRAFT_X264_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "32", "-pix_fmt", "yuv420p"]
+DRAFT_GIF_ARGS = ["-vf", "split[a][b];[a]palettegen=max_colors=64[p];[b][p]paletteuse=dither=bayer", "-loop", "0"]
+QUALITIES = ("final", "draft")
+DRAFT_ENGINES = ("cycles", "eevee", "workbench")
+OUTPUT_FORMATS = ("mp4", "gif")
+DRAFT_MAX_SAMPLES = 16
 
-def parse_args():
-    """Parse command line arguments after '--'."""
+# Motion-compensated frame interpolation for --frame-step renders
+MINTERPOLATE = "minterpolate=fps={fps}:mi_mode=mci:mc_mode=aobmc:me_mode=bidir:vsbmc=1"
+
+
+# Seconds spent per phase of the current render() call
+timings = {}
+
+
+@contextlib.contextmanager
+def timed(phase):
+    """Add the wall time of the block to timings[phase]."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + time.perf_counter() - start
+
+
+def parse_args(argv=None):
+    """Parse command line arguments after '--' (from sys.argv unless argv is given)."""
     args = {
         "output": "/tmp/output.mp4",
         "duration": None,  # None = use file's existing duration
         "width": 1920,
         "height": 1080,
-        "samples": 128,
+        "samples": 128,                 # Maximum with adaptive sampling / time limits
+        "noise_threshold": None,        # Cycles adaptive sampling threshold
+        "min_samples": None,
+        "frame_time_limit": None,       # Seconds of sampling per frame at most
+        "time_budget": None,            # Seconds for rendering all frames
         "fps": 30,
+        "quality": "final",
+        "draft_engine": "cycles",       # Draft only: cycles, eevee or workbench
+        "draft_scale": 25,              # Draft only: resolution percentage
+        "frame_step": None,             # Render every Nth frame (drafts: default 2, others: interpolate)
+        "interpolation_check": 2,       # frame_step intervals compared against a full render (0 = off)
+        "output_format": "mp4",         # gif only for drafts
+        "encode_mode": "frames",
+        "codec": "h264",
+        "encoder": "auto",              # auto = NVENC if it works, else the CPU encoder
+        "preset": None,                 # x264-style preset name, mapped per encoder
+        "crf": None,
+        "bitrate": None,                # e.g. "8M" instead of crf
+        "encode_threads": None,
+        "gop": None,
+        "renditions": None,             # [{name, resolution, crop, codec, ...}] from renditions.normalize()
+        "branding": None,               # {palette, text, ...}: composite over base layers (branding.py)
+        "segment_frames": 48,   # chunked mode: frames per encoded segment
+        "encode_workers": 2,    # chunked mode: concurrent ffmpeg processes
+        "frame_start": None,    # Explicit sub-range (None = whole animation)
+        "frame_end": None,
+        "shard_index": None,    # Render shard shard_index of shard_count
+        "shard_count": None,
+        "frame_cache_dir": None,        # Reuse frames rendered by earlier jobs
+        "frame_cache_key": None,
+        "frame_cache_max_bytes": 50 * 1024 ** 3,
+        "frame_cache_max_age": 0,       # Seconds; keys unused for longer are dropped (0 = no limit)
+        "frame_cache_refresh": False,   # Re-render every frame, then replace cached ones
+        "telemetry_file": None,         # Per-frame telemetry JSON sidecar
     }
 
-    argv = sys.argv
+    if argv is None:
+        argv = sys.argv
     if "--" in argv:
         custom_args = argv[argv.index("--") + 1:]
         i = 0
@@ -54,15 +208,177 @@ def parse_args():
             elif custom_args[i] == "--samples" and i + 1 < len(custom_args):
                 args["samples"] = int(custom_args[i + 1])
                 i += 2
+            elif custom_args[i] == "--noise-threshold" and i + 1 < len(custom_args):
+                args["noise_threshold"] = float(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--min-samples" and i + 1 < len(custom_args):
+                args["min_samples"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-time-limit" and i + 1 < len(custom_args):
+                args["frame_time_limit"] = float(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--time-budget" and i + 1 < len(custom_args):
+                args["time_budget"] = float(custom_args[i + 1])
+                i += 2
             elif custom_args[i] == "--fps" and i + 1 < len(custom_args):
                 args["fps"] = int(custom_args[i + 1])
                 i += 2
+            elif custom_args[i] == "--quality" and i + 1 < len(custom_args):
+                args["quality"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--draft-engine" and i + 1 < len(custom_args):
+                args["draft_engine"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--draft-scale" and i + 1 < len(custom_args):
+                args["draft_scale"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-step" and i + 1 < len(custom_args):
+                args["frame_step"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--interpolation-check" and i + 1 < len(custom_args):
+                args["interpolation_check"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--output-format" and i + 1 < len(custom_args):
+                args["output_format"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--encode-mode" and i + 1 < len(custom_args):
+                args["encode_mode"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--codec" and i + 1 < len(custom_args):
+                args["codec"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--encoder" and i + 1 < len(custom_args):
+                args["encoder"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--preset" and i + 1 < len(custom_args):
+                args["preset"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--crf" and i + 1 < len(custom_args):
+                args["crf"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--bitrate" and i + 1 < len(custom_args):
+                args["bitrate"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--encode-threads" and i + 1 < len(custom_args):
+                args["encode_threads"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--gop" and i + 1 < len(custom_args):
+                args["gop"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--renditions" and i + 1 < len(custom_args):
+                args["renditions"] = json.loads(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--branding" and i + 1 < len(custom_args):
+                args["branding"] = json.loads(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--segment-frames" and i + 1 < len(custom_args):
+                args["segment_frames"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--encode-workers" and i + 1 < len(custom_args):
+                args["encode_workers"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-start" and i + 1 < len(custom_args):
+                args["frame_start"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-end" and i + 1 < len(custom_args):
+                args["frame_end"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--shard-index" and i + 1 < len(custom_args):
+                args["shard_index"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--shard-count" and i + 1 < len(custom_args):
+                args["shard_count"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-cache-dir" and i + 1 < len(custom_args):
+                args["frame_cache_dir"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--frame-cache-key" and i + 1 < len(custom_args):
+                args["frame_cache_key"] = custom_args[i + 1]
+                i += 2
+            elif custom_args[i] == "--frame-cache-max-bytes" and i + 1 < len(custom_args):
+                args["frame_cache_max_bytes"] = int(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-cache-max-age" and i + 1 < len(custom_args):
+                args["frame_cache_max_age"] = float(custom_args[i + 1])
+                i += 2
+            elif custom_args[i] == "--frame-cache-refresh":
+                args["frame_cache_refresh"] = True
+                i += 1
+            elif custom_args[i] == "--telemetry-file" and i + 1 < len(custom_args):
+                args["telemetry_file"] = custom_args[i + 1]
+                i += 2
             else:
                 i += 1
 
     return args
 
 
+# Device type found by the first setup_gpu() call. Preferences outlive file
+# loads, so a long-lived Blender (blender_server.py) only probes once.
+_gpu_device_type = None
+
+# Probe result shared across Blender launches on this worker (written by the
+# first full probe, e.g. during the handler's warmup render)
+DEVICE_PROBE_FILE = os.environ.get("BLENDER_DEVICE_PROBE", "/tmp/blender_device_probe.json")
+
+
+def _blender_version():
+    return getattr(bpy.app, "version_string", None)
+
+
+def load_device_probe(prefs):
+    """
+    Enable the GPUs recorded in DEVICE_PROBE_FILE without trying every backend.
+
+    Returns the device type, or None if there is no usable probe (missing,
+    other Blender version, or the recorded devices are gone).
+    """
+    try:
+        with open(DEVICE_PROBE_FILE) as f:
+            probe = json.load(f)
+    except (OSError, ValueError):
+        return None
+    device_type = probe.get("device_type")
+    if not device_type or probe.get("blender_version") != _blender_version():
+        return None
+
+    try:
+        prefs.compute_device_type = device_type
+        # Only refresh the recorded backend
+        if hasattr(prefs, "get_devices_for_type"):
+            prefs.get_devices_for_type(device_type)
+        else:
+            prefs.get_devices()
+    except Exception as e:
+        print(f"Cached device probe unusable ({device_type}): {e}")
+        return None
+
+    gpu_devices = [d for d in prefs.devices if d.type != 'CPU']
+    if not gpu_devices:
+        print(f"Cached device probe unusable: no {device_type} devices found")
+        return None
+    for device in prefs.devices:
+        device.use = True
+    print(f"Using cached device probe: {len(gpu_devices)} GPU(s) with {device_type}")
+    return device_type
+
+
+def save_device_probe(prefs, device_type):
+    probe = {
+        "device_type": device_type,
+        "devices": [{"name": d.name, "type": d.type} for d in prefs.devices],
+        "blender_version": _blender_version(),
+    }
+    try:
+        tmp_path = f"{DEVICE_PROBE_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(probe, f)
+        os.replace(tmp_path, DEVICE_PROBE_FILE)
+        print(f"Saved device probe to {DEVICE_PROBE_FILE}")
+    except OSError as e:
+        print(f"Could not save device probe: {e}")
+
+
 def setup_gpu(require_gpu=True):
     """Configure GPU rendering.
 
@@ -71,12 +387,27 @@ def setup_gpu(require_gpu=True):
 
     Reference: https://github.com/nytimes/rd-blender-docker/issues/3
     """
+    global _gpu_device_type
     scene = bpy.context.scene
     scene.render.engine = 'CYCLES'
 
+    if _gpu_device_type:
+        for s in bpy.data.scenes:
+            s.cycles.device = 'GPU'
+        print(f"GPU rendering ENABLED with {_gpu_device_type} (already configured)")
+        return True
+
     prefs = bpy.context.preferences.addons['cycles'].preferences
     gpu_enabled = False
 
+    device_type = load_device_probe(prefs)
+    if device_type:
+        for s in bpy.data.scenes:
+            s.cycles.device = 'GPU'
+        _gpu_device_type = device_type
+        print(f"GPU rendering ENABLED with {device_type}")
+        return True
+
     # CRITICAL: Call get_devices() FIRST to populate the device list
     print("Detecting GPU devices...")
     try:
@@ -107,6 +438,8 @@ def setup_gpu(require_gpu=True):
                     s.cycles.device = 'GPU'
 
                 gpu_enabled = True
+                _gpu_device_type = device_type
+                save_device_probe(prefs, device_type)
                 print(f"GPU rendering ENABLED with {device_type}")
                 break
 
@@ -152,11 +485,13 @@ def setup_render(args, gpu_enabled):
         print(f"Using existing duration: {duration:.1f}s ({total_frames} frames)")
 
     # Samples - reduce for CPU
-    if gpu_enabled:
-        scene.cycles.samples = args["samples"]
-    else:
-        scene.cycles.samples = min(args["samples"], 32)
-        print(f"Reduced samples to {scene.cycles.samples} for CPU")
+    samples = args["samples"]
+    if not gpu_enabled:
+        samples = min(samples, 32)
+        print(f"Reduced samples to {samples} for CPU")
+    configure_sampling(
+        scene, samples, args["noise_threshold"], args["min_samples"], args["frame_time_limit"]
+    )
 
     scene.cycles.use_denoising = True
 
@@ -165,101 +500,855 @@ def setup_render(args, gpu_enabled):
     scene.render.image_settings.color_mode = 'RGB'
 
 
-def main():
-    print("=" * 60)
-    print("Blender .blend File Renderer")
-    print("=" * 60)
+def _eevee_engine():
+    """EEVEE's engine id: BLENDER_EEVEE_NEXT in Blender 4.2-4.x, BLENDER_EEVEE otherwise."""
+    try:
+        engines = bpy.types.RenderSettings.bl_rna.properties["engine"].enum_items.keys()
+    except (AttributeError, KeyError):
+        return 'BLENDER_EEVEE'
+    return 'BLENDER_EEVEE_NEXT' if 'BLENDER_EEVEE_NEXT' in engines else 'BLENDER_EEVEE'
 
-    args = parse_args()
 
-    print(f"\nSettings:")
+def setup_draft(args):
+    """Turn the configured scene into a cheap draft: smaller, simplified, fewer samples and frames."""
+    scene = bpy.context.scene
+    render = scene.render
+    samples = min(scene.cycles.samples, DRAFT_MAX_SAMPLES)
+
+    render.resolution_percentage = args["draft_scale"]
+    render.use_simplify = True
+    render.simplify_subdivision_render = 1
+    render.simplify_child_particles_render = 0.2
+
+    if args["draft_engine"] == "eevee":
+        render.engine = _eevee_engine()
+        scene.eevee.taa_render_samples = samples
+    elif args["draft_engine"] == "workbench":
+        render.engine = 'BLENDER_WORKBENCH'
+    else:
+        cycles = scene.cycles
+        cycles.samples = samples
+        cycles.use_adaptive_sampling = True
+        cycles.adaptive_threshold = max(cycles.adaptive_threshold, 0.1)
+        cycles.texture_limit_render = '512'
+        cycles.max_bounces = 4
+        cycles.diffuse_bounces = 1
+        cycles.glossy_bounces = 1
+        cycles.transmission_bounces = 2
+        cycles.volume_bounces = 0
+        cycles.transparent_max_bounces = 4
+
+    scene.frame_step = args["frame_step"] or 2
+    print(f"Frame step: {scene.frame_step}")
+    print(f"Draft: {args['draft_engine']} at {args['draft_scale']}%, {samples} samples, "
+          f"every {scene.frame_step} frame(s), {args['output_format']}")
+
+
+def estimate_full_render(args, scene, budget, render_seconds):
+    """
+    Estimate what the full-quality render of the draft's frame range would take.
+
+    Per frame, the sampling time (frame time minus the measured sync/BVH/save
+    overhead) is scaled by the pixel and sample ratios; the overhead is not.
+    Reduced bounces/textures are ignored, so this errs on the low side. Only
+    meaningful for Cycles drafts (None for other engines).
+    """
+    if args["draft_engine"] != "cycles" or not budget.frames or not render_seconds:
+        return None
+    overhead = budget.overhead or 0.0
+    sampling = [max(f["seconds"] - overhead, 0.0) for f in budget.frames]
+    pixel_ratio = (100 / args["draft_scale"]) ** 2
+    sample_ratio = args["samples"] / max(scene.cycles.samples, 1)
+    per_frame = overhead + sum(sampling) / len(sampling) * pixel_ratio * sample_ratio
+    estimate = per_frame * (scene.frame_end - scene.frame_start + 1)
+    return {
+        "estimated_full_render_seconds": round(estimate, 1),
+        "speedup": round(estimate / render_seconds, 1),
+    }
+
+
+def shard_range(frame_start, frame_end, shard_index, shard_count):
+    """
+    Split frame_start..frame_end into shard_count contiguous ranges.
+
+    Earlier shards take the remainder frames, so sizes differ by at most one.
+    Returns (start, end) of shard shard_index.
+    """
+    if not 0 <= shard_index < shard_count:
+        raise RuntimeError(f"Invalid shard {shard_index} of {shard_count}")
+
+    total = frame_end - frame_start + 1
+    base, extra = divmod(total, shard_count)
+    count = base + (1 if shard_index < extra else 0)
+    if count == 0:
+        raise RuntimeError(f"Shard {shard_index} of {shard_count} is empty ({total} frames)")
+
+    start = frame_start + shard_index * base + min(shard_index, extra)
+    return start, start + count - 1
+
+
+def setup_frame_range(args):
+    """Restrict the scene to an explicit frame range or a single shard."""
+    scene = bpy.context.scene
+
+    if args["shard_count"]:
+        start, end = shard_range(scene.frame_start, scene.frame_end, args["shard_index"] or 0, args["shard_count"])
+        print(f"Shard {args['shard_index'] or 0}/{args['shard_count']}")
+    else:
+        start = args["frame_start"] if args["frame_start"] is not None else scene.frame_start
+        end = args["frame_end"] if args["frame_end"] is not None else scene.frame_end
+        if not scene.frame_start <= start <= end <= scene.frame_end:
+            raise RuntimeError(
+                f"Frame range {start}-{end} outside animation {scene.frame_start}-{scene.frame_end}"
+            )
+
+    scene.frame_start = start
+    scene.frame_end = end
+    print(f"Frame range: {start}-{end}")
+
+
+def check_output(output_path, renditions=None):
+    """Verify the encoded file (or every rendition's) exists and has content."""
+    for path in output_paths(output_path, renditions) if renditions else [output_path]:
+        if not os.path.exists(path):
+            raise RuntimeError(f"Output file was not created: {path}")
+
+        output_size = os.path.getsize(path)
+        print(f"Output file size: {output_size} bytes ({os.path.basename(path)})")
+        if output_size == 0:
+            raise RuntimeError(f"Output file is empty (0 bytes): {path}")
+
+
+def output_args(scene, output_path, video_args, renditions=None, prefilter=None, output_options=()):
+    """
+    ffmpeg arguments after the input: encode to output_path with video_args,
+    or to every rendition (each with its own "video_args") in one pass.
+    """
+    if not renditions:
+        return [*(["-vf", prefilter] if prefilter else []), *output_options, *video_args, output_path]
+    percentage = scene.render.resolution_percentage / 100
+    return ffmpeg_outputs(
+        renditions, output_paths(output_path, renditions), [r["video_args"] for r in renditions],
+        int(scene.render.resolution_x * percentage), int(scene.render.resolution_y * percentage),
+        prefilter, output_options,
+    )
+
+
+def reuse_cached_frames(scene, frames_dir, frame_cache, refresh):
+    """
+    Seed frames_dir from the frame cache and make Blender skip existing files.
+
+    Returns the list of frame numbers that will be rendered.
+    """
+    frames = range(scene.frame_start, scene.frame_end + 1, scene.frame_step)
+    reused = []
+    if frame_cache and not refresh:
+        reused = frame_cache.restore(frames_dir, frames)
+    # Existing frame files are left alone, so only missing frames get rendered
+    scene.render.use_overwrite = False
+    scene.render.use_placeholder = False
+    reused_set = set(reused)
+    to_render = [f for f in frames if f not in reused_set]
+    print(f"Frame cache: {len(reused)} frames reused, {len(to_render)} to render")
+    return to_render
+
+
+@contextlib.contextmanager
+def checkpointing(frame_cache, frames_dir, refresh):
+    """Add every frame to the frame cache as soon as Blender writes it."""
+    if not frame_cache:
+        yield
+        return
+
+    def on_render_write(scene, *args):
+        frame_cache.store_frame(frames_dir, scene.frame_current, replace=refresh)
+
+    bpy.app.handlers.render_write.append(on_render_write)
+    try:
+        yield
+    finally:
+        bpy.app.handlers.render_write.remove(on_render_write)
+
+
+def render_frames(scene, output_path, fps, frame_cache=None, refresh=False, interpolation_check=0,
+                  video_args=X264_ARGS, renditions=None, composite=None, overlay=None, untracked=None):
+    """
+    Render the animation to PNG frames, then encode them with video_args
+    (or into every rendition, see output_args()).
+
+    With scene.frame_step > 1 only every frame_step'th frame is rendered and
+    the encode interpolates the rest; interpolation_check > 0 then measures
+    how close that gets to a full render (see check_interpolation()),
+    rendering its reference frames inside untracked() if given.
+
+    With composite(frames_dir, output_dir), the rendered frames are EXR base
+    layers that it turns into the PNGs to encode; overlay is an ffmpeg filter
+    drawn over them.
+    """
+    frames_dir = tempfile.mkdtemp(prefix="blender_frames_")
+    try:
+        scene.render.filepath = os.path.join(frames_dir, "frame_")
+        with timed("frame_cache"):
+            to_render = reuse_cached_frames(scene, frames_dir, frame_cache, refresh)
+
+        print(f"Rendering frames {scene.frame_start}-{scene.frame_end} to: {frames_dir}")
+        if to_render:
+            with timed("render"), checkpointing(frame_cache, frames_dir, refresh):
+                bpy.ops.render.render(animation=True)
+        if frame_cache:
+            with timed("frame_cache"):
+                frame_cache.store(frames_dir, to_render, replace=refresh)
+
+        # Verify frames were created
+        import glob
+        ext = "exr" if composite else "png"
+        frames = glob.glob(os.path.join(frames_dir, f"frame_*.{ext}"))
+        print(f"Created {len(frames)} {ext.upper()} frames")
+        if len(frames) == 0:
+            raise RuntimeError("No frames were rendered!")
+
+        # List first few frames for debugging
+        frames.sort()
+        print(f"First frame: {os.path.basename(frames[0])}")
+        print(f"Last frame: {os.path.basename(frames[-1])}")
+
+        encode_dir = frames_dir
+        if composite:
+            encode_dir = os.path.join(frames_dir, "branded")
+            os.makedirs(encode_dir)
+            with timed("composite"):
+                composite(frames_dir, encode_dir)
+        interpolate = MINTERPOLATE.format(fps=fps) if scene.frame_step > 1 else None
+        prefilter = ",".join(f for f in (interpolate, overlay) if f) or None
+
+        if scene.frame_step > 1:
+            # Synthesize the skipped frames back to the full frame rate
+            print(f"\n[4/4] Interpolating and encoding with {video_args[1]}...")
+            ffmpeg_cmd = [
+                "ffmpeg", "-y",
+                *stepped_input(scene, encode_dir, fps),
+                *output_args(
+                    scene, output_path, video_args, renditions, prefilter,
+                    ["-frames:v", str(scene.frame_end - scene.frame_start + 1)],
+                ),
+            ]
+        else:
+            print(f"\n[4/4] Encoding with {video_args[1]}...")
+            ffmpeg_cmd = [
+                "ffmpeg", "-y",
+                "-framerate", str(fps),
+                "-start_number", str(scene.frame_start),
+                "-i", os.path.join(encode_dir, "frame_%04d.png"),
+                *output_args(scene, output_path, video_args, renditions, prefilter),
+            ]
+
+        print(f"Running: {' '.join(ffmpeg_cmd)}")
+        with timed("encode"):
+            result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+
+        # Always print FFmpeg output for debugging
+        if result.stdout:
+            print(f"FFmpeg stdout: {result.stdout}")
+        if result.stderr:
+            print(f"FFmpeg stderr: {result.stderr}")
+
+        if result.returncode != 0:
+            print("FFmpeg encoding failed!")
+            raise RuntimeError(f"FFmpeg encoding failed: {result.stderr}")
+
+        check_output(output_path, renditions)
+        stats = {
+            "frames_rendered": len(to_render),
+            "frames_reused": len(frames) - len(to_render),
+            "encode_fps": encode_fps(result.stderr),
+        }
+        if scene.frame_step > 1 and interpolation_check and not composite:
+            with timed("interpolation_check"):
+                stats["interpolation"] = check_interpolation(
+                    scene, frames_dir, fps, interpolation_check, untracked
+                )
+        return stats
+    finally:
+        # Cleanup frames
+        shutil.rmtree(frames_dir, ignore_errors=True)
+
+
+def stepped_input(scene, frames_dir, fps):
+    """
+    ffmpeg input arguments for the frames of a frame_step render.
+
+    image2 needs consecutive numbers, so the rendered frames are hard-linked
+    as step_0000.png, step_0001.png, ... and read at fps / frame_step.
+    """
+    step = scene.frame_step
+    for i, frame in enumerate(range(scene.frame_start, scene.frame_end + 1, step)):
+        link = os.path.join(frames_dir, f"step_{i:04d}.png")
+        if not os.path.exists(link):
+            os.link(os.path.join(frames_dir, frame_file(frame)), link)
+    return ["-framerate", f"{fps}/{step}", "-i", os.path.join(frames_dir, "step_%04d.png")]
+
+
+def check_interpolation(scene, frames_dir, fps, intervals, untracked=None):
+    """
+    Compare interpolated frames with fully rendered ones on a sample window.
+
+    Renders the skipped frames of `intervals` frame_step intervals in the
+    middle of the clip, then has ffmpeg interpolate the stepped frames as in
+    the encode and compute SSIM and PSNR of the synthesized frames against
+    the rendered ones. Returns the window and scores, or None if the clip is
+    too short to have a window.
+
+    untracked() is a context manager that keeps the reference render out of
+    the job's telemetry and time budget.
+    """
+    step = scene.frame_step
+    rendered = list(range(scene.frame_start, scene.frame_end + 1, step))
+    intervals = min(intervals, len(rendered) - 1)
+    if intervals < 1:
+        return None
+    first = (len(rendered) - intervals - 1) // 2
+    window_start, window_end = rendered[first], rendered[first + intervals]
+
+    # Reference frames: the already rendered ones linked in, the rest rendered now
+    reference_dir = os.path.join(frames_dir, "reference")
+    os.makedirs(reference_dir, exist_ok=True)
+    for frame in rendered[first:first + intervals + 1]:
+        os.link(os.path.join(frames_dir, frame_file(frame)), os.path.join(reference_dir, frame_file(frame)))
+    saved = (scene.frame_start, scene.frame_end, scene.frame_step, scene.render.filepath)
+    print(f"Interpolation check: rendering frames {window_start}-{window_end} in full")
+    try:
+        scene.frame_start, scene.frame_end, scene.frame_step = window_start, window_end, 1
+        scene.render.filepath = os.path.join(reference_dir, "frame_")
+        with untracked() if untracked else contextlib.nullcontext():
+            bpy.ops.render.render(animation=True)
+    finally:
+        scene.frame_start, scene.frame_end, scene.frame_step, scene.render.filepath = saved
+
+    # Only the synthesized frames count - the rendered ones are identical by definition
+    offset = window_start - scene.frame_start
+    synthesized = f"select='not(eq(mod(n,{step}),0))',setpts=N/({fps}*TB)"
+    graph = (
+        f"[0:v]{MINTERPOLATE.format(fps=fps)},trim=start_frame={offset}:end_frame={offset + window_end - window_start + 1},"
+        f"setpts=PTS-STARTPTS,{synthesized},split[i1][i2];"
+        f"[1:v]{synthesized},split[r1][r2];"
+        f"[i1][r1]ssim;[i2][r2]psnr"
+    )
+    ffmpeg_cmd = [
+        "ffmpeg",
+        *stepped_input(scene, frames_dir, fps),
+        "-framerate", str(fps),
+        "-start_number", str(window_start),
+        "-i", os.path.join(reference_dir, "frame_%04d.png"),
+        "-lavfi", graph,
+        "-f", "null", "-",
+    ]
+    print(f"Running: {' '.join(ffmpeg_cmd)}")
+    result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"Interpolation check failed: {result.stderr[-2000:]}")
+        return {"window": [window_start, window_end], "error": "ffmpeg comparison failed"}
+
+    ssim = re.search(r"SSIM .*All:([\d.]+)", result.stderr)
+    psnr = re.search(r"PSNR .*average:([\d.]+)", result.stderr)
+    report = {
+        "window": [window_start, window_end],
+        "frames_compared": (window_end - window_start) - intervals,
+        "ssim": float(ssim.group(1)) if ssim else None,
+        "psnr_db": float(psnr.group(1)) if psnr else None,
+    }
+    print(f"Interpolation check: {report}")
+    return report
+
+
+def render_stream(scene, output_path, fps, video_args=X264_ARGS, renditions=None):
+    """
+    Render frame by frame, piping each finished frame straight into ffmpeg.
+
+    Blender can't hand pixels of the Render Result to Python in background
+    mode, so each frame is saved (color managed, uncompressed BMP) to a single
+    scratch file in shared memory and its bytes are written to ffmpeg's stdin.
+    No PNG compression/decoding happens and ffmpeg encodes while the next frame
+    renders, so the MP4 is finished moments after the last frame.
+    """
+    scratch_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    frame_path = os.path.join(scratch_dir, f"blender_stream_{os.getpid()}.bmp")
+    scene.render.image_settings.file_format = 'BMP'
+    scene.render.image_settings.color_mode = 'RGB'
+
+    ffmpeg_cmd = [
+        "ffmpeg", "-y",
+        "-f", "image2pipe",
+        "-framerate", str(fps),
+        "-c:v", "bmp",
+        "-i", "-",
+        *output_args(scene, output_path, video_args, renditions),
+    ]
+    print(f"Running: {' '.join(ffmpeg_cmd)}")
+
+    # ffmpeg's log goes to a file - an unread stderr pipe could fill up and stall the encoder
+    with tempfile.TemporaryFile(mode="w+") as ffmpeg_log:
+        encoder = subprocess.Popen(ffmpeg_cmd, stdin=subprocess.PIPE, stdout=ffmpeg_log, stderr=ffmpeg_log)
+        frames = 0
+        try:
+            for frame in range(scene.frame_start, scene.frame_end + 1, scene.frame_step):
+                scene.frame_set(frame)
+                with timed("render"):
+                    bpy.ops.render.render()
+                # Handing the frame over blocks only while ffmpeg is behind
+                with timed("encode"):
+                    bpy.data.images['Render Result'].save_render(filepath=frame_path, scene=scene)
+                    with open(frame_path, "rb") as f:
+                        encoder.stdin.write(f.read())
+                frames += 1
+                print(f"Streamed frame {frame} ({frames} total)")
+            with timed("encode"):
+                encoder.stdin.close()
+                returncode = encoder.wait()
+        except BrokenPipeError:
+            returncode = encoder.wait()
+        except BaseException:
+            encoder.kill()
+            encoder.wait()
+            raise
+        finally:
+            if os.path.exists(frame_path):
+                os.remove(frame_path)
+
+        ffmpeg_log.seek(0)
+        ffmpeg_output = ffmpeg_log.read()
+
+    # Always print FFmpeg output for debugging
+    if ffmpeg_output:
+        print(f"FFmpeg stderr: {ffmpeg_output}")
+
+    if frames == 0:
+        raise RuntimeError("No frames were rendered!")
+    if returncode != 0:
+        print("FFmpeg encoding failed!")
+        raise RuntimeError(f"FFmpeg encoding failed: {ffmpeg_output}")
+
+    print(f"Streamed {frames} frames into encoder")
+    check_output(output_path, renditions)
+    return {"frames_rendered": frames, "frames_reused": 0}
+
+
+class ChunkedEncoder:
+    """
+    Encode finished frame segments in the background while Blender renders.
+
+    Hooked into bpy.app.handlers.render_write, so it runs after every frame
+    file is written: segments whose frames all exist are handed to ffmpeg,
+    with at most max_workers encodes running at once. Each segment is a
+    closed-GOP stream starting on a keyframe, so finish() can join them
+    with the concat demuxer and -c copy.
+
+    Encoded segments are checkpointed in the frame cache (if given) and
+    restored from it instead of being encoded again, unless refresh is set.
+    """
+
+    def __init__(self, frames_dir, fps, frame_start, frame_end, segment_frames, max_workers,
+                 frame_cache=None, refresh=False, video_args=X264_ARGS):
+        self.frames_dir = frames_dir
+        self.video_args = video_args
+        # Checkpointed segments are only valid for the same encode settings
+        self.tag = hashlib.sha256(" ".join(video_args).encode()).hexdigest()[:12]
+        self.encode_fps = []
+        self.frame_cache = frame_cache
+        self.refresh = refresh
+        self.segments_reused = 0
+        self.fps = fps
+        self.segment_frames = max(1, segment_frames)
+        self.max_workers = max(1, max_workers)
+        self.pending = [
+            (start, min(start + self.segment_frames - 1, frame_end))
+            for start in range(frame_start, frame_end + 1, self.segment_frames)
+        ]
+        self.segments = []   # output paths, in order
+        self.running = []    # (proc, log_file, segment_path, start, end)
+        # Segment encodes that failed; raised from finish(), as Blender swallows
+        # exceptions raised inside render_write handlers
+        self.failures = []
+
+    def frame_path(self, frame):
+        return os.path.join(self.frames_dir, frame_file(frame))
+
+    def segment_path(self, start):
+        return os.path.join(self.frames_dir, f"segment_{start:04d}.mp4")
+
+    def on_render_write(self, scene, *args):
+        self.poll()
+
+    def poll(self):
+        """Reap finished encodes and launch segments that are ready."""
+        for job in [j for j in self.running if j[0].poll() is not None]:
+            self.running.remove(job)
+            self._check(job)
+
+        # After a failure the output is lost anyway - don't start more encodes
+        while self.pending and len(self.running) < self.max_workers and not self.failures:
+            start, end = self.pending[0]
+            segment_path = self.segment_path(start)
+            if self.frame_cache and not self.refresh and self.frame_cache.restore_segment(start, end, self.tag, segment_path):
+                self.pending.pop(0)
+                self.segments.append(segment_path)
+                self.segments_reused += 1
+                print(f"Reused encoded segment {start}-{end}")
+                continue
+            if not all(os.path.exists(self.frame_path(f)) for f in range(start, end + 1)):
+                break
+            self.pending.pop(0)
+            self._launch(start, end)
+
+    def _launch(self, start, end):
+        count = end - start + 1
+        segment_path = self.segment_path(start)
+        ffmpeg_cmd = [
+            "ffmpeg", "-y",
+            "-framerate", str(self.fps),
+            "-start_number", str(start),
+            "-i", os.path.join(self.frames_dir, "frame_%04d.png"),
+            "-frames:v", str(count),
+            *self.video_args,
+            # Closed GOPs with no scene-cut keyframes: every segment starts on an IDR
+            "-g", str(count),
+            "-flags", "+cgop",
+            *(["-sc_threshold", "0"] if "libx264" in self.video_args else []),
+            segment_path
+        ]
+        print(f"Encoding segment {start}-{end} ({len(self.running) + 1}/{self.max_workers} workers busy)")
+        log_file = tempfile.TemporaryFile(mode="w+")
+        proc = subprocess.Popen(ffmpeg_cmd, stdout=log_file, stderr=log_file)
+        self.segments.append(segment_path)
+        self.running.append((proc, log_file, segment_path, start, end))
+
+    def _check(self, job):
+        proc, log_file, segment_path, start, end = job
+        log_file.seek(0)
+        output = log_file.read()
+        log_file.close()
+        if proc.returncode != 0:
+            print(f"FFmpeg stderr: {output}")
+            self.failures.append(f"FFmpeg encoding failed for segment {start}-{end}: {output}")
+            return
+        print(f"Encoded segment {start}-{end}")
+        fps = encode_fps(output)
+        if fps:
+            self.encode_fps.append(fps)
+        if self.frame_cache:
+            self.frame_cache.store_segment(segment_path, start, end, self.tag)
+
+    def abort(self):
+        for proc, log_file, *_ in self.running:
+            proc.kill()
+            proc.wait()
+            log_file.close()
+        self.running = []
+
+    def finish(self, output_path):
+        """Encode any remaining segments, wait for all of them and concatenate."""
+        while self.running or (self.pending and not self.failures):
+            self.poll()
+            if self.pending and len(self.running) < self.max_workers and not self.failures:
+                start, end = self.pending[0]
+                raise RuntimeError(f"Frames missing for segment {start}-{end}")
+            if self.running:
+                job = self.running.pop(0)
+                job[0].wait()
+                self._check(job)
+        if self.failures:
+            raise RuntimeError("; ".join(self.failures))
+
+        list_path = os.path.join(self.frames_dir, "segments.txt")
+        with open(list_path, "w") as f:
+            for segment_path in self.segments:
+                f.write(f"file '{segment_path}'\n")
+
+        ffmpeg_cmd = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", list_path,
+            "-c", "copy",
+            output_path
+        ]
+        print(f"Running: {' '.join(ffmpeg_cmd)}")
+        result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+        if result.stderr:
+            print(f"FFmpeg stderr: {result.stderr}")
+        if result.returncode != 0:
+            raise RuntimeError(f"FFmpeg concat failed: {result.stderr}")
+
+
+def render_chunked(scene, output_path, fps, segment_frames, encode_workers, frame_cache=None, refresh=False,
+                   video_args=X264_ARGS):
+    """Render to PNG frames while a ChunkedEncoder encodes finished segments."""
+    frames_dir = tempfile.mkdtemp(prefix="blender_frames_")
+    encoder = ChunkedEncoder(
+        frames_dir, fps, scene.frame_start, scene.frame_end, segment_frames, encode_workers,
+        frame_cache, refresh, video_args,
+    )
+    bpy.app.handlers.render_write.append(encoder.on_render_write)
+    try:
+        scene.render.filepath = os.path.join(frames_dir, "frame_")
+        with timed("frame_cache"):
+            to_render = reuse_cached_frames(scene, frames_dir, frame_cache, refresh)
+        # Segments made entirely of cached frames can start encoding right away
+        encoder.poll()
+
+        print(f"Rendering frames {scene.frame_start}-{scene.frame_end} to: {frames_dir} "
+              f"(encoding {segment_frames}-frame segments, {encode_workers} workers)")
+        if to_render:
+            # Segment encodes run in parallel with this
+            with timed("render"), checkpointing(frame_cache, frames_dir, refresh):
+                bpy.ops.render.render(animation=True)
+        if frame_cache:
+            with timed("frame_cache"):
+                frame_cache.store(frames_dir, to_render, replace=refresh)
+
+        print("\n[4/4] Finishing segment encodes...")
+        # Only the encode work left once rendering is done
+        with timed("encode"):
+            encoder.finish(output_path)
+        print(f"Joined {len(encoder.segments)} segments")
+        check_output(output_path)
+        total = scene.frame_end - scene.frame_start + 1
+        return {
+            "frames_rendered": len(to_render),
+            "frames_reused": total - len(to_render),
+            "segments_reused": encoder.segments_reused,
+            # Per ffmpeg process; segments encode in parallel
+            "encode_fps": round(sum(encoder.encode_fps) / len(encoder.encode_fps), 1) if encoder.encode_fps else None,
+        }
+    except BaseException:
+        encoder.abort()
+        raise
+    finally:
+        bpy.app.handlers.render_write.remove(encoder.on_render_write)
+        shutil.rmtree(frames_dir, ignore_errors=True)
+
+
+def render(args):
+    """
+    Configure the currently loaded scene and render it to args["output"].
+
+    Returns the frame range that was rendered, frame counts and per-phase
+    timings. Used by main() for one-shot Blender runs and by blender_server.py
+    for warm, long-lived ones.
+    """
+    timings.clear()
+    if args["encode_mode"] not in ENCODE_MODES:
+        raise RuntimeError(f"Unknown encode mode: {args['encode_mode']}. Available: {list(ENCODE_MODES)}")
+    if args["quality"] not in QUALITIES:
+        raise RuntimeError(f"Unknown quality: {args['quality']}. Available: {list(QUALITIES)}")
+    if args["draft_engine"] not in DRAFT_ENGINES:
+        raise RuntimeError(f"Unknown draft engine: {args['draft_engine']}. Available: {list(DRAFT_ENGINES)}")
+    if args["output_format"] not in OUTPUT_FORMATS:
+        raise RuntimeError(f"Unknown output format: {args['output_format']}. Available: {list(OUTPUT_FORMATS)}")
+    draft = args["quality"] == "draft"
+    if args["output_format"] == "gif" and not draft:
+        raise RuntimeError("GIF output is only available for draft renders")
+    if args["renditions"] and draft:
+        raise RuntimeError("Renditions are only available for final renders")
+    if args["branding"] and draft:
+        raise RuntimeError("Branding is only available for final renders")
+
+    print("\nSettings:")
     print(f"  Output: {args['output']}")
     print(f"  Resolution: {args['width']}x{args['height']}")
     print(f"  Samples: {args['samples']}")
+    if args["time_budget"]:
+        print(f"  Time budget: {args['time_budget']}s")
     print(f"  FPS: {args['fps']}")
+    print(f"  Quality: {args['quality']}")
+    print(f"  Encode mode: {args['encode_mode']}")
     if args['duration']:
         print(f"  Duration: {args['duration']}s (override)")
     else:
-        print(f"  Duration: (using file default)")
+        print("  Duration: (using file default)")
 
     # Setup GPU
     print("\n[1/3] Configuring GPU...")
-    gpu_enabled = setup_gpu()
+    with timed("gpu_setup"):
+        gpu_enabled = setup_gpu()
 
     # Setup render settings
     print("\n[2/3] Configuring render...")
-    setup_render(args, gpu_enabled)
+    with timed("scene_setup"):
+        setup_render(args, gpu_enabled)
+        setup_frame_range(args)
+        if draft:
+            setup_draft(args)
+        else:
+            bpy.context.scene.frame_step = args["frame_step"] or 1
+            if bpy.context.scene.frame_step > 1:
+                print(f"Frame step: {bpy.context.scene.frame_step} (interpolated to {args['fps']} fps)")
+        base_layers = brand_groups = text_position = None
+        if args["branding"]:
+            base_layers = BaseLayers(bpy.context.scene, args["branding"].get("text_object", "Channel_Name"))
+            brand_groups = base_layers.prepare()
+            text_position = base_layers.text_position()
 
-    # Render to PNG frames
+    if draft:
+        encoder = {"codec": args["output_format"] if args["output_format"] == "gif" else "h264",
+                   "encoder": "gif" if args["output_format"] == "gif" else "libx264",
+                   "fallback": False, "reason": None}
+    else:
+        with timed("encoder_probe"):
+            encoder = select_encoder(args["codec"], args["encoder"])
+        video_args = encoder_video_args(
+            encoder["encoder"], args["preset"], args["crf"], args["bitrate"], args["encode_threads"], args["gop"]
+        )
+        print(f"Encoder: {encoder['encoder']}" + (f" (fallback: {encoder['reason']})" if encoder["fallback"] else ""))
+
+    renditions = None
+    if args["renditions"]:
+        renditions = []
+        for rendition in args["renditions"]:
+            with timed("encoder_probe"):
+                selection = select_encoder(rendition["codec"] or "h264", rendition["encoder"] or "auto")
+            renditions.append({
+                **rendition,
+                **selection,
+                "video_args": encoder_video_args(
+                    selection["encoder"], rendition["preset"], rendition["crf"], rendition["bitrate"],
+                    args["encode_threads"], args["gop"],
+                ),
+            })
+            print(f"Rendition {rendition['name']}: {rendition['resolution'][0]}x{rendition['resolution'][1]}"
+                  f"{' crop ' + str(rendition['crop']) if rendition['crop'] else ''}, {selection['encoder']}")
+
+    # Render and encode
     print("\n[3/3] Rendering...")
     print("=" * 60)
 
-    frames_dir = tempfile.mkdtemp(prefix="blender_frames_")
     scene = bpy.context.scene
-    scene.render.filepath = os.path.join(frames_dir, "frame_")
+    frame_cache = None
+    if args["frame_cache_dir"] and args["frame_cache_key"]:
+        frame_cache = FrameCache(
+            args["frame_cache_dir"], args["frame_cache_key"], args["frame_cache_max_bytes"],
+            args["frame_cache_max_age"], ext="exr" if base_layers else "png",
+        )
 
-    print(f"Rendering {scene.frame_end} frames to: {frames_dir}")
-    bpy.ops.render.render(animation=True)
+    composite = overlay = text_path = None
+    branded = {}
+    if base_layers:
+        def composite_frames(frames_dir, output_dir):
+            branded["colors"] = composite_branding(
+                scene, frames_dir, output_dir, brand_groups, args["branding"].get("palette") or {}
+            )
+        composite = composite_frames
+        fd, text_path = tempfile.mkstemp(prefix="branding_", suffix=".txt")
+        os.close(fd)
+        overlay = text_overlay(args["branding"], text_position, text_path)
 
-    # Verify frames were created
-    import glob
-    frames = glob.glob(os.path.join(frames_dir, "frame_*.png"))
-    print(f"Created {len(frames)} PNG frames")
-    if len(frames) == 0:
-        shutil.rmtree(frames_dir)
-        raise RuntimeError("No frames were rendered!")
+    telemetry = None
+    if args["telemetry_file"]:
+        telemetry = FrameTelemetry(scene)
+        telemetry.register(bpy.app.handlers)
 
-    # List first few frames for debugging
-    frames.sort()
-    print(f"First frame: {os.path.basename(frames[0])}")
-    print(f"Last frame: {os.path.basename(frames[-1])}")
-
-    # Encode with libx264
-    print("\n[4/4] Encoding with libx264...")
-    output_path = args["output"]
-    fps = args["fps"]
-
-    ffmpeg_cmd = [
-        "ffmpeg", "-y",
-        "-framerate", str(fps),
-        "-i", os.path.join(frames_dir, "frame_%04d.png"),
-        "-c:v", "libx264",
-        "-preset", "fast",
-        "-crf", "23",
-        "-pix_fmt", "yuv420p",
-        output_path
-    ]
+    budget = RenderBudget(scene, args["time_budget"], args["frame_time_limit"])
+    budget.register(bpy.app.handlers)
 
-    print(f"Running: {' '.join(ffmpeg_cmd)}")
-    result = subprocess.run(ffmpeg_cmd, capture_output=True, text=True)
+    @contextlib.contextmanager
+    def untracked():
+        # Renders that aren't part of the job (the interpolation check's reference frames)
+        with budget.paused(bpy.app.handlers):
+            with telemetry.paused(bpy.app.handlers) if telemetry else contextlib.nullcontext():
+                yield
 
-    # Always print FFmpeg output for debugging
-    if result.stdout:
-        print(f"FFmpeg stdout: {result.stdout}")
-    if result.stderr:
-        print(f"FFmpeg stderr: {result.stderr}")
+    try:
+        if draft:
+            # Drafts are streamed: no frame files, nothing worth caching per frame.
+            # Every frame_step'th frame, shown frame_step times as long.
+            fps = f"{args['fps']}/{scene.frame_step}"
+            video_args = DRAFT_GIF_ARGS if args["output_format"] == "gif" else DRAFT_X264_ARGS
+            stats = render_stream(scene, args["output"], fps, video_args)
+        elif scene.frame_step > 1 or base_layers:
+            if args["encode_mode"] != "frames":
+                # Interpolation, its check and compositing need the frame files
+                print(f"{'Branding' if base_layers else f'Frame step {scene.frame_step}'}: "
+                      f"using frames mode instead of {args['encode_mode']}")
+            stats = render_frames(
+                scene, args["output"], args["fps"], frame_cache, args["frame_cache_refresh"],
+                args["interpolation_check"], video_args, renditions, composite, overlay, untracked,
+            )
+        elif args["encode_mode"] == "stream":
+            if frame_cache:
+                print("Frame cache is not used in stream mode (no frame files)")
+            stats = render_stream(scene, args["output"], args["fps"], video_args, renditions)
+        elif args["encode_mode"] == "chunked" and not renditions:
+            stats = render_chunked(
+                scene, args["output"], args["fps"], args["segment_frames"], args["encode_workers"],
+                frame_cache, args["frame_cache_refresh"], video_args,
+            )
+        else:
+            if renditions and args["encode_mode"] == "chunked":
+                # Segments would have to be split, encoded and joined per rendition
+                print("Renditions: using frames mode instead of chunked")
+            stats = render_frames(
+                scene, args["output"], args["fps"], frame_cache, args["frame_cache_refresh"],
+                video_args=video_args, renditions=renditions,
+            )
+    finally:
+        budget.unregister(bpy.app.handlers)
+        if base_layers:
+            base_layers.restore()
+        if text_path:
+            os.unlink(text_path)
+        if telemetry:
+            telemetry.unregister(bpy.app.handlers)
+            # Written even for failed renders - the slow/broken frame is what we want to see
+            telemetry.write(
+                args["telemetry_file"],
+                template=getattr(bpy.data, "filepath", None),
+                encode_mode=args["encode_mode"],
+                resolution=[args["width"], args["height"]],
+                samples=scene.cycles.samples,
+                frame_start=scene.frame_start,
+                frame_end=scene.frame_end,
+            )
+            print(f"Frame telemetry: {len(telemetry.frames)} frames -> {args['telemetry_file']}")
 
-    if result.returncode != 0:
-        print(f"FFmpeg encoding failed!")
-        shutil.rmtree(frames_dir)
-        raise RuntimeError(f"FFmpeg encoding failed: {result.stderr}")
+    return {
+        "frame_start": scene.frame_start,
+        "frame_end": scene.frame_end,
+        **stats,
+        "sampling": budget.report(),
+        # Stream mode's encoder runs at the render's pace, so it has no meaningful fps.
+        # With renditions, fps is that of the one pass encoding all of them.
+        "encode": {**({} if renditions else encoder), "fps": stats.pop("encode_fps", None)},
+        "renditions": [
+            {key: r[key] for key in ("name", "codec", "encoder", "fallback", "reason")} for r in renditions
+        ] if renditions else None,
+        "branding": {
+            "groups": brand_groups,
+            "colors": branded.get("colors"),
+            "text_position": args["branding"].get("text_position") or text_position,
+        } if base_layers else None,
+        "draft": {
+            "engine": args["draft_engine"],
+            "resolution_percentage": args["draft_scale"],
+            "samples": scene.cycles.samples,
+            "frame_step": scene.frame_step,
+            "output_format": args["output_format"],
+            **(estimate_full_render(args, scene, budget, timings.get("render")) or {}),
+        } if draft else None,
+        "timings": {phase: round(seconds, 3) for phase, seconds in timings.items()},
+    }
 
-    # Verify output file was created and has content
-    if not os.path.exists(output_path):
-        shutil.rmtree(frames_dir)
-        raise RuntimeError(f"Output file was not created: {output_path}")
 
-    output_size = os.path.getsize(output_path)
-    print(f"Output file size: {output_size} bytes")
-    if output_size == 0:
-        shutil.rmtree(frames_dir)
-        raise RuntimeError("Output file is empty (0 bytes)")
+def main():
+    print("=" * 60)
+    print("Blender .blend File Renderer")
+    print("=" * 60)
 
-    # Cleanup frames
-    shutil.rmtree(frames_dir)
+    args = parse_args()
+    result = {**render(args), "script_started_at": SCRIPT_STARTED_AT}
+    # Machine-readable summary for the handler (last line wins)
+    print(f"RESULT: {json.dumps(result)}")
 
     print("=" * 60)
-    print(f"Render complete! Output: {output_path}")
+    print(f"Render complete! Output: {args['output']}")
 
 
 if __name__ == "__main__":
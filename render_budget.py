@@ -0,0 +1,169 @@
+"""
+Noise-threshold and time-budget sampling.
+
+Instead of a fixed sample count a job can ask for:
+
+    noise_threshold   Cycles adaptive sampling stops pixels once they are this clean
+    min_samples       ... but not before this many samples (0 = Cycles default)
+    frame_time_limit  Seconds of sampling per frame at most (Cycles time_limit)
+    time_budget       Seconds for rendering the whole clip
+
+"samples" stays the upper bound. With a time budget, RenderBudget hooks
+bpy.app.handlers and, before every frame, sets the frame's time limit to its
+share of what is left of the budget, minus the per-frame overhead (scene sync,
+BVH, saving) measured on the frames so far, so slow early frames are made up
+for by later ones and the clip finishes inside the budget. It also records the
+samples each frame actually reached.
+
+Used from render_blend.py inside Blender, so it must stay dependency-free.
+"""
+
+import contextlib
+import re
+import time
+
+_SAMPLE = re.compile(r"Sample (\d+)/(\d+)")
+
+# Cycles treats time_limit 0 as "no limit", so never go below this
+MIN_FRAME_TIME_LIMIT = 0.1
+
+
+def configure_sampling(scene, samples, noise_threshold=None, min_samples=None, frame_time_limit=None):
+    """Set max samples, adaptive sampling and the per-frame time limit on the scene."""
+    cycles = scene.cycles
+    cycles.samples = samples
+    if noise_threshold:
+        cycles.use_adaptive_sampling = True
+        cycles.adaptive_threshold = noise_threshold
+        cycles.adaptive_min_samples = min_samples or 0
+        print(f"Adaptive sampling: noise threshold {noise_threshold}, "
+              f"samples {min_samples or 'auto'}-{samples}")
+    if frame_time_limit:
+        cycles.time_limit = max(frame_time_limit, MIN_FRAME_TIME_LIMIT)
+        print(f"Per-frame time limit: {cycles.time_limit}s")
+
+
+class RenderBudget:
+    """Spreads a clip-wide time budget over the frames and records effective samples."""
+
+    def __init__(self, scene, time_budget=None, frame_time_limit=None):
+        """
+        Args:
+            scene: Scene being rendered
+            time_budget: Seconds for all frames still to render (None = no clip budget)
+            frame_time_limit: Hard per-frame cap on top of the budget share
+        """
+        self.scene = scene
+        self.time_budget = time_budget
+        self.frame_time_limit = frame_time_limit
+        self.started = time.perf_counter()
+        self.deadline = self.started + time_budget if time_budget else None
+        self.finished = None       # When the last frame was done (the encode may run on after it)
+        self.overhead = None       # Average non-sampling seconds per frame
+        self.frames = []           # {"frame", "seconds", "samples", "time_limit"}
+        self._frame = None
+
+    def register(self, handlers):
+        handlers.render_pre.append(self.on_render_pre)
+        handlers.render_post.append(self.on_render_post)
+        handlers.render_stats.append(self.on_render_stats)
+
+    def unregister(self, handlers):
+        for name, callback in (("render_pre", self.on_render_pre), ("render_post", self.on_render_post),
+                               ("render_stats", self.on_render_stats)):
+            if callback in getattr(handlers, name):
+                getattr(handlers, name).remove(callback)
+
+    @contextlib.contextmanager
+    def paused(self, handlers):
+        """Leave renders inside the block out of the report, and their time off the budget."""
+        self.unregister(handlers)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            paused = time.perf_counter() - start
+            self.started += paused
+            if self.finished is not None:
+                # Paused after that frame: the render time up to it is unchanged
+                self.finished += paused
+            if self.deadline is not None:
+                self.deadline += paused
+            self.register(handlers)
+
+    def frame_time_limit_for(self, frame: int) -> float:
+        """Sampling seconds the next frame may use, or None for no limit."""
+        limit = self.frame_time_limit
+        if self.deadline is not None:
+            # Frames from here to the end; cached frames in between make this conservative
+            remaining_frames = max((self.scene.frame_end - frame) // max(self.scene.frame_step, 1) + 1, 1)
+            share = (self.deadline - time.perf_counter()) / remaining_frames - (self.overhead or 0.0)
+            limit = share if limit is None else min(limit, share)
+        return None if limit is None else max(limit, MIN_FRAME_TIME_LIMIT)
+
+    def on_render_pre(self, scene, *args):
+        limit = self.frame_time_limit_for(scene.frame_current)
+        if limit is not None:
+            scene.cycles.time_limit = limit
+        now = time.perf_counter()
+        self._frame = {
+            "frame": scene.frame_current,
+            "started": now,
+            "first_sample": None,
+            "last_sample": None,
+            "samples": 0,
+            "time_limit": round(limit, 3) if limit is not None else None,
+        }
+
+    def on_render_stats(self, stats, *args):
+        if self._frame is None:
+            return
+        sample = _SAMPLE.search(stats)
+        if sample:
+            now = time.perf_counter()
+            if self._frame["first_sample"] is None:
+                self._frame["first_sample"] = now
+            self._frame["last_sample"] = now
+            self._frame["samples"] = max(self._frame["samples"], int(sample.group(1)))
+
+    def on_render_post(self, scene, *args):
+        frame = self._frame
+        if frame is None:
+            return
+        now = time.perf_counter()
+        seconds = now - frame.pop("started")
+        first_sample, last_sample = frame.pop("first_sample"), frame.pop("last_sample")
+        if first_sample is not None:
+            # Everything except the sampling itself
+            overhead = seconds - (last_sample - first_sample)
+            count = len(self.frames)
+            self.overhead = overhead if self.overhead is None else (self.overhead * count + overhead) / (count + 1)
+        if not frame["samples"]:
+            frame["samples"] = scene.cycles.samples
+        frame["seconds"] = round(seconds, 3)
+        self.frames.append(frame)
+        self._frame = None
+        self.finished = now
+
+    def report(self) -> dict:
+        """
+        Effective samples and budget outcome for the job output.
+
+        render_seconds ends with the last rendered frame, so the encode after it
+        doesn't count against the budget.
+        """
+        samples = [f["samples"] for f in self.frames]
+        elapsed = (self.finished or self.started) - self.started
+        report = {
+            "frames": len(self.frames),
+            "samples_effective": {
+                "mean": round(sum(samples) / len(samples), 1),
+                "min": min(samples),
+                "max": max(samples),
+            } if samples else None,
+            "render_seconds": round(elapsed, 3),
+        }
+        if self.time_budget:
+            report["time_budget"] = self.time_budget
+            report["budget_met"] = elapsed <= self.time_budget
+        return report
@@ -0,0 +1,216 @@
+"""
+Render-time and VRAM predictions from the worker's own render history.
+
+Every completed final-quality render appends one record to a local JSON-lines
+file (RENDER_HISTORY_FILE, keep it on a network volume to share it between
+workers):
+
+    {"template": "ai_cpu_activation", "gpu": "NVIDIA GeForce RTX 4090",
+     "pixels": 2073600, "samples": 118.4, "frames": 48,
+     "frame_seconds": 6.1, "setup_seconds": 0.8, "fixed_seconds": 14.2,
+     "peak_mem_mb": 5210.0, "time": 1760000000.0}
+
+Per-frame figures are means over the frame telemetry sidecar; "fixed_seconds"
+is the Blender run's time outside the frames (startup, device setup, encode).
+A frame costs its scene sync/BVH setup plus sampling time proportional to
+pixels x samples, so predict() takes the medians of the newest matching
+records (same template and GPU, or the template on any GPU when this GPU has
+no history) and scales them to the job:
+
+    seconds = fixed + frames * (setup + cost_per_pixel_sample * pixels * samples)
+    vram    = scene_mem + FILM_BYTES_PER_PIXEL * pixels
+
+Jobs with a noise_threshold are predicted at their maximum samples, so the
+estimate errs on the high side for them.
+"""
+
+import json
+import math
+import os
+import statistics
+import threading
+import time
+
+RENDER_HISTORY_FILE = os.environ.get("RENDER_HISTORY_FILE", "/tmp/render_history.jsonl")
+# Records kept in the file and matching records a prediction is based on
+RENDER_HISTORY_MAX = int(os.environ.get("RENDER_HISTORY_MAX", 5000))
+PREDICTOR_WINDOW = int(os.environ.get("PREDICTOR_WINDOW", 20))
+# Fewer matching records than this and there is no prediction
+PREDICTOR_MIN_RECORDS = int(os.environ.get("PREDICTOR_MIN_RECORDS", 3))
+
+# Render result, denoising and pass buffers per pixel (float RGBA passes)
+FILM_BYTES_PER_PIXEL = 64
+
+_lock = threading.Lock()
+
+
+def frame_range(config: dict, scene: dict) -> tuple:
+    """
+    (first, last) frame a job renders, or None if it can't be known before Blender loads the template.
+
+    Mirrors render_blend.py: a duration re-times the animation to frames
+    1..duration*fps, then an explicit range or a shard narrows it.
+    """
+    if config.get("duration") and config.get("fps"):
+        first, last = 1, int(config["duration"] * config["fps"])
+    elif scene:
+        first, last = scene["frame_start"], scene["frame_end"]
+    else:
+        first = last = None
+
+    if config.get("shard_count"):
+        if first is None:
+            return None
+        index, count = config.get("shard_index") or 0, config["shard_count"]
+        base, extra = divmod(last - first + 1, count)
+        start = first + index * base + min(index, extra)
+        return start, start + base + (1 if index < extra else 0) - 1
+    if config.get("frame_start") is not None and config.get("frame_end") is not None:
+        return config["frame_start"], config["frame_end"]
+    return (first, last) if first is not None else None
+
+
+def frames_rendered(first: int, last: int, frame_step: int = None) -> int:
+    """Frames Blender renders for first..last with every frame_step-th frame rendered."""
+    return math.ceil((last - first + 1) / (frame_step or 1))
+
+
+def split_ranges(first: int, last: int, frame_step: int, frames_per_chunk: int) -> list:
+    """
+    Consecutive [start, end] chunks of first..last with at most frames_per_chunk rendered frames each.
+
+    Chunks start on rendered frames (first + k * frame_step), so together
+    they render exactly the frames the whole range would.
+    """
+    span = frames_per_chunk * (frame_step or 1)
+    return [[start, min(start + span - 1, last)] for start in range(first, last + 1, span)]
+
+
+# =============================================================================
+# History
+# =============================================================================
+def load_history(path: str = RENDER_HISTORY_FILE) -> list:
+    """Every readable record of the history file (oldest first)."""
+    records = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    except OSError:
+        pass
+    return records
+
+
+def history_record(template: str, gpu: str, config: dict, frames: list, blender_seconds: float) -> dict:
+    """
+    History record of one render.
+
+    Args:
+        template: Template the render used (name, or content hash for template_url)
+        gpu: GPU name ("" = CPU)
+        config: The job's config
+        frames: Per-frame telemetry records (frame_telemetry.FrameTelemetry)
+        blender_seconds: Wall time of the whole Blender run
+
+    Returns None when there is nothing to learn from (no frames rendered).
+    """
+    timed = [f for f in frames if f.get("seconds") is not None]
+    if not timed:
+        return None
+    frame_seconds = statistics.fmean(f["seconds"] for f in timed)
+    peaks = [f["peak_mem_mb"] for f in timed if f.get("peak_mem_mb")]
+    return {
+        "template": template,
+        "gpu": gpu or "cpu",
+        "pixels": config["resolution"][0] * config["resolution"][1],
+        "samples": statistics.fmean(f.get("samples") or config["samples"] for f in timed),
+        "frames": len(timed),
+        "frame_seconds": round(frame_seconds, 4),
+        "setup_seconds": round(statistics.fmean(f.get("setup_seconds") or 0.0 for f in timed), 4),
+        "fixed_seconds": round(max(blender_seconds - frame_seconds * len(timed), 0.0), 3),
+        "peak_mem_mb": max(peaks) if peaks else None,
+        "time": time.time(),
+    }
+
+
+def append_history(record: dict, path: str = RENDER_HISTORY_FILE, max_records: int = RENDER_HISTORY_MAX):
+    """Add a record, dropping the oldest ones once the file holds more than max_records."""
+    with _lock:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        records = load_history(path)
+        if len(records) > max_records:
+            # Write-then-rename so a crash never leaves a truncated history behind
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w") as f:
+                for kept in records[-max_records:]:
+                    f.write(json.dumps(kept) + "\n")
+            os.replace(tmp_path, path)
+
+
+# =============================================================================
+# Prediction
+# =============================================================================
+def predict(history: list, template: str, gpu: str, config: dict, frames: int) -> dict:
+    """
+    Estimate a render from the history.
+
+    Args:
+        history: Records from load_history()
+        template: Template key as used in history_record()
+        gpu: GPU name of this worker ("" = CPU)
+        config: The job's config (resolution, samples, frame_time_limit, time_budget)
+        frames: Frames Blender will render
+
+    Returns {"seconds", "frame_seconds", "setup_seconds", "fixed_seconds",
+    "frames", "peak_vram_mb", "basis", "same_gpu"} or None without enough
+    history.
+    """
+    gpu = gpu or "cpu"
+    matching = [r for r in history if r["template"] == template and r["gpu"] == gpu]
+    same_gpu = len(matching) >= PREDICTOR_MIN_RECORDS
+    if not same_gpu:
+        matching = [r for r in history if r["template"] == template]
+    matching = matching[-PREDICTOR_WINDOW:]
+    if len(matching) < PREDICTOR_MIN_RECORDS:
+        return None
+
+    pixels = config["resolution"][0] * config["resolution"][1]
+    # render_blend.py caps samples on CPU
+    samples = config["samples"] if gpu != "cpu" else min(config["samples"], 32)
+    setup = statistics.median(r["setup_seconds"] for r in matching)
+    fixed = statistics.median(r["fixed_seconds"] for r in matching)
+    cost = statistics.median(
+        max(r["frame_seconds"] - r["setup_seconds"], 0.0) / (r["pixels"] * r["samples"])
+        for r in matching if r["pixels"] and r["samples"]
+    )
+
+    sampling = cost * pixels * samples
+    if config.get("frame_time_limit"):
+        sampling = min(sampling, config["frame_time_limit"])
+    sampling_total = sampling * frames
+    if config.get("time_budget"):
+        # RenderBudget stops sampling in time for the clip to fit its budget
+        sampling_total = min(sampling_total, max(config["time_budget"] - setup * frames, 0.0))
+    frame_seconds = setup + sampling_total / frames if frames else 0.0
+
+    scene_mem = [r["peak_mem_mb"] - r["pixels"] * FILM_BYTES_PER_PIXEL / 1024 ** 2
+                 for r in matching if r.get("peak_mem_mb")]
+    peak_vram_mb = None
+    if scene_mem:
+        peak_vram_mb = round(max(scene_mem) + pixels * FILM_BYTES_PER_PIXEL / 1024 ** 2, 1)
+
+    return {
+        "seconds": round(fixed + frame_seconds * frames, 1),
+        "frame_seconds": round(frame_seconds, 3),
+        "setup_seconds": round(setup, 3),
+        "fixed_seconds": round(fixed, 1),
+        "frames": frames,
+        "peak_vram_mb": peak_vram_mb,
+        "basis": len(matching),
+        "same_gpu": same_gpu,
+    }
@@ -0,0 +1,147 @@
+"""
+Live render progress from Blender's output.
+
+Blender's stdout is read line by line while it renders instead of being
+buffered until exit. RenderProgress parses it:
+
+    Frame range: 1-240                              (render_blend.py)
+    Frame step: 4                                   (render_blend.py, drafts)
+    Frame cache: 96 frames reused, 144 to render    (render_blend.py)
+    Fra:12 Mem:... | Time:00:03.10 | ... | Sample 64/128   (Cycles)
+    Saved: '/tmp/.../frame_0012.png'                (frames / chunked modes)
+    Streamed frame 12 (12 total)                    (stream mode)
+    RESULT: {...}                                   (render_blend.py summary)
+
+and reports frames done, seconds per frame and ETA through a callback (the
+handler forwards them as RunPod progress updates), throttled to one update
+every PROGRESS_INTERVAL seconds. Only the last LOG_TAIL_LINES lines are kept
+for error reports; the per-sample Cycles lines are summarized, not logged.
+"""
+
+import collections
+import json
+import os
+import re
+import time
+
+PROGRESS_INTERVAL = float(os.environ.get("PROGRESS_INTERVAL", 2))
+LOG_TAIL_LINES = int(os.environ.get("LOG_TAIL_LINES", 200))
+
+_FRAME_RANGE = re.compile(r"^Frame range: (\d+)-(\d+)$")
+_FRAME_STEP = re.compile(r"^Frame step: (\d+)")
+_FRAMES_REUSED = re.compile(r"^Frame cache: (\d+) frames reused")
+_CYCLES_PROGRESS = re.compile(r"^Fra:(\d+)\b")
+_CYCLES_SAMPLE = re.compile(r"Sample (\d+)/(\d+)")
+_FRAME_SAVED = re.compile(r"^Saved: '.*?(\d+)\.\w+'")
+_FRAME_STREAMED = re.compile(r"^Streamed frame (\d+)")
+
+
+class RenderProgress:
+    """Tracks one render from its output lines."""
+
+    def __init__(self, on_update=None, interval: float = PROGRESS_INTERVAL, tail_lines: int = LOG_TAIL_LINES):
+        """
+        Args:
+            on_update: Called with a progress dict (throttled); None = log only
+            interval: Minimum seconds between updates
+            tail_lines: Number of log lines kept for error reports
+        """
+        self.on_update = on_update
+        self.interval = interval
+        self.lines = collections.deque(maxlen=tail_lines)
+        self.result = {}
+
+        self.start_time = time.time()
+        self.first_frame_time = None
+        self.last_update = 0.0
+        self.frames_total = None
+        self.frames_reused = 0
+        self.frames_done = set()
+        self.frame = None
+        self.sample = None
+        self.samples = None
+
+    def feed(self, line: str):
+        """Consume one line of Blender output."""
+        line = line.rstrip("\n")
+        match = _CYCLES_PROGRESS.match(line)
+        if match:
+            # Cycles prints one of these per sample - summarize instead of logging
+            frame = int(match.group(1))
+            if self.frame is not None and frame != self.frame:
+                self._frame_done(self.frame)
+            self._frame_started(frame)
+            sample = _CYCLES_SAMPLE.search(line)
+            if sample:
+                self.sample, self.samples = int(sample.group(1)), int(sample.group(2))
+            self.update()
+            return
+
+        print(line)
+        self.lines.append(line)
+
+        if line.startswith("RESULT: "):
+            try:
+                self.result = json.loads(line[len("RESULT: "):])
+            except ValueError:
+                pass
+        elif _FRAME_RANGE.match(line):
+            start, end = _FRAME_RANGE.match(line).groups()
+            self.frames_total = int(end) - int(start) + 1
+        elif _FRAME_STEP.match(line) and self.frames_total:
+            step = int(_FRAME_STEP.match(line).group(1))
+            self.frames_total = -(-self.frames_total // step)
+        elif _FRAMES_REUSED.match(line):
+            self.frames_reused = int(_FRAMES_REUSED.match(line).group(1))
+        else:
+            match = _FRAME_SAVED.match(line) or _FRAME_STREAMED.match(line)
+            if match:
+                self._frame_started(int(match.group(1)))
+                self._frame_done(int(match.group(1)))
+                self.update()
+
+    def _frame_started(self, frame: int):
+        if self.first_frame_time is None:
+            self.first_frame_time = time.time()
+        self.frame = frame
+
+    def _frame_done(self, frame: int):
+        self.frames_done.add(frame)
+        self.sample = None
+
+    def snapshot(self) -> dict:
+        """Current progress as a JSON-serializable dict."""
+        now = time.time()
+        done = len(self.frames_done)
+        seconds_per_frame = (now - self.first_frame_time) / done if done and self.first_frame_time else None
+        remaining = None
+        if self.frames_total is not None:
+            remaining = max(self.frames_total - self.frames_reused - done, 0)
+        eta = remaining * seconds_per_frame if remaining is not None and seconds_per_frame else None
+        return {
+            "stage": "rendering",
+            "frames_done": done + self.frames_reused,
+            "frames_total": self.frames_total,
+            "frames_reused": self.frames_reused,
+            "frame": self.frame,
+            "sample": self.sample,
+            "samples": self.samples,
+            "seconds_per_frame": round(seconds_per_frame, 2) if seconds_per_frame else None,
+            "eta_seconds": round(eta, 1) if eta is not None else None,
+            "elapsed_seconds": round(now - self.start_time, 1),
+        }
+
+    def update(self, force: bool = False):
+        """Send a progress update unless one went out less than interval seconds ago."""
+        if not self.on_update or (not force and time.time() - self.last_update < self.interval):
+            return
+        self.last_update = time.time()
+        try:
+            self.on_update(self.snapshot())
+        except Exception as e:
+            # Progress is best effort - never fail the render over it
+            print(f"WARNING: progress update failed: {e}")
+
+    def tail(self, max_chars: int = 2000) -> str:
+        """Last captured log lines, for error reports."""
+        return "\n".join(self.lines)[-max_chars:]
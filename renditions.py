@@ -0,0 +1,179 @@
+"""
+Several renditions of one render: sizes, aspect crops and codecs.
+
+A job's "outputs" list asks for every version of the clip it needs:
+
+    "outputs": [
+        {"name": "landscape", "resolution": [1920, 1080]},
+        {"name": "720p", "resolution": [1280, 720], "bitrate": "4M"},
+        {"name": "vertical", "resolution": [1080, 1920], "crop": "9:16", "codec": "hevc"},
+    ]
+
+    name        Unique per job, used for the artifact's file name (default WxH)
+    resolution  Output size [width, height]
+    crop        "W:H" for a centered crop of that aspect ratio, or a pixel box
+                [x, y, width, height] of the render (default: the whole frame)
+    codec, encoder, preset, crf, bitrate
+                As for single-output jobs (default: the job's own settings)
+
+Blender renders the frames once, at the job's resolution (default: the
+largest uncropped rendition), and a single ffmpeg pass splits the decoded
+frames into a crop/scale chain and an encoder per rendition, so the PNGs are
+read and decoded only once however many renditions there are.
+
+Used by handler.py and, inside Blender, by render_blend.py, so it must stay
+dependency-free (encoders.py is too).
+"""
+
+import os
+import re
+
+from encoders import validate_settings
+
+RENDITION_KEYS = ("name", "resolution", "crop", "codec", "encoder", "preset", "crf", "bitrate")
+# Job settings a rendition inherits unless it sets its own
+INHERITED_KEYS = ("codec", "encoder", "preset", "crf", "bitrate")
+
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+_ASPECT = re.compile(r"^(\d+):(\d+)$")
+
+
+def render_resolution(outputs: list) -> list:
+    """Smallest render resolution no uncropped rendition has to upscale from, or None."""
+    sizes = [o["resolution"] for o in outputs
+             if isinstance(o, dict) and not o.get("crop") and isinstance(o.get("resolution"), (list, tuple))
+             and len(o["resolution"]) == 2 and all(isinstance(v, int) for v in o["resolution"])]
+    if not sizes:
+        return None
+    return [max(size[0] for size in sizes), max(size[1] for size in sizes)]
+
+
+def _even(value: int) -> int:
+    return value - value % 2
+
+
+def crop_box(crop, width: int, height: int) -> list:
+    """[x, y, width, height] for a crop spec on a width x height render, or None for the whole frame."""
+    if not crop:
+        return None
+    if isinstance(crop, str):
+        match = _ASPECT.match(crop)
+        if not match or not int(match.group(1)) or not int(match.group(2)):
+            raise ValueError(f"crop must be \"W:H\" or [x, y, width, height], got {crop!r}")
+        aspect = int(match.group(1)) / int(match.group(2))
+        # Largest centered box of that aspect ratio
+        box_width, box_height = (width, round(width / aspect)) if width / height < aspect \
+            else (round(height * aspect), height)
+        box_width, box_height = _even(min(box_width, width)), _even(min(box_height, height))
+        return [_even((width - box_width) // 2), _even((height - box_height) // 2), box_width, box_height]
+
+    if not isinstance(crop, (list, tuple)) or len(crop) != 4 or any(not isinstance(v, int) or v < 0 for v in crop):
+        raise ValueError(f"crop must be \"W:H\" or [x, y, width, height], got {crop!r}")
+    x, y, box_width, box_height = crop
+    if not box_width or not box_height or x + box_width > width or y + box_height > height:
+        raise ValueError(f"crop {crop} does not fit in the {width}x{height} render")
+    return list(crop)
+
+
+def normalize(outputs: list, config: dict) -> list:
+    """
+    Validate a job's "outputs" and fill in defaults.
+
+    Args:
+        outputs: The job's rendition list
+        config: Job config; its resolution is the render size, its codec
+            settings the defaults
+
+    Returns renditions with every key of RENDITION_KEYS set and crops resolved
+    to pixel boxes of the render. Raises ValueError for an invalid list.
+    """
+    if not isinstance(outputs, list) or not outputs:
+        raise ValueError("outputs must be a non-empty list of renditions")
+    width, height = config["resolution"]
+
+    renditions = []
+    for index, output in enumerate(outputs):
+        if not isinstance(output, dict):
+            raise ValueError(f"outputs[{index}] must be an object")
+        unknown = set(output) - set(RENDITION_KEYS)
+        if unknown:
+            raise ValueError(f"outputs[{index}]: unknown keys {sorted(unknown)}")
+
+        error = validate_settings({key: output.get(key) for key in INHERITED_KEYS})
+        if error:
+            raise ValueError(f"outputs[{index}]: {error}")
+        if output.get("name") is not None and not isinstance(output["name"], str):
+            raise ValueError(f"outputs[{index}]: name must be a string")
+
+        try:
+            box = crop_box(output.get("crop"), width, height)
+        except ValueError as e:
+            raise ValueError(f"outputs[{index}]: {e}")
+        resolution = output.get("resolution") or (box[2:] if box else [width, height])
+        if (not isinstance(resolution, (list, tuple)) or len(resolution) != 2
+                or any(not isinstance(v, int) or isinstance(v, bool) or v <= 0 or v % 2 for v in resolution)):
+            raise ValueError(f"outputs[{index}]: resolution must be two positive even integers, got {resolution}")
+        source = box[2:] if box else [width, height]
+        if resolution[0] > source[0] or resolution[1] > source[1]:
+            print(f"WARNING: rendition {index} is upscaled from {source[0]}x{source[1]} "
+                  f"to {resolution[0]}x{resolution[1]} - raise the job's resolution to avoid it")
+
+        rendition = {
+            "name": output.get("name") or f"{resolution[0]}x{resolution[1]}",
+            "resolution": list(resolution),
+            "crop": box,
+        }
+        for key in INHERITED_KEYS:
+            rendition[key] = output[key] if output.get(key) is not None else config.get(key)
+        if not _NAME.match(rendition["name"]):
+            raise ValueError(f"outputs[{index}]: name may only contain letters, digits, '-' and '_'")
+        renditions.append(rendition)
+
+    names = [r["name"] for r in renditions]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Rendition names must be unique (set \"name\"): {duplicates}")
+    return renditions
+
+
+def output_paths(output_path: str, renditions: list) -> list:
+    """File per rendition: output_path for the first, output_path with the name inserted for the rest."""
+    root, ext = os.path.splitext(output_path)
+    return [output_path] + [f"{root}.{r['name']}{ext}" for r in renditions[1:]]
+
+
+def rendition_filter(rendition: dict, width: int, height: int) -> str:
+    """crop/scale chain turning a width x height frame into the rendition."""
+    chain = []
+    source = [width, height]
+    if rendition.get("crop"):
+        x, y, box_width, box_height = rendition["crop"]
+        chain.append(f"crop={box_width}:{box_height}:{x}:{y}")
+        source = [box_width, box_height]
+    if list(rendition["resolution"]) != source:
+        chain.append(f"scale={rendition['resolution'][0]}:{rendition['resolution'][1]}:flags=lanczos")
+    return ",".join(chain + ["setsar=1"])
+
+
+def ffmpeg_outputs(renditions: list, paths: list, video_args: list, width: int, height: int,
+                   prefilter: str = None, output_options: list = ()) -> list:
+    """
+    ffmpeg arguments after the input that encode every rendition in one pass.
+
+    Args:
+        renditions: Normalized renditions
+        paths: Output file per rendition (see output_paths())
+        video_args: Encoder arguments per rendition
+        width, height: Size of the input frames
+        prefilter: Filter applied once before the split (e.g. interpolation)
+        output_options: Per-output options repeated for every rendition (e.g. -frames:v)
+    """
+    labels = [f"[s{i}]" for i in range(len(renditions))]
+    graph = [f"[0:v]{prefilter + ',' if prefilter else ''}split={len(renditions)}{''.join(labels)}"]
+    for i, rendition in enumerate(renditions):
+        graph.append(f"{labels[i]}{rendition_filter(rendition, width, height)}[o{i}]")
+
+    args = ["-filter_complex", ";".join(graph)]
+    for i, (path, encoder_args) in enumerate(zip(paths, video_args)):
+        args += ["-map", f"[o{i}]", *output_options, *encoder_args, path]
+    return args
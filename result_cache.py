@@ -0,0 +1,268 @@
+"""
+Deterministic render-result cache.
+
+Identical jobs (same template content, resolution, samples, fps, duration,
+frame range and template config) produce the same MP4, so the handler looks
+the result up before starting Blender:
+
+    key = sha256(canonical JSON of {template sha256, normalized config, pipeline version})
+
+The pipeline version is a hash of render_blend.py, so changing how frames are
+rendered invalidates old entries automatically. Settings that only change how
+the work is scheduled (encode mode, segment size, ...) are left out of the key.
+frame_cache_key() additionally drops the frame range, for the per-frame cache.
+Branded jobs (branding.py) share their base-layer frames across brandings.
+Each rendition of a multi-output job (renditions.py) is cached on its own,
+so a later job asking for any subset of them reuses the stored files.
+
+Backends (RENDER_CACHE_BACKEND):
+    local  - files under RENDER_CACHE_DIR with LRU eviction at RENDER_CACHE_MAX_BYTES
+    s3     - objects under RENDER_CACHE_PREFIX in OUTPUT_BUCKET (see storage.py),
+             oldest evicted past RENDER_CACHE_MAX_BYTES; hits can be returned as URLs
+    none   - disabled
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import storage
+
+RENDER_CACHE_BACKEND = os.environ.get("RENDER_CACHE_BACKEND", "local")
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", "/tmp/render_cache")
+RENDER_CACHE_MAX_BYTES = int(os.environ.get("RENDER_CACHE_MAX_BYTES", 20 * 1024 ** 3))
+RENDER_CACHE_PREFIX = os.environ.get("RENDER_CACHE_PREFIX", "render-cache/")
+
+# Per-job "cache" input: use (read + write), refresh (write only), bypass (neither)
+CACHE_MODES = ("use", "refresh", "bypass")
+
+# Config keys that don't change the rendered pixels
+NON_RENDER_KEYS = {"encode_workers", "segment_frames", "encode_mode", "interpolation_check", "encode_threads",
+                   "admission"}
+
+# Config keys that pick which frames are rendered, not what each frame looks like
+FRAME_RANGE_KEYS = {"duration", "frame_start", "frame_end", "shard_index", "shard_count", "frame_step"}
+
+# Config keys that change the encoded video but not the rendered frames
+ENCODE_KEYS = {"codec", "encoder", "preset", "crf", "bitrate", "gop", "outputs"}
+
+# What render_blend.py does with a setting the job leaves out: spelling one of
+# these out renders the same video, so it must not change the key
+KEY_DEFAULTS = {"quality": "final", "codec": "h264", "encoder": "auto", "preset": "fast", "output_format": "mp4"}
+# ... and the defaults that depend on the quality tier
+QUALITY_DEFAULTS = {
+    "final": {"frame_step": 1},
+    "draft": {"frame_step": 2, "draft_scale": 25, "draft_engine": "cycles"},
+}
+
+# render_blend.setup_render caps the samples of CPU renders at this
+CPU_MAX_SAMPLES = 32
+
+
+# =============================================================================
+# Keys
+# =============================================================================
+_hash_memo = {}
+
+
+def file_hash(path: str) -> str:
+    """sha256 of a file, memoized on (path, size, mtime) - baked templates are hashed once."""
+    stat = os.stat(path)
+    memo_key = (path, stat.st_size, stat.st_mtime)
+    if memo_key not in _hash_memo:
+        _hash_memo[memo_key] = storage.file_sha256(path)
+    return _hash_memo[memo_key]
+
+
+def _normalize(value):
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    return value
+
+
+def _without_defaults(settings: dict, defaults: dict) -> dict:
+    """settings normalized, minus unset values and those equal to their default."""
+    normalized = {k: _normalize(v) for k, v in settings.items() if v is not None}
+    return {k: v for k, v in normalized.items() if k not in defaults or v != defaults[k]}
+
+
+def render_cache_key(template_sha256: str, config: dict, pipeline_version: str) -> str:
+    """Canonical cache key for a render: settings left at their defaults hash as if omitted."""
+    defaults = {**KEY_DEFAULTS, **QUALITY_DEFAULTS.get(config.get("quality") or "final", {})}
+    normalized = _without_defaults({k: v for k, v in config.items() if k not in NON_RENDER_KEYS}, defaults)
+    canonical = json.dumps(
+        {"template": template_sha256, "config": normalized, "pipeline": pipeline_version},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def frame_cache_key(template_sha256: str, config: dict, pipeline_version: str, gpu: bool = True) -> str:
+    """
+    Key for the per-frame cache (frame_cache.py): like render_cache_key, minus the frame range and encode.
+
+    Frames are keyed by the samples Blender actually renders, so CPU frames
+    (capped at CPU_MAX_SAMPLES) are never served to a GPU job asking for more.
+    """
+    per_frame = {k: v for k, v in config.items() if k not in FRAME_RANGE_KEYS and k not in ENCODE_KEYS}
+    if not gpu and per_frame.get("samples") is not None:
+        per_frame["samples"] = min(per_frame["samples"], CPU_MAX_SAMPLES)
+    if per_frame.get("branding"):
+        # Branded jobs cache unbranded base layers, shared by every branding of the template
+        per_frame["branding"] = {"base_layers": per_frame["branding"].get("text_object", "Channel_Name")}
+    return render_cache_key(template_sha256, per_frame, pipeline_version)
+
+
+def rendition_cache_key(template_sha256: str, config: dict, rendition: dict, pipeline_version: str) -> str:
+    """Key for one rendition: the render's settings plus the rendition's own (its name aside)."""
+    render = {k: v for k, v in config.items() if k not in ENCODE_KEYS}
+    render["rendition"] = _without_defaults({k: v for k, v in rendition.items() if k != "name"}, KEY_DEFAULTS)
+    # The job-wide gop applies to every rendition
+    render["gop"] = config.get("gop")
+    return render_cache_key(template_sha256, render, pipeline_version)
+
+
+# =============================================================================
+# Backends
+# =============================================================================
+class LocalDiskBackend:
+    """Rendered MP4s on local disk, least recently used evicted first."""
+
+    name = "local"
+
+    def __init__(self, cache_dir: str = RENDER_CACHE_DIR, max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict):
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.mp4")
+
+    def lookup(self, key: str) -> dict:
+        """Returns {"path", "size", "meta"} or None."""
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if not entry or not os.path.exists(self.path(key)):
+                return None
+            entry["last_used"] = time.time()
+            self._save_index(index)
+            return {"path": self.path(key), "size": entry["size"], "meta": entry["meta"]}
+
+    def store(self, key: str, path: str, meta: dict) -> dict:
+        with self._lock:
+            index = self._load_index()
+            tmp_path = self.path(key) + ".tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, self.path(key))
+            size = os.path.getsize(self.path(key))
+            index[key] = {"size": size, "meta": meta, "last_used": time.time()}
+            self._evict(index, keep=key)
+            self._save_index(index)
+            return {"path": self.path(key), "size": size, "meta": meta}
+
+    def _evict(self, index: dict, keep: str):
+        total = sum(e["size"] for e in index.values())
+        for key, entry in sorted(index.items(), key=lambda kv: kv[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            del index[key]
+            total -= entry["size"]
+            if os.path.exists(self.path(key)):
+                os.remove(self.path(key))
+            print(f"Evicted cached render: {key[:12]} ({entry['size']} bytes)")
+
+
+class ObjectStoreBackend:
+    """
+    Rendered MP4s in the output bucket; hits can be served as URLs without a download.
+
+    Each entry is two objects: <key>.mp4 and its render meta as <key>.json.
+    The meta is too large for S3 user metadata (2 KB per object), and writing
+    it after the video means a readable meta always has a complete video.
+    """
+
+    name = "s3"
+
+    def __init__(self, prefix: str = RENDER_CACHE_PREFIX, max_bytes: int = RENDER_CACHE_MAX_BYTES):
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+
+    def lookup(self, key: str) -> dict:
+        """Returns {"key", "url", "size", "meta"} or None."""
+        meta = storage.get_json(f"{self.prefix}{key}.json")
+        if meta is None:
+            return None
+        head = storage.head_object(f"{self.prefix}{key}.mp4")
+        if not head:
+            return None
+        return {"key": head["key"], "url": head["url"], "size": head["size"], "meta": meta}
+
+    def fetch(self, entry: dict, dest_path: str):
+        storage.download_file(entry["key"], dest_path)
+
+    def store(self, key: str, path: str, meta: dict) -> dict:
+        upload = storage.upload_file(
+            path, f"{key}.mp4", prefix=self.prefix,
+            content_type=storage.CONTENT_TYPES[meta.get("output_format") or "mp4"],
+        )
+        storage.put_json(f"{self.prefix}{key}.json", meta)
+        self._evict(keep=upload["key"])
+        return {"key": upload["key"], "url": upload["url"], "size": upload["size"], "meta": meta}
+
+    def _evict(self, keep: str):
+        # S3 has no access time, so the oldest objects go first
+        objects = [o for o in storage.list_objects(self.prefix) if o["key"].endswith(".mp4")]
+        total = sum(o["size"] for o in objects)
+        for obj in sorted(objects, key=lambda o: o["last_modified"]):
+            if total <= self.max_bytes:
+                break
+            if obj["key"] == keep:
+                continue
+            # Meta first, so a half-evicted entry reads as a miss
+            storage.delete_object(obj["key"][:-len(".mp4")] + ".json")
+            storage.delete_object(obj["key"])
+            total -= obj["size"]
+            print(f"Evicted cached render: {obj['key']} ({obj['size']} bytes)")
+
+
+_backend = None
+
+
+def get_render_cache():
+    """Configured backend, or None if the render cache is disabled."""
+    global _backend
+    if _backend is None:
+        if RENDER_CACHE_BACKEND == "local":
+            _backend = LocalDiskBackend()
+        elif RENDER_CACHE_BACKEND == "s3":
+            _backend = ObjectStoreBackend()
+        else:
+            return None
+    return _backend
@@ -6,10 +6,20 @@
 # - Applies gradient text (cyan -> orange -> pink)
 # - Updates all materials to branding colors
 # - Updates all lights to branding colors
+#
+# It is also the template's variant script (manifests/ai_cpu_activation.json):
+#   -- --params '{"text": "My Channel", "primary": "#00ff88"}' --save-as variant.blend
+# applies another channel's text and colors and saves the result as a new file.
 
 import bpy
+import json
 import sys
 
+script_args = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else []
+params = {}
+if "--params" in script_args:
+    params = json.loads(script_args[script_args.index("--params") + 1])
+
 # =============================================================================
 # BRANDING COLORS (The Temperature Setting)
 # =============================================================================
@@ -19,11 +29,17 @@ def srgb_to_linear(c):
         return c / 12.92
     return ((c + 0.055) / 1.055) ** 2.4
 
-CYAN = tuple(srgb_to_linear(c) for c in (0x4c/255, 0xc9/255, 0xf0/255)) + (1.0,)
-ORANGE = tuple(srgb_to_linear(c) for c in (0xf7/255, 0x7f/255, 0x00/255)) + (1.0,)
-PINK = tuple(srgb_to_linear(c) for c in (0xff/255, 0x00/255, 0x6e/255)) + (1.0,)
-GREEN = tuple(srgb_to_linear(c) for c in (0x00/255, 0xd2/255, 0x6a/255)) + (1.0,)
-DARK_BG = tuple(srgb_to_linear(c) for c in (0x0a/255, 0x0f/255, 0x1a/255)) + (1.0,)
+def hex_color(value):
+    """'#4cc9f0' -> linear RGBA."""
+    value = value.lstrip("#")
+    return tuple(srgb_to_linear(int(value[i:i + 2], 16) / 255) for i in (0, 2, 4)) + (1.0,)
+
+CYAN = hex_color(params.get("primary", "#4cc9f0"))
+ORANGE = hex_color(params.get("secondary", "#f77f00"))
+PINK = hex_color(params.get("accent", "#ff006e"))
+GREEN = hex_color(params.get("highlight", "#00d26a"))
+DARK_BG = hex_color("#0a0f1a")
+CHANNEL_NAME = params.get("text", "The Temperature\nSetting")
 
 color_names = {id(CYAN): "CYAN", id(ORANGE): "ORANGE", id(PINK): "PINK", id(GREEN): "GREEN"}
 
@@ -63,7 +79,6 @@ if not text_obj:
     bpy.ops.object.text_add()
     text_obj = bpy.context.active_object
     text_obj.name = "Channel_Name"
-    text_obj.data.body = "The Temperature\nSetting"
     text_obj.data.align_x = 'CENTER'
     text_obj.data.align_y = 'CENTER'
     text_obj.location = text_location
@@ -74,10 +89,13 @@ if not text_obj:
             text_obj.matrix_parent_inverse = original_text.matrix_parent_inverse.copy()
     print("Created Channel_Name text object")
 
+# Set (or, on an already branded file, replace) the channel name
+text_obj.data.body = CHANNEL_NAME
+
 # Set text size to fit within chip boundary
 text_obj.data.size = 1.0
 text_obj.scale = (0.05, 0.05, 0.05)
-print(f"Text size: size=1.0, scale=0.05")
+print("Text size: size=1.0, scale=0.05")
 
 # =============================================================================
 # 2. CREATE/UPDATE GRADIENT MATERIAL FOR TEXT
@@ -192,8 +210,12 @@ print("="*60)
 # =============================================================================
 # SAVE IF REQUESTED
 # =============================================================================
-if "--" in sys.argv:
-    args = sys.argv[sys.argv.index("--") + 1:]
-    if "--save" in args:
-        bpy.ops.wm.save_mainfile()
-        print("FILE SAVED!")
+if "--save" in script_args:
+    bpy.ops.wm.save_mainfile()
+    print("FILE SAVED!")
+elif "--save-as" in script_args:
+    # copy=True leaves the open file's path alone; compress keeps variants small
+    bpy.ops.wm.save_as_mainfile(
+        filepath=script_args[script_args.index("--save-as") + 1], copy=True, compress=True
+    )
+    print("VARIANT SAVED!")
@@ -0,0 +1,67 @@
+# Fill in a template manifest from the .blend it points at
+# Run: blender --background --python inspect_template.py -- ../manifests/ai_cpu_activation.json
+#
+# Opens the manifest's "blend" and writes back (keeping every other key):
+# - sha256 of the .blend, so the handler can tell when the manifest is stale
+# - blender_version the file was saved with
+# - scene: animation frame range and fps, render resolution and engine, and
+#   complexity stats (objects, evaluated polygons, lights, materials, images,
+#   decoded texture bytes)
+#
+# The Docker build runs this for every manifest in manifests/, so the handler
+# can validate requests against the template without starting Blender.
+
+import bpy
+import hashlib
+import json
+import os
+import sys
+
+manifest_path = os.path.abspath(sys.argv[sys.argv.index("--") + 1])
+with open(manifest_path) as f:
+    manifest = json.load(f)
+blend_path = os.path.normpath(os.path.join(os.path.dirname(manifest_path), manifest["blend"]))
+
+bpy.ops.wm.open_mainfile(filepath=blend_path)
+scene = bpy.context.scene
+render = scene.render
+
+sha = hashlib.sha256()
+with open(blend_path, "rb") as f:
+    for chunk in iter(lambda: f.read(8 * 1024 * 1024), b""):
+        sha.update(chunk)
+
+# Polygons after modifiers (viewport levels) - what the render actually has to intersect
+depsgraph = bpy.context.evaluated_depsgraph_get()
+polygons = 0
+for obj in scene.objects:
+    if obj.type == 'MESH':
+        polygons += len(obj.evaluated_get(depsgraph).data.polygons)
+
+# Decoded size of every image, as the render device has to hold it
+texture_bytes = 0
+images = [image for image in bpy.data.images if image.source in ('FILE', 'SEQUENCE', 'TILED')]
+for image in images:
+    width, height = image.size
+    texture_bytes += width * height * image.channels * (4 if image.is_float else 1)
+
+manifest["sha256"] = sha.hexdigest()
+manifest["blender_version"] = ".".join(str(v) for v in bpy.data.version)
+manifest["scene"] = {
+    "frame_start": scene.frame_start,
+    "frame_end": scene.frame_end,
+    "fps": round(render.fps / render.fps_base, 3),
+    "resolution": [render.resolution_x, render.resolution_y],
+    "engine": render.engine,
+    "objects": len(scene.objects),
+    "polygons": polygons,
+    "lights": sum(1 for obj in scene.objects if obj.type == 'LIGHT'),
+    "materials": len(bpy.data.materials),
+    "images": len(images),
+    "texture_bytes": texture_bytes,
+}
+
+with open(manifest_path, "w") as f:
+    json.dump(manifest, f, indent=2)
+    f.write("\n")
+print(f"Inspected {blend_path}: {json.dumps(manifest['scene'])}")
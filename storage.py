@@ -0,0 +1,186 @@
+"""
+S3-compatible object storage for rendered videos.
+
+Instead of base64-encoding the whole MP4 into the job response, the file is
+streamed to a bucket with a multipart upload (one part in memory at a time,
+sha256 computed on the way) and the job returns only a key, URL and checksum.
+
+Configured per worker through the environment:
+    OUTPUT_BUCKET            Bucket name (required for uploads)
+    OUTPUT_ENDPOINT_URL      Custom endpoint, e.g. MinIO/R2 (default: AWS)
+    OUTPUT_REGION            Region name (optional)
+    OUTPUT_PREFIX            Key prefix (default: "renders/")
+    OUTPUT_URL_EXPIRY        Presigned URL lifetime in seconds (default: 7 days)
+    OUTPUT_PUBLIC_URL        If set, URLs are OUTPUT_PUBLIC_URL/<key> instead of presigned
+    AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY - standard boto3 credentials
+
+The same bucket backs the "s3" render-result cache (see result_cache.py).
+boto3 is only imported when the bucket is actually used.
+"""
+
+import hashlib
+import json
+import os
+
+OUTPUT_BUCKET = os.environ.get("OUTPUT_BUCKET")
+OUTPUT_ENDPOINT_URL = os.environ.get("OUTPUT_ENDPOINT_URL")
+OUTPUT_REGION = os.environ.get("OUTPUT_REGION")
+OUTPUT_PREFIX = os.environ.get("OUTPUT_PREFIX", "renders/")
+OUTPUT_URL_EXPIRY = int(os.environ.get("OUTPUT_URL_EXPIRY", 7 * 24 * 3600))
+OUTPUT_PUBLIC_URL = os.environ.get("OUTPUT_PUBLIC_URL")
+
+# Content-Type per output format (drafts can be GIFs)
+CONTENT_TYPES = {"mp4": "video/mp4", "gif": "image/gif"}
+
+# S3 requires parts of at least 5 MB (except the last one)
+PART_SIZE = 16 * 1024 * 1024
+
+
+def storage_configured() -> bool:
+    return bool(OUTPUT_BUCKET)
+
+
+def _client():
+    try:
+        import boto3
+    except ImportError:
+        raise Exception("S3 output requires the 'boto3' package")
+    return boto3.client("s3", endpoint_url=OUTPUT_ENDPOINT_URL, region_name=OUTPUT_REGION)
+
+
+def file_sha256(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(PART_SIZE)
+            if not chunk:
+                break
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def object_url(client, key: str) -> str:
+    if OUTPUT_PUBLIC_URL:
+        return f"{OUTPUT_PUBLIC_URL.rstrip('/')}/{key}"
+    return client.generate_presigned_url(
+        "get_object",
+        Params={"Bucket": OUTPUT_BUCKET, "Key": key},
+        ExpiresIn=OUTPUT_URL_EXPIRY,
+    )
+
+
+def upload_file(path: str, key: str, content_type: str = "video/mp4", prefix: str = None,
+                metadata: dict = None) -> dict:
+    """
+    Stream a file to OUTPUT_BUCKET under prefix + key (OUTPUT_PREFIX by default).
+
+    Returns {"bucket", "key", "url", "sha256", "size"}.
+    Raises exception on failure (a started multipart upload is aborted).
+    """
+    if not storage_configured():
+        raise Exception("S3 output requested but OUTPUT_BUCKET is not set")
+
+    client = _client()
+    key = f"{OUTPUT_PREFIX if prefix is None else prefix}{key}"
+    metadata = dict(metadata or {})
+    size = os.path.getsize(path)
+    sha = hashlib.sha256()
+    print(f"Uploading {size} bytes to s3://{OUTPUT_BUCKET}/{key}")
+
+    with open(path, "rb") as f:
+        if size <= PART_SIZE:
+            body = f.read()
+            sha.update(body)
+            client.put_object(
+                Bucket=OUTPUT_BUCKET, Key=key, Body=body, ContentType=content_type,
+                Metadata={**metadata, "sha256": sha.hexdigest()},
+            )
+        else:
+            upload = client.create_multipart_upload(
+                Bucket=OUTPUT_BUCKET, Key=key, ContentType=content_type, Metadata=metadata,
+            )
+            upload_id = upload["UploadId"]
+            parts = []
+            try:
+                while True:
+                    chunk = f.read(PART_SIZE)
+                    if not chunk:
+                        break
+                    sha.update(chunk)
+                    part = client.upload_part(
+                        Bucket=OUTPUT_BUCKET, Key=key, UploadId=upload_id,
+                        PartNumber=len(parts) + 1, Body=chunk,
+                    )
+                    parts.append({"PartNumber": len(parts) + 1, "ETag": part["ETag"]})
+                client.complete_multipart_upload(
+                    Bucket=OUTPUT_BUCKET, Key=key, UploadId=upload_id,
+                    MultipartUpload={"Parts": parts},
+                )
+            except Exception:
+                client.abort_multipart_upload(Bucket=OUTPUT_BUCKET, Key=key, UploadId=upload_id)
+                raise
+
+    print(f"Uploaded s3://{OUTPUT_BUCKET}/{key}")
+    return {
+        "bucket": OUTPUT_BUCKET,
+        "key": key,
+        "url": object_url(client, key),
+        "sha256": sha.hexdigest(),
+        "size": size,
+    }
+
+
+def head_object(key: str) -> dict:
+    """Object size/metadata/URL, or None if it doesn't exist."""
+    client = _client()
+    try:
+        head = client.head_object(Bucket=OUTPUT_BUCKET, Key=key)
+    except client.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return {
+        "bucket": OUTPUT_BUCKET,
+        "key": key,
+        "url": object_url(client, key),
+        "size": head["ContentLength"],
+        "metadata": head.get("Metadata", {}),
+    }
+
+
+def put_json(key: str, data: dict):
+    """Store a small JSON document under key (OUTPUT_PREFIX is not applied)."""
+    _client().put_object(
+        Bucket=OUTPUT_BUCKET, Key=key, Body=json.dumps(data).encode(), ContentType="application/json",
+    )
+
+
+def get_json(key: str) -> dict:
+    """A JSON document stored with put_json(), or None if it doesn't exist."""
+    client = _client()
+    try:
+        body = client.get_object(Bucket=OUTPUT_BUCKET, Key=key)["Body"].read()
+    except client.exceptions.ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return None
+        raise
+    return json.loads(body)
+
+
+def download_file(key: str, dest_path: str):
+    """Stream an object to dest_path."""
+    _client().download_file(OUTPUT_BUCKET, key, dest_path)
+
+
+def list_objects(prefix: str) -> list:
+    """All objects under prefix as [{"key", "size", "last_modified"}]."""
+    client = _client()
+    objects = []
+    for page in client.get_paginator("list_objects_v2").paginate(Bucket=OUTPUT_BUCKET, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            objects.append({"key": obj["Key"], "size": obj["Size"], "last_modified": obj["LastModified"]})
+    return objects
+
+
+def delete_object(key: str):
+    _client().delete_object(Bucket=OUTPUT_BUCKET, Key=key)
@@ -0,0 +1,225 @@
+"""
+Persistent on-disk cache for templates downloaded via template_url.
+
+Warm workers keep pulling the same 100+ MB .blend files, so instead of
+downloading into a throwaway temp file for every job we keep them on disk:
+
+    <cache_dir>/index.json          # url -> {sha256, etag, last_modified, size, last_used}
+    <cache_dir>/blobs/<sha256>.blend
+
+Blobs are content-addressed, so two URLs serving the same file share one copy.
+Every lookup revalidates with If-None-Match / If-Modified-Since; a 304 means
+the cached copy is served without transferring the body. When the caller
+already knows the content hash and that blob is on disk, no request is made.
+When the cache grows past its size cap the least recently used entries are
+evicted. Transfers themselves go through downloader.download, whose partial
+files live in <cache_dir>/partial/ so an interrupted download resumes on the
+next job.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from downloader import download
+
+# Overridable per worker so the cache can live on a network volume
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", "/tmp/template_cache")
+TEMPLATE_CACHE_MAX_BYTES = int(os.environ.get("TEMPLATE_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+
+# Interrupted downloads older than this are abandoned
+PARTIAL_MAX_AGE_SECONDS = 24 * 3600
+
+
+class TemplateCache:
+    """LRU cache of downloaded .blend templates keyed by URL and content hash."""
+
+    def __init__(self, cache_dir: str = TEMPLATE_CACHE_DIR, max_bytes: int = TEMPLATE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(cache_dir, "blobs")
+        self.partial_dir = os.path.join(cache_dir, "partial")
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.partial_dir, exist_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Index handling
+    # -------------------------------------------------------------------------
+    def _load_index(self) -> dict:
+        try:
+            with open(self.index_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self, index: dict):
+        # Write-then-rename so a crash never leaves a truncated index behind
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".json")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, f"{sha256}.blend")
+
+    # -------------------------------------------------------------------------
+    # Public API
+    # -------------------------------------------------------------------------
+    def fetch(self, url: str, expected_sha256: str = None) -> tuple:
+        """
+        Return a local path for the template at url, downloading if needed.
+
+        Args:
+            url: Template URL
+            expected_sha256: Optional content hash the template must have
+
+        Returns (path, info) where info reports the cache outcome:
+            {"status": "hit" | "miss" | "stale", "bytes_saved": int, "sha256": str, "size": int}
+        Raises exception on failure.
+        """
+        if expected_sha256:
+            expected_sha256 = expected_sha256.lower()
+
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(url)
+            if entry and not os.path.exists(self.blob_path(entry["sha256"])):
+                # Blob was removed behind our back - treat as a cold miss
+                entry = None
+
+            if expected_sha256:
+                if os.path.exists(self.blob_path(expected_sha256)):
+                    # Content-addressed hit - no need to ask the origin at all
+                    known = next((e for e in index.values() if e["sha256"] == expected_sha256), None)
+                    if entry is None or entry["sha256"] != expected_sha256:
+                        entry = {
+                            "sha256": expected_sha256,
+                            "size": os.path.getsize(self.blob_path(expected_sha256)),
+                            "etag": known.get("etag") if known else None,
+                            "last_modified": known.get("last_modified") if known else None,
+                        }
+                    print(f"Template cache hit (sha256): {expected_sha256[:12]}")
+                    return self._touch(index, url, entry, "hit")
+                if entry and entry["sha256"] != expected_sha256:
+                    # Cached copy is not the requested content - fetch unconditionally
+                    entry = None
+
+            headers = {}
+            if entry:
+                if entry.get("etag"):
+                    headers["If-None-Match"] = entry["etag"]
+                if entry.get("last_modified"):
+                    headers["If-Modified-Since"] = entry["last_modified"]
+
+            print(f"Fetching template: {url} (cached: {bool(entry)})")
+            self._remove_stale_partials()
+            dest_path = os.path.join(self.partial_dir, hashlib.sha256(url.encode()).hexdigest()[:32])
+            try:
+                result = download(url, dest_path, headers=headers, expected_sha256=expected_sha256)
+            except Exception as e:
+                if entry and "checksum mismatch" not in str(e):
+                    # Origin unreachable - the cached copy is better than failing the job
+                    print(f"WARNING: revalidation failed ({e}), serving cached template")
+                    return self._touch(index, url, entry, "stale")
+                raise
+
+            if result.get("not_modified"):
+                print(f"Template cache hit: {entry['sha256'][:12]} ({entry['size']} bytes)")
+                return self._touch(index, url, entry, "hit")
+
+            os.replace(dest_path, self.blob_path(result["sha256"]))
+            entry = {
+                "sha256": result["sha256"],
+                "size": result["size"],
+                "etag": result["etag"],
+                "last_modified": result["last_modified"],
+                "last_used": time.time(),
+            }
+            index[url] = entry
+            self._evict(index, keep=entry["sha256"])
+            self._save_index(index)
+            print(f"Template cache miss: {entry['sha256'][:12]} ({entry['size']} bytes)")
+            return self.blob_path(entry["sha256"]), {
+                "status": "miss",
+                # Bytes a resumed download did not have to transfer again
+                "bytes_saved": result["bytes_resumed"],
+                "sha256": entry["sha256"],
+                "size": entry["size"],
+                "bytes_downloaded": result["bytes_downloaded"],
+                "compression": result["compression"],
+                "parallel": result["parallel"],
+            }
+
+    def total_bytes(self) -> int:
+        """Size of all blobs currently on disk."""
+        total = 0
+        for name in os.listdir(self.blob_dir):
+            total += os.path.getsize(os.path.join(self.blob_dir, name))
+        return total
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+    def _touch(self, index: dict, url: str, entry: dict, status: str) -> tuple:
+        entry["last_used"] = time.time()
+        index[url] = entry
+        self._save_index(index)
+        return self.blob_path(entry["sha256"]), {
+            "status": status,
+            "bytes_saved": entry["size"],
+            "sha256": entry["sha256"],
+            "size": entry["size"],
+        }
+
+    def _remove_stale_partials(self):
+        cutoff = time.time() - PARTIAL_MAX_AGE_SECONDS
+        for name in os.listdir(self.partial_dir):
+            path = os.path.join(self.partial_dir, name)
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+                print(f"Removed abandoned partial download: {name}")
+
+    def _evict(self, index: dict, keep: str):
+        """Drop least recently used entries until the cache fits max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+
+        for url, entry in sorted(index.items(), key=lambda kv: kv[1].get("last_used", 0)):
+            if total <= self.max_bytes:
+                break
+            if entry["sha256"] == keep:
+                continue
+            del index[url]
+            # Blobs are shared between URLs - only delete once nothing references it
+            if any(e["sha256"] == entry["sha256"] for e in index.values()):
+                continue
+            path = self.blob_path(entry["sha256"])
+            if os.path.exists(path):
+                total -= os.path.getsize(path)
+                os.remove(path)
+                print(f"Evicted cached template: {url} ({entry['size']} bytes)")
+
+    def clear(self):
+        """Remove every cached template."""
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            os.makedirs(self.blob_dir, exist_ok=True)
+            os.makedirs(self.partial_dir, exist_ok=True)
+
+
+_cache = None
+
+
+def get_template_cache() -> TemplateCache:
+    """Process-wide cache instance, created on first use."""
+    global _cache
+    if _cache is None:
+        _cache = TemplateCache()
+    return _cache
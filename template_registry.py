@@ -0,0 +1,102 @@
+"""
+Registry of the templates baked into the image, one manifest per template.
+
+    <manifest_dir>/<name>.json
+    {
+        "blend": "../templates/ai_cpu_activation_branded.blend",
+        "sha256": "...",
+        "blender_version": "4.2.0",
+        "scene": {
+            "frame_start": 1, "frame_end": 250, "fps": 30.0,
+            "resolution": [1920, 1080], "engine": "CYCLES",
+            "objects": 412, "polygons": 1843220, "lights": 6,
+            "materials": 38, "images": 21, "texture_bytes": 301989888
+        },
+        "variant_script": "...", "parameters": {...}
+    }
+
+Paths are relative to the manifest. "sha256", "blender_version" and "scene"
+are written offline by scripts/inspect_template.py (the Docker build runs it
+for every manifest), so the handler knows a template's animation and
+complexity without starting Blender and can reject requests that don't fit
+it before paying for a launch. "variant_script" and "parameters" declare a
+parameterized template (see template_variants.py).
+
+Manifests without inspection data are still valid templates; their
+requests are just not checked against the scene.
+"""
+
+import glob
+import json
+import os
+
+from result_cache import file_hash
+
+TEMPLATE_MANIFEST_DIR = os.environ.get("TEMPLATE_MANIFEST_DIR", "/workspace/manifests")
+
+
+def load_registry(manifest_dir: str = TEMPLATE_MANIFEST_DIR) -> dict:
+    """
+    Read every <name>.json manifest in manifest_dir.
+
+    Returns {name: manifest} with "blend" and "variant_script" resolved to
+    absolute paths. A missing directory means an empty registry.
+    """
+    registry = {}
+    for path in sorted(glob.glob(os.path.join(manifest_dir, "*.json"))):
+        name = os.path.splitext(os.path.basename(path))[0]
+        with open(path) as f:
+            manifest = json.load(f)
+        base_dir = os.path.dirname(os.path.abspath(path))
+        for key in ("blend", "variant_script"):
+            if manifest.get(key):
+                manifest[key] = os.path.normpath(os.path.join(base_dir, manifest[key]))
+        registry[name] = manifest
+    return registry
+
+
+def verify(manifest: dict) -> str:
+    """
+    Check that the template on disk is the one the manifest was generated from.
+
+    A stale manifest loses its "scene" so requests are no longer validated
+    against it. Returns an error message or None; raises OSError if the
+    template is missing.
+    """
+    actual = file_hash(manifest["blend"])
+    expected = manifest.get("sha256")
+    if expected and actual != expected:
+        manifest.pop("scene", None)
+        return (f"manifest is stale (sha256 {expected[:12]}, file {actual[:12]}) - "
+                f"re-run scripts/inspect_template.py")
+    return None
+
+
+def validate_request(manifest: dict, config: dict) -> str:
+    """
+    Check a job's config against the template's inspected scene.
+
+    Catches requests Blender would only reveal after starting: an fps that
+    would play the animation at the wrong speed, and frame ranges or shards
+    outside the animation. Returns an error message or None.
+    """
+    scene = manifest.get("scene")
+    if not scene:
+        return None
+
+    fps = config.get("fps")
+    if fps is not None and scene.get("fps") and abs(fps - scene["fps"]) > 0.01:
+        return f"fps {fps} does not match the template's animation ({scene['fps']:g} fps)"
+
+    # A duration override re-times the animation to frames 1..duration*fps
+    if config.get("duration"):
+        first, last = 1, int(config["duration"] * (fps or scene["fps"]))
+    else:
+        first, last = scene["frame_start"], scene["frame_end"]
+    start, end = config.get("frame_start"), config.get("frame_end")
+    if start is not None and end is not None and (start < first or end > last):
+        return f"Frames {start}-{end} are outside the template's animation ({first}-{last})"
+    count = config.get("shard_count")
+    if count is not None and count > last - first + 1:
+        return f"shard_count {count} is more than the template's {last - first + 1} frames"
+    return None
@@ -0,0 +1,200 @@
+"""
+Parameterized templates: variants of a baked .blend built on demand.
+
+A template that can be re-branded declares its parameters in its registry
+manifest (see template_registry.py):
+
+    <manifest_dir>/ai_cpu_activation.json
+    {
+        "blend": "../templates/ai_cpu_activation_branded.blend",
+        "variant_script": "../scripts/ai_cpu_activation.py",
+        "parameters": {
+            "text":    {"type": "text", "default": "The Temperature\\nSetting", "max_length": 64},
+            "primary": {"type": "color", "default": "#4cc9f0"}
+        }
+    }
+
+A job's "template_params" override some of the defaults; the variant script
+is then run once against the .blend
+
+    blender --background <blend> --python <variant_script> -- --params '<json>' --save-as <file>
+
+and the saved file is kept in the variant cache:
+
+    <cache_dir>/<key>.blend
+
+The key hashes the .blend, the variant script and the full parameter set, so
+a later job with the same parameters loads the pre-baked file directly and an
+edited script or template never serves a stale variant. Jobs whose parameters
+are all defaults render the shipped .blend itself. When the cache grows past
+its size cap the least recently used variants are evicted.
+"""
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+
+from result_cache import file_hash
+
+# Overridable per worker so variants can live on a network volume
+VARIANT_CACHE_DIR = os.environ.get("VARIANT_CACHE_DIR", "/tmp/variant_cache")
+VARIANT_CACHE_MAX_BYTES = int(os.environ.get("VARIANT_CACHE_MAX_BYTES", 5 * 1024 ** 3))
+# Building a variant loads and saves the template once - no rendering
+VARIANT_BUILD_TIMEOUT = int(os.environ.get("VARIANT_BUILD_TIMEOUT", 600))
+
+_COLOR = re.compile(r"^#[0-9a-fA-F]{6}$")
+
+
+def _check_value(name: str, spec: dict, value) -> str:
+    """Error message for a parameter value, or None."""
+    kind = spec.get("type", "text")
+    if kind == "color":
+        if not isinstance(value, str) or not _COLOR.match(value):
+            return f"template_params.{name} must be a \"#rrggbb\" color, got {value!r}"
+    elif kind == "text":
+        if not isinstance(value, str):
+            return f"template_params.{name} must be a string"
+        if spec.get("max_length") and len(value) > spec["max_length"]:
+            return f"template_params.{name} is longer than {spec['max_length']} characters"
+    return None
+
+
+def resolve_params(manifest: dict, params: dict) -> dict:
+    """
+    Validate a job's template_params against a manifest and fill in defaults.
+
+    Args:
+        manifest: Template manifest (see template_registry.py)
+        params: The job's template_params
+
+    Returns the complete parameter set, or None when every value is the
+    default (the shipped .blend is that variant). Raises ValueError for
+    unknown parameters or invalid values.
+    """
+    declared = manifest.get("parameters") or {}
+    if not isinstance(params, dict):
+        raise ValueError("template_params must be an object")
+    if not declared or not manifest.get("variant_script"):
+        raise ValueError("this template has no parameters")
+    unknown = set(params) - set(declared)
+    if unknown:
+        raise ValueError(f"Unknown template_params {sorted(unknown)}. Available: {sorted(declared)}")
+
+    values, defaults = {}, {}
+    for name, spec in declared.items():
+        value = params.get(name, spec.get("default"))
+        error = _check_value(name, spec, value)
+        if error:
+            raise ValueError(error)
+        # Colors hash the same whatever their case
+        if spec.get("type") == "color":
+            value, defaults[name] = value.lower(), spec.get("default", "").lower()
+        else:
+            defaults[name] = spec.get("default")
+        values[name] = value
+    return None if values == defaults else values
+
+
+def variant_key(blend_path: str, script_path: str, values: dict) -> str:
+    """Cache key of a variant: the template, the script and the parameter values."""
+    canonical = json.dumps(
+        {"blend": file_hash(blend_path), "script": file_hash(script_path), "params": values},
+        sort_keys=True, separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class VariantCache:
+    """LRU cache of baked template variants keyed by variant_key()."""
+
+    def __init__(self, cache_dir: str = VARIANT_CACHE_DIR, max_bytes: int = VARIANT_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.blend")
+
+    def get_or_build(self, manifest: dict, values: dict, blender_binary: str = "blender") -> tuple:
+        """
+        Return a local path for the variant, building it if needed.
+
+        Args:
+            manifest: Template manifest (see template_registry.py)
+            values: Complete parameter set from resolve_params()
+            blender_binary: Blender executable used to run the variant script
+
+        Returns (path, info) where info reports the cache outcome:
+            {"status": "hit" | "miss", "sha256": key, "size": int, "params": dict}
+        and, on a miss, "build_seconds". Raises exception if the build fails.
+        """
+        key = variant_key(manifest["blend"], manifest["variant_script"], values)
+        path = self.path(key)
+
+        with self._lock:
+            if os.path.exists(path):
+                # mtime doubles as the LRU timestamp
+                os.utime(path)
+                print(f"Template variant hit: {key[:12]}")
+                return path, {"status": "hit", "sha256": key, "size": os.path.getsize(path), "params": values}
+
+            start = time.perf_counter()
+            tmp_path = os.path.join(self.cache_dir, f"{key}.partial.blend")
+            cmd = [
+                blender_binary, "--background", manifest["blend"],
+                "--python", manifest["variant_script"],
+                "--", "--params", json.dumps(values), "--save-as", tmp_path,
+            ]
+            print(f"Building template variant {key[:12]}: {values}")
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=VARIANT_BUILD_TIMEOUT)
+                if result.returncode != 0 or not os.path.exists(tmp_path):
+                    output = (result.stdout + result.stderr)[-2000:]
+                    raise RuntimeError(f"variant script failed (exit {result.returncode}): {output}")
+                os.replace(tmp_path, path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+            build_seconds = round(time.perf_counter() - start, 3)
+            size = os.path.getsize(path)
+            print(f"Template variant built: {key[:12]} ({size} bytes, {build_seconds}s)")
+            self._evict(keep=key)
+            return path, {
+                "status": "miss", "sha256": key, "size": size, "params": values, "build_seconds": build_seconds,
+            }
+
+    def total_bytes(self) -> int:
+        """Size of all variants currently on disk."""
+        return sum(os.path.getsize(os.path.join(self.cache_dir, name)) for name in os.listdir(self.cache_dir))
+
+    def _evict(self, keep: str):
+        """Drop least recently used variants until the cache fits max_bytes."""
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+        for path in sorted(paths, key=os.path.getmtime):
+            if total <= self.max_bytes:
+                break
+            if path == self.path(keep):
+                continue
+            total -= os.path.getsize(path)
+            os.remove(path)
+            print(f"Evicted template variant: {os.path.basename(path)}")
+
+
+_cache = None
+
+
+def get_variant_cache() -> VariantCache:
+    """Process-wide cache instance, created on first use."""
+    global _cache
+    if _cache is None:
+        _cache = VariantCache()
+    return _cache
@@ -0,0 +1,282 @@
+"""
+Shared fixtures. The tests import the handler modules straight from the repo
+root and use the stand-ins in benchmarks/stubs for blender, ffmpeg and
+nvidia-smi, so they run without Blender, a GPU or network access.
+
+    pip install pytest boto3 "moto[s3]" zstandard requests python-dotenv
+    python -m pytest -q tests
+"""
+
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+import types
+import urllib.request
+import uuid
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUBS_DIR = os.path.join(REPO_DIR, "benchmarks", "stubs")
+sys.path.insert(0, REPO_DIR)
+
+# The modules read their settings at import time: keep every cache, history
+# and sidecar of the test session in one scratch directory
+_SCRATCH = tempfile.mkdtemp(prefix="blender_serverless_tests_")
+os.environ.update({
+    "BLENDER_BINARY": os.path.join(STUBS_DIR, "blender"),
+    "RENDER_SCRIPT": os.path.join(REPO_DIR, "render_blend.py"),
+    "USE_XVFB": "0",
+    "BLENDER_WARM": "0",
+    "WARMUP": "0",
+    "ADMISSION_POLICY": "off",
+    "TEMPLATE_MANIFEST_DIR": os.path.join(_SCRATCH, "manifests"),
+    "FRAME_CACHE_DIR": os.path.join(_SCRATCH, "frame_cache"),
+    "RENDER_CACHE_DIR": os.path.join(_SCRATCH, "render_cache"),
+    "TEMPLATE_CACHE_DIR": os.path.join(_SCRATCH, "template_cache"),
+    "VARIANT_CACHE_DIR": os.path.join(_SCRATCH, "variant_cache"),
+    "TELEMETRY_DIR": os.path.join(_SCRATCH, "telemetry"),
+    "RENDER_HISTORY_FILE": os.path.join(_SCRATCH, "render_history.jsonl"),
+    "BLENDER_DEVICE_PROBE": os.path.join(_SCRATCH, "device_probe.json"),
+    "ENCODER_PROBE_FILE": os.path.join(_SCRATCH, "encoder_probe.json"),
+    "BENCH_FRAME_BYTES": "4096",
+    "BENCH_ENCODED_FRAME_BYTES": "1024",
+})
+
+
+@pytest.fixture
+def stub_path(monkeypatch):
+    """Put the stub blender, ffmpeg and nvidia-smi first on PATH."""
+    monkeypatch.setenv("PATH", STUBS_DIR + os.pathsep + os.environ["PATH"])
+    return STUBS_DIR
+
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """An in-process S3 (moto) with an empty bucket configured as OUTPUT_BUCKET."""
+    moto = pytest.importorskip("moto")
+    boto3 = pytest.importorskip("boto3")
+    import storage
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setattr(storage, "OUTPUT_BUCKET", "renders-test")
+    monkeypatch.setattr(storage, "OUTPUT_ENDPOINT_URL", None)
+    monkeypatch.setattr(storage, "OUTPUT_REGION", "us-east-1")
+    with moto.mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket="renders-test")
+        yield client
+
+
+@pytest.fixture
+def render_blend(stub_path, monkeypatch):
+    """render_blend.py imported against the stub bpy module."""
+    monkeypatch.syspath_prepend(STUBS_DIR)
+    import render_blend
+    return render_blend
+
+
+@pytest.fixture
+def failing_ffmpeg(tmp_path, stub_path, monkeypatch):
+    """
+    An ffmpeg that fails for outputs whose name contains FFMPEG_FAIL_ON and
+    otherwise runs the stub; returns a setter for the marker.
+    """
+    bin_dir = tmp_path / "failing_bin"
+    bin_dir.mkdir()
+    script = bin_dir / "ffmpeg"
+    script.write_text(
+        "#!/bin/sh\n"
+        'for arg; do out="$arg"; done\n'
+        'case "$out" in *"$FFMPEG_FAIL_ON"*) echo "Conversion failed!" >&2; exit 1;; esac\n'
+        f'exec "{os.path.join(STUBS_DIR, "ffmpeg")}" "$@"\n'
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    monkeypatch.setenv("FFMPEG_FAIL_ON", "/nothing-fails/")
+    return lambda marker: monkeypatch.setenv("FFMPEG_FAIL_ON", marker)
+
+
+@pytest.fixture
+def handler(stub_path, tmp_path, monkeypatch):
+    """
+    handler.py with a "test" template, its progress updates collected in
+    handler.progress_updates instead of going to the RunPod API.
+    """
+    progress_updates = []
+    runpod = types.ModuleType("runpod")
+    runpod.serverless = types.SimpleNamespace(
+        progress_update=lambda job, update: progress_updates.append(update),
+        start=lambda config: None,
+    )
+    monkeypatch.setitem(sys.modules, "runpod", runpod)
+    import handler
+    monkeypatch.setattr(handler, "runpod", runpod)
+
+    template_path = tmp_path / "template.blend"
+    template_path.write_bytes(b"BLENDER-v402" + os.urandom(4096))
+    monkeypatch.setitem(handler.TEMPLATES, "test", {"blend": str(template_path)})
+    monkeypatch.setattr(handler, "progress_updates", progress_updates, raising=False)
+    return handler
+
+
+class LocalQueue:
+    """
+    The /run, /status and /cancel endpoints of a RunPod endpoint, running
+    each job through handler.handler() on its own thread. Jobs submitted with
+    a "webhook" get their final status POSTed there, as RunPod does.
+    """
+
+    def __init__(self, handler):
+        self.jobs = {}
+        self.cancelled = []
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+        queue = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, data):
+                body = json.dumps(data).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/run":
+                    job = {"id": uuid.uuid4().hex, "input": payload["input"], "status": "IN_QUEUE",
+                           "webhook": payload.get("webhook")}
+                    queue.jobs[job["id"]] = job
+                    threading.Thread(target=queue.run, args=(handler, job), daemon=True).start()
+                    self._reply({"id": job["id"], "status": "IN_QUEUE"})
+                else:
+                    queue.cancelled.append(self.path.rsplit("/", 1)[1])
+                    self._reply({})
+
+            def do_GET(self):
+                self._reply(queue.status(queue.jobs[self.path.rsplit("/", 1)[1]]))
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    @staticmethod
+    def status(job):
+        return {key: job[key] for key in ("id", "status", "output", "error") if key in job}
+
+    def run(self, handler, job):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        job["status"] = "IN_PROGRESS"
+        try:
+            output = handler.handler({"id": job["id"], "input": job["input"]})
+        finally:
+            with self._lock:
+                self.running -= 1
+        if "error" in output:
+            job.update(status="FAILED", error=output["error"])
+        else:
+            job.update(status="COMPLETED", output=output)
+        if job["webhook"]:
+            request = urllib.request.Request(
+                job["webhook"], data=json.dumps(self.status(job)).encode(),
+                headers={"Content-Type": "application/json"},
+            )
+            urllib.request.urlopen(request, timeout=10).close()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def local_queue(handler):
+    """A local stand-in for the RunPod queue API in front of handler.handler()."""
+    queue = LocalQueue(handler)
+    yield queue
+    queue.close()
+
+
+class TemplateServer:
+    """
+    A local HTTP server for one file with ETag/Range/If-Range/If-None-Match
+    support and injectable faults:
+
+        truncate_after  send only this many body bytes of full-file responses, then drop
+        drop_requests   request numbers (1-based) whose connection is closed before any response
+    """
+
+    def __init__(self):
+        self.body = b""
+        self.etag = '"v1"'
+        self.content_encoding = None
+        self.truncate_after = None
+        self.drop_requests = set()
+        self.requests = []
+
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                server.requests.append(dict(self.headers))
+                if len(server.requests) in server.drop_requests:
+                    self.close_connection = True
+                    return
+                if self.headers.get("If-None-Match") == server.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", server.etag)
+                    self.end_headers()
+                    return
+                body, start = server.body, 0
+                range_header = self.headers.get("Range")
+                if_range = self.headers.get("If-Range")
+                if range_header and (if_range is None or if_range == server.etag):
+                    first, _, last = range_header[len("bytes="):].partition("-")
+                    start = int(first)
+                    end = int(last) if last else len(body) - 1
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{len(body)}")
+                    body = body[start:end + 1]
+                else:
+                    self.send_response(200)
+                self.send_header("ETag", server.etag)
+                self.send_header("Content-Length", str(len(body)))
+                if server.content_encoding:
+                    self.send_header("Content-Encoding", server.content_encoding)
+                self.end_headers()
+                if server.truncate_after is not None and start == 0:
+                    self.wfile.write(body[:server.truncate_after])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+        self.httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.url = f"{self.base_url}/template.blend"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def template_server():
+    server = TemplateServer()
+    yield server
+    server.close()
@@ -0,0 +1,70 @@
+"""batch_render.py against a local stand-in for the RunPod queue (see conftest.LocalQueue)."""
+
+import asyncio
+import socket
+import time
+
+import pytest
+
+
+@pytest.fixture
+def batch(local_queue, monkeypatch):
+    monkeypatch.setenv("RUNPOD_API_KEY", "test")
+    import batch_render
+    import render
+
+    monkeypatch.setitem(render.CONFIG, "template", "test")
+    monkeypatch.setitem(render.CONFIG, "duration", 1)
+    monkeypatch.setitem(render.CONFIG, "resolution", [64, 64])
+    return batch_render
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_batch_saves_every_output_within_concurrency(batch, local_queue, tmp_path):
+    specs = [
+        {"output": "a.mp4"},
+        {"duration": 2, "output": "b.mp4"},
+        {"template": "missing", "output": "c.mp4"},
+        {"samples": 4},
+        {"output": "e.mp4", "cache": "bypass"},
+    ]
+    client = batch.BatchClient(local_queue.url, concurrency=2, poll_min=0.05, poll_max=0.2)
+
+    results = asyncio.run(client.render_all(specs, str(tmp_path)))
+
+    assert [r["output_path"].rsplit("/", 1)[1] for r in results] == \
+        ["a.mp4", "b.mp4", "c.mp4", "render_003.mp4", "e.mp4"]
+    assert [r["status"] for r in results] == ["COMPLETED", "COMPLETED", "FAILED", "COMPLETED", "COMPLETED"]
+    assert "Unknown template: missing" in results[2]["error"]
+    assert not (tmp_path / "c.mp4").exists()
+    for result in results:
+        if result["status"] == "COMPLETED":
+            job = local_queue.jobs[result["job_id"]]
+            with open(result["output_path"], "rb") as f:
+                assert len(f.read()) == job["output"]["file_size_bytes"]
+    assert local_queue.max_running <= 2
+    # The spec's own settings reach the job
+    durations = {r["output_path"].rsplit("/", 1)[1]: local_queue.jobs[r["job_id"]]["input"]["duration"]
+                 for r in results}
+    assert durations["b.mp4"] == 2 and durations["a.mp4"] == 1
+
+
+def test_batch_webhook_beats_polling(batch, local_queue, tmp_path):
+    port = _free_port()
+    client = batch.BatchClient(
+        local_queue.url, concurrency=1, poll_min=60, poll_max=60,
+        webhook_url=f"http://127.0.0.1:{port}/", webhook_port=port,
+    )
+
+    start = time.time()
+    results = asyncio.run(client.render_all([{"output": "hooked.mp4"}], str(tmp_path)))
+
+    assert results[0]["status"] == "COMPLETED", results[0]["error"]
+    # Polling alone would have waited a minute before looking again
+    assert time.time() - start < 30
+    assert (tmp_path / "hooked.mp4").stat().st_size > 0
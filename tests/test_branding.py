@@ -0,0 +1,116 @@
+import json
+import os
+import sys
+
+import pytest
+
+import branding
+from conftest import STUBS_DIR
+
+
+@pytest.fixture
+def font_dir(tmp_path, monkeypatch):
+    root = tmp_path / "fonts"
+    (root / "dejavu").mkdir(parents=True)
+    (root / "dejavu" / "DejaVuSans-Bold.ttf").write_bytes(b"\0\1\0\0")
+    monkeypatch.setattr(branding, "BRANDING_FONT_DIR", str(root))
+    monkeypatch.setenv("BRANDING_FONT_DIR", str(root))
+    return root
+
+
+@pytest.mark.parametrize("config, error", [
+    ({"text_size": "big"}, "text_size"),
+    ({"text_size": True}, "text_size"),
+    ({"text_size": 1.5}, "text_size"),
+    ({"text_position": 5}, "text_position"),
+    ({"text_position": "ab"}, "text_position"),
+    ({"text_position": [0.5, "top"]}, "text_position"),
+    ({"text_position": [0.5]}, "text_position"),
+    ({"text": 123}, "branding.text must be a string"),
+    ({"font": ["a.ttf"]}, "branding.font must be a string"),
+    ({"text_object": 1}, "branding.text_object must be a string"),
+    ({"palette": {"#4cc9f0": 1}}, "not a #rrggbb color"),
+    ({"logo": "x"}, "unknown keys"),
+])
+def test_validate_rejects_bad_fields(config, error):
+    assert error in branding.validate(config)
+
+
+@pytest.mark.parametrize("font", [
+    "/etc/passwd",
+    "../../../etc/fonts/x.ttf",
+    "/f.ttf':textfile=/etc/passwd:x='",
+    "dejavu/missing.ttf",
+    "dejavu",
+])
+def test_fonts_outside_font_dir_rejected(font_dir, font):
+    assert "branding.font" in branding.validate({"text": "My Channel", "font": font})
+
+
+def test_font_resolved_in_font_dir(font_dir):
+    expected = str(font_dir / "dejavu" / "DejaVuSans-Bold.ttf")
+
+    assert branding.validate({"font": "dejavu/DejaVuSans-Bold.ttf"}) is None
+    assert branding.resolve_font("dejavu/DejaVuSans-Bold.ttf") == expected
+    assert branding.resolve_font(expected) == expected
+
+
+def test_text_is_passed_as_file(font_dir, tmp_path):
+    text = "It's: 100% \\ [live]; ok"
+    text_path = str(tmp_path / "text.txt")
+
+    overlay = branding.text_overlay({"text": text, "font": "dejavu/DejaVuSans-Bold.ttf"}, [0.5, 0.4], text_path)
+
+    with open(text_path, encoding="utf-8") as f:
+        assert f.read() == text
+    options = dict(option.split("=", 1) for option in overlay[len("drawtext="):].split(":"))
+    assert options["fontfile"] == str(font_dir / "dejavu" / "DejaVuSans-Bold.ttf")
+    assert options["textfile"] == text_path
+    assert options["expansion"] == "none"
+    assert "text" not in options
+    assert branding.text_overlay({}, None, text_path) is None
+
+
+@pytest.fixture
+def recording_ffmpeg(tmp_path, stub_path, monkeypatch):
+    """An ffmpeg that logs its arguments (and the drawtext textfile) before running the stub."""
+    bin_dir = tmp_path / "recording_bin"
+    bin_dir.mkdir()
+    log = tmp_path / "ffmpeg_calls.jsonl"
+    script = bin_dir / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import json, os, re, sys\n"
+        "texts = [open(path).read() for path in re.findall(r'textfile=([^:,]+)', ' '.join(sys.argv))]\n"
+        f"with open({str(log)!r}, 'a') as f:\n"
+        "    f.write(json.dumps({'argv': sys.argv[1:], 'texts': texts}) + '\\n')\n"
+        f"os.execv({os.path.join(STUBS_DIR, 'ffmpeg')!r}, sys.argv)\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", str(bin_dir) + os.pathsep + os.environ["PATH"])
+    return log
+
+
+def test_branded_job_draws_text_from_file(handler, font_dir, recording_ffmpeg):
+    text = "Rob's: 100%"
+    result = handler.handler({"id": "branded", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1, "cache": "bypass",
+        "config": {"branding": {"palette": {"#4cc9f0": "#00ff88"}, "text": text,
+                                "font": "dejavu/DejaVuSans-Bold.ttf"}},
+    }})
+
+    assert "error" not in result, result.get("error")
+    with open(recording_ffmpeg) as f:
+        calls = [json.loads(line) for line in f]
+    encode = [call for call in calls if any("drawtext=" in arg for arg in call["argv"])]
+    assert len(encode) == 1
+    assert encode[0]["texts"] == [text]
+    assert not any(text in arg for arg in encode[0]["argv"])
+
+
+def test_handler_returns_validation_error(handler):
+    result = handler.handler({"id": "bad-branding", "input": {
+        "template": "test", "config": {"branding": {"text_size": "big"}},
+    }})
+
+    assert "text_size" in result["error"]
@@ -0,0 +1,100 @@
+import os
+import time
+
+import frame_cache
+from frame_cache import FrameCache, frame_file
+
+
+def _frames(directory, frames, size=100):
+    os.makedirs(directory, exist_ok=True)
+    for frame in frames:
+        with open(os.path.join(directory, frame_file(frame)), "wb") as f:
+            f.write(b"\0" * size)
+
+
+def test_frames_round_trip(tmp_path):
+    cache = FrameCache(str(tmp_path / "cache"), "key", max_bytes=10_000)
+    _frames(tmp_path / "job1", range(1, 5))
+    cache.store(str(tmp_path / "job1"), range(1, 5))
+
+    os.makedirs(tmp_path / "job2")
+    reused = cache.restore(str(tmp_path / "job2"), range(1, 9))
+
+    assert reused == [1, 2, 3, 4]
+    assert sorted(os.listdir(tmp_path / "job2")) == [frame_file(f) for f in range(1, 5)]
+
+
+def test_store_frame_keeps_the_first_copy_unless_replacing(tmp_path):
+    cache = FrameCache(str(tmp_path / "cache"), "key", max_bytes=10_000)
+    _frames(tmp_path / "frames", [1], size=10)
+    assert cache.store_frame(str(tmp_path / "frames"), 1) is True
+    assert cache.store_frame(str(tmp_path / "frames"), 2) is False
+
+    os.remove(tmp_path / "frames" / frame_file(1))
+    _frames(tmp_path / "frames", [1], size=20)
+    assert cache.store_frame(str(tmp_path / "frames"), 1) is False
+    assert cache.store_frame(str(tmp_path / "frames"), 1, replace=True) is True
+    assert os.path.getsize(tmp_path / "cache" / "key" / frame_file(1)) == 20
+
+
+def test_segments_round_trip(tmp_path):
+    cache = FrameCache(str(tmp_path / "cache"), "key", max_bytes=10_000)
+    segment = tmp_path / "segment.mp4"
+    segment.write_bytes(b"mp4")
+    cache.store_segment(str(segment), 1, 48, "abc")
+
+    assert cache.restore_segment(1, 48, "abc", str(tmp_path / "restored.mp4")) is True
+    assert (tmp_path / "restored.mp4").read_bytes() == b"mp4"
+    # Other encode settings don't match
+    assert cache.restore_segment(1, 48, "def", str(tmp_path / "other.mp4")) is False
+
+
+def test_evicts_expired_then_least_recently_used(tmp_path):
+    root = str(tmp_path / "cache")
+    now = time.time()
+    for age, key in ((3600, "old"), (60, "older"), (30, "recent"), (0, "current")):
+        _frames(os.path.join(root, key), [1], size=100)
+        os.utime(os.path.join(root, key), (now - age, now - age))
+
+    # "old" is past max_age; then LRU until 200 bytes fit, never the job's own key
+    frame_cache.evict(root, max_bytes=200, max_age=600, keep="current")
+
+    assert sorted(os.listdir(root)) == ["current", "recent"]
+
+
+def _job(job_id, **overrides):
+    return {"id": job_id, "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1, **overrides,
+    }}
+
+
+def test_timed_out_render_resumes_from_checkpoint(handler, monkeypatch):
+    # 24 frames at 0.1s don't fit in a 1s render timeout
+    monkeypatch.setenv("BENCH_FRAME_SECONDS", "0.1")
+    monkeypatch.setattr(handler, "RENDER_TIMEOUT", 1)
+
+    failed = handler.handler(_job("killed", samples=3))
+
+    assert "frames are checkpointed - resubmit the job to resume" in failed["error"]
+    checkpointed = int(failed["error"].rsplit("\n", 1)[-1].split()[0])
+    assert 0 < checkpointed < 24
+
+    monkeypatch.setattr(handler, "RENDER_TIMEOUT", 60)
+    resumed = handler.handler(_job("resubmitted", samples=3))
+
+    assert "error" not in resumed, resumed.get("error")
+    assert resumed["frames_reused"] >= checkpointed
+    assert resumed["frames_reused"] + resumed["frames_rendered"] == 24
+
+
+def test_bypass_checkpoints_under_the_job_id(handler, monkeypatch):
+    monkeypatch.setenv("BENCH_FRAME_SECONDS", "0.1")
+    monkeypatch.setattr(handler, "RENDER_TIMEOUT", 1)
+    assert "checkpointed" in handler.handler(_job("bypassed", samples=5, cache="bypass"))["error"]
+
+    monkeypatch.setattr(handler, "RENDER_TIMEOUT", 60)
+    other = handler.handler(_job("another-job", samples=5, cache="bypass"))
+    retry = handler.handler(_job("bypassed", samples=5, cache="bypass"))
+
+    assert other["frames_reused"] == 0
+    assert retry["frames_reused"] > 0
@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+
+def _frames(render_blend, frames_dir, first, last):
+    for frame in range(first, last + 1):
+        with open(os.path.join(frames_dir, render_blend.frame_file(frame)), "wb") as f:
+            f.write(b"\x89PNG" + b"\0" * 64)
+
+
+def test_chunked_encoder_concats_segments(render_blend, tmp_path):
+    _frames(render_blend, str(tmp_path), 1, 10)
+    encoder = render_blend.ChunkedEncoder(str(tmp_path), 24, 1, 10, segment_frames=4, max_workers=2)
+    encoder.poll()
+
+    output = tmp_path / "out.mp4"
+    encoder.finish(str(output))
+
+    assert len(encoder.segments) == 3
+    assert output.stat().st_size == sum(os.path.getsize(p) for p in encoder.segments)
+
+
+def test_chunked_encoder_segment_failure_fails_finish(render_blend, failing_ffmpeg, tmp_path):
+    failing_ffmpeg("segment_0005")
+    _frames(render_blend, str(tmp_path), 1, 12)
+    encoder = render_blend.ChunkedEncoder(str(tmp_path), 24, 1, 12, segment_frames=4, max_workers=1)
+
+    # As from the render_write handler: a failed segment must not raise into Blender
+    for _ in range(3):
+        encoder.poll()
+        for proc, *_ in encoder.running:
+            proc.wait()
+    encoder.on_render_write(None)
+
+    output = tmp_path / "out.mp4"
+    with pytest.raises(RuntimeError, match="segment 5-8"):
+        encoder.finish(str(output))
+    assert not output.exists()
@@ -0,0 +1,109 @@
+import gzip
+import hashlib
+import os
+
+import pytest
+
+import downloader
+
+
+def _blend(size):
+    return b"BLENDER-v402" + os.urandom(size - 12)
+
+
+def test_resumes_sequential_download(template_server, tmp_path, monkeypatch):
+    template_server.body = _blend(300_000)
+    template_server.truncate_after = 100_000
+    dest = str(tmp_path / "template.blend")
+
+    # First job gives up at the dropped connection, keeping the partial file
+    monkeypatch.setattr(downloader, "MAX_RETRIES", 0)
+    with pytest.raises(Exception, match="interrupted"):
+        downloader.download(template_server.url, dest)
+    assert os.path.getsize(dest + ".part") == 100_000
+
+    result = downloader.download(template_server.url, dest)
+
+    assert result["bytes_resumed"] == 100_000
+    assert result["bytes_downloaded"] == 200_000
+    assert result["sha256"] == hashlib.sha256(template_server.body).hexdigest()
+    assert template_server.requests[-1]["If-Range"] == '"v1"'
+    assert not os.path.exists(dest + ".part.json")
+
+
+def test_retries_dropped_connection_within_one_download(template_server, tmp_path):
+    template_server.body = _blend(300_000)
+    template_server.truncate_after = 100_000
+    template_server.drop_requests = {2}
+    dest = str(tmp_path / "template.blend")
+
+    result = downloader.download(template_server.url, dest)
+
+    # Request 2 (the first resume) was reset before responding and retried
+    assert len(template_server.requests) == 3
+    assert result["bytes_resumed"] == 0
+    with open(dest, "rb") as f:
+        assert f.read() == template_server.body
+
+
+def test_if_range_mismatch_restarts(template_server, tmp_path, monkeypatch):
+    template_server.body = _blend(300_000)
+    template_server.truncate_after = 100_000
+    dest = str(tmp_path / "template.blend")
+    monkeypatch.setattr(downloader, "MAX_RETRIES", 0)
+    with pytest.raises(Exception):
+        downloader.download(template_server.url, dest)
+
+    # The template changes before the job is retried
+    template_server.body, template_server.etag, template_server.truncate_after = _blend(200_000), '"v2"', None
+    result = downloader.download(template_server.url, dest)
+
+    assert result["bytes_resumed"] == 0
+    assert result["etag"] == '"v2"'
+    with open(dest, "rb") as f:
+        assert f.read() == template_server.body
+
+
+def test_gzip_content_encoding(template_server, tmp_path):
+    blend = _blend(100_000)
+    template_server.body, template_server.content_encoding = gzip.compress(blend), "gzip"
+    dest = str(tmp_path / "template.blend")
+
+    result = downloader.download(template_server.url, dest)
+
+    assert result["compression"] == "gzip"
+    assert result["sha256"] == hashlib.sha256(blend).hexdigest()
+    with open(dest, "rb") as f:
+        assert f.read() == blend
+
+
+def test_zstd_sniffed_from_magic(template_server, tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    blend = _blend(100_000)
+    template_server.body = zstandard.ZstdCompressor().compress(blend)
+    dest = str(tmp_path / "template.blend")
+
+    result = downloader.download(template_server.url, dest)
+
+    assert result["compression"] == "zstd"
+    assert result["size"] == len(blend)
+    with open(dest, "rb") as f:
+        assert f.read() == blend
+
+
+def test_parallel_parts_retry_dropped_connection(template_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "PARALLEL_MIN_BYTES", 64 * 1024)
+    monkeypatch.setattr(downloader, "PARALLEL_PART_BYTES", 64 * 1024)
+    template_server.body = _blend(300_000)
+    # Reset the connection of one part request before it gets a response
+    template_server.drop_requests = {3}
+    dest = str(tmp_path / "template.blend")
+
+    result = downloader.download(template_server.url, dest)
+
+    assert result["parallel"] is True
+    assert result["bytes_downloaded"] == 300_000
+    # Probe + 5 parts + 1 retry
+    assert len(template_server.requests) == 7
+    with open(dest, "rb") as f:
+        assert f.read() == template_server.body
@@ -0,0 +1,55 @@
+import base64
+
+import pytest
+
+
+def _job(**extra):
+    return {"id": "draft", "input": {
+        "template": "test", "resolution": [1920, 1080], "samples": 128, "fps": 24, "duration": 2,
+        "quality": "draft", "cache": "bypass", **extra,
+    }}
+
+
+def test_draft_renders_a_cheap_proxy(handler, monkeypatch):
+    monkeypatch.setenv("BENCH_FRAME_SECONDS", "0.01")
+    result = handler.handler(_job(frame_step=2, config={"draft_scale": 25}))
+
+    assert "error" not in result, result.get("error")
+    draft = result["draft"]
+    assert draft["resolution_percentage"] == 25
+    assert draft["frame_step"] == 2
+    assert draft["samples"] < 128
+    assert draft["output_format"] == "mp4"
+    # Every other frame of 48
+    assert result["frames_rendered"] == 24
+    assert result["output_format"] == "mp4"
+    # Full quality: 16x the pixels, every frame, the requested samples
+    assert draft["speedup"] > 1
+    assert draft["estimated_full_render_seconds"] > 24 * 0.01
+
+
+def test_draft_gif(handler):
+    result = handler.handler(_job(config={"output_format": "gif"}))
+
+    assert "error" not in result, result.get("error")
+    assert result["output_format"] == "gif"
+    assert result["encode"]["encoder"] == "gif"
+    assert base64.b64decode(result["video_base64"])
+
+
+@pytest.mark.parametrize("job_input, error", [
+    ({"quality": "preview"}, "Unknown quality: preview"),
+    ({"quality": "final", "config": {"output_format": "gif"}}, "only available with quality draft"),
+    ({"config": {"draft_scale": 0}}, "draft_scale must be a percentage"),
+    ({"config": {"draft_scale": "25"}}, "draft_scale must be a number"),
+    ({"config": {"output_format": ["gif"]}}, "Unknown output_format"),
+    ({"config": {"frame_step": 2.5}}, "frame_step must be an integer, got 2.5"),
+    ({"config": {"frame_step": "2"}}, "frame_step must be an integer"),
+    ({"config": {"interpolation_check": "1"}}, "interpolation_check must be an integer"),
+    ({"config": {"interpolation_check": True}}, "interpolation_check must be an integer"),
+])
+def test_draft_validation(handler, job_input, error):
+    job = _job()
+    job["input"].update(job_input)
+
+    assert error in handler.handler(job)["error"]
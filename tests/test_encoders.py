@@ -0,0 +1,100 @@
+"""Encoder selection against the stub ffmpeg, which can't run NVENC unless BENCH_NVENC=1."""
+
+import pytest
+
+import encoders
+
+
+@pytest.fixture
+def probe_file(stub_path, tmp_path, monkeypatch):
+    """A worker that hasn't probed its encoders yet; returns the probe file."""
+    path = str(tmp_path / "encoder_probe.json")
+    monkeypatch.setenv("ENCODER_PROBE_FILE", path)
+    monkeypatch.setattr(encoders, "ENCODER_PROBE_FILE", path)
+    monkeypatch.setattr(encoders, "_probe", None)
+    return path
+
+
+def test_nvenc_missing_falls_back_to_libx264(probe_file):
+    selected = encoders.select_encoder("h264")
+
+    assert selected == {"codec": "h264", "encoder": "libx264", "fallback": True, "reason": "h264_nvenc unavailable"}
+    # Listed by the ffmpeg build but failing the test encode
+    assert "h264_nvenc" not in encoders.probe()["working"]
+
+
+def test_nvenc_preferred_when_it_works(probe_file, monkeypatch):
+    monkeypatch.setenv("BENCH_NVENC", "1")
+
+    assert encoders.select_encoder("hevc") == {"codec": "hevc", "encoder": "hevc_nvenc", "fallback": False,
+                                                "reason": None}
+
+
+def test_probe_is_saved_for_later_launches(probe_file, monkeypatch):
+    encoders.probe()
+    monkeypatch.setattr(encoders, "_probe", None)
+    # A later launch reads the file instead of running test encodes
+    monkeypatch.setattr(encoders, "test_encode", lambda name: pytest.fail("probed again"))
+
+    assert "libx264" in encoders.probe()["working"]
+
+
+def test_av1_chain_skips_unlisted_encoders(probe_file, monkeypatch):
+    monkeypatch.setenv("BENCH_ENCODERS", "libx264,libaom-av1,av1_nvenc")
+
+    selected = encoders.select_encoder("av1")
+
+    assert selected["encoder"] == "libaom-av1"
+    assert selected["reason"] == "av1_nvenc, libsvtav1 unavailable"
+
+
+def test_requested_encoder_falls_back_to_chain(probe_file, monkeypatch):
+    monkeypatch.setattr(encoders, "ENCODER_DISABLE", {"h264_nvenc"})
+    monkeypatch.setenv("BENCH_NVENC", "1")
+
+    selected = encoders.select_encoder("h264", "h264_nvenc")
+
+    assert selected["encoder"] == "libx264" and selected["fallback"] is True
+
+
+def test_no_working_encoder(probe_file, monkeypatch):
+    monkeypatch.setenv("BENCH_ENCODERS", "libx264")
+
+    with pytest.raises(RuntimeError, match="No working hevc encoder"):
+        encoders.select_encoder("hevc")
+
+
+def test_job_reports_fallback_encoder(handler, probe_file):
+    result = handler.handler({"id": "cpu-encode", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1,
+        "codec": "hevc", "cache": "bypass", "config": {"encode_threads": 2},
+    }})
+
+    assert "error" not in result, result.get("error")
+    assert result["encode"]["encoder"] == "libx265"
+    assert result["encode"]["fallback"] is True
+    assert result["encode"]["reason"] == "hevc_nvenc unavailable"
+    assert result["encode"]["fps"] > 0
+
+
+@pytest.mark.parametrize("config, error", [
+    ({"crf": "23"}, "crf must be an integer, got '23'"),
+    ({"crf": -1}, "crf must not be negative"),
+    ({"gop": 2.5}, "gop must be an integer"),
+    ({"encode_threads": True}, "encode_threads must be an integer"),
+    ({"codec": ["h264"]}, "Unknown codec"),
+    ({"preset": 3}, "Unknown preset"),
+    ({"encoder": 1}, "encoder must be"),
+    ({"bitrate": "fast"}, "bitrate must be a number"),
+    ({"crf": 20, "bitrate": "8M"}, "Set either crf or bitrate"),
+])
+def test_invalid_encoding_settings(handler, config, error):
+    result = handler.handler({"id": "bad-encoding", "input": {"template": "test", "config": config}})
+
+    assert error in result["error"]
+
+
+def test_valid_encoding_settings():
+    assert encoders.validate_settings({"codec": "av1", "preset": "slow", "crf": 30, "gop": 48}) is None
+    assert encoders.validate_settings({"codec": None, "bitrate": "4.5M", "encode_threads": 0}) is None
+    assert encoders.validate_settings({"bitrate": 8000000}) is None
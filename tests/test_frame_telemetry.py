@@ -0,0 +1,99 @@
+import json
+import time
+import types
+
+from frame_telemetry import FrameTelemetry, load_summary, merge_frames, percentile, summarize
+
+
+def _handlers():
+    return types.SimpleNamespace(render_pre=[], render_post=[], render_stats=[])
+
+
+def _scene():
+    return types.SimpleNamespace(frame_current=1, cycles=types.SimpleNamespace(samples=64))
+
+
+def _render(telemetry, scene, frame, stats, pause=0.01):
+    scene.frame_current = frame
+    telemetry.on_render_pre(scene)
+    for line in stats:
+        time.sleep(pause)
+        telemetry.on_render_stats(f"Fra:{frame} Mem:512.00M (Peak 768.00M) | Time:00:00.10 | {line}")
+    telemetry.on_render_post(scene)
+
+
+def test_records_setup_bvh_samples_and_memory():
+    scene, telemetry = _scene(), FrameTelemetry(_scene())
+    _render(telemetry, scene, 1, ["Synchronizing object", "Building BVH", "Loading render kernels",
+                                  "Sample 32/64", "Sample 64/64"])
+
+    frame, = telemetry.frames
+    assert frame["frame"] == 1 and frame["samples"] == 64 and frame["peak_mem_mb"] == 768.0
+    # Time up to the first sample is setup; BVH and kernel time are broken out
+    assert frame["setup_seconds"] >= 0.04
+    assert frame["bvh_seconds"] > 0 and frame["kernel_seconds"] > 0
+    assert frame["seconds"] >= frame["setup_seconds"]
+
+
+def test_frames_without_sample_lines_use_configured_samples():
+    scene, telemetry = _scene(), FrameTelemetry(_scene())
+    _render(telemetry, scene, 3, ["Rendering"])
+
+    assert telemetry.frames[0]["samples"] == 64
+    assert telemetry.frames[0]["setup_seconds"] is None
+
+
+def test_paused_renders_are_not_recorded():
+    scene, handlers = _scene(), _handlers()
+    telemetry = FrameTelemetry(scene)
+    telemetry.register(handlers)
+
+    with telemetry.paused(handlers):
+        assert handlers.render_pre == []
+    assert handlers.render_pre == [telemetry.on_render_pre]
+    telemetry.unregister(handlers)
+    assert handlers.render_stats == []
+
+
+def test_summary_percentiles_and_outliers():
+    frames = [{"frame": i, "seconds": 1.0, "samples": 64} for i in range(1, 10)]
+    frames.append({"frame": 10, "seconds": 5.0, "samples": 32})
+
+    summary = summarize(frames)
+
+    assert summary["frames"] == 10
+    assert summary["seconds"] == {"p50": 1.0, "p95": 5.0, "max": 5.0}
+    assert summary["samples"]["p50"] == 64
+    assert summary["slowest_frames"][0] == {"frame": 10, "seconds": 5.0}
+    assert summary["outlier_frames"] == [10]
+    assert summarize([]) == {"frames": 0}
+    assert percentile([3, 1, 2], 50) == 2
+
+
+def test_sidecar_round_trip_and_merge(tmp_path):
+    scene = _scene()
+    telemetry = FrameTelemetry(scene)
+    _render(telemetry, scene, 5, ["Sample 64/64"], pause=0)
+    path = str(tmp_path / "telemetry" / "job.json")
+
+    telemetry.write(path, template="t.blend")
+    merge_frames(path, [{"frame": 1, "seconds": 0.5}])
+
+    with open(path) as f:
+        data = json.load(f)
+    assert data["template"] == "t.blend"
+    assert [f["frame"] for f in data["frames"]] == [1, 5]
+    assert load_summary(path)["frames"] == 2
+    assert load_summary(str(tmp_path / "missing.json")) is None
+
+
+def test_job_reports_frame_telemetry(handler):
+    result = handler.handler({"id": "telemetry", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 8, "fps": 24, "duration": 1, "cache": "bypass",
+    }})
+
+    assert "error" not in result, result.get("error")
+    summary = result["frame_telemetry"]
+    assert summary["frames"] == 24
+    assert summary["peak_mem_mb"]["max"] == 768.0
+    assert summary["samples"]["max"] == 8
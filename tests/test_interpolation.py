@@ -0,0 +1,12 @@
+def test_interpolation_check_frames_are_not_counted(handler):
+    result = handler.handler({"id": "interpolation-check", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 8, "fps": 24, "duration": 1,
+        "frame_step": 4, "cache": "bypass", "config": {"interpolation_check": 2, "time_budget": 60},
+    }})
+
+    assert "error" not in result, result.get("error")
+    # Frames 1, 5, ..., 21 rendered; the check re-renders a window of 9 more frames
+    assert result["interpolation"]["window"] == [5, 13]
+    assert result["frames_rendered"] == 6
+    assert result["sampling"]["frames"] == 6
+    assert result["frame_telemetry"]["frames"] == 6
@@ -0,0 +1,113 @@
+import socket
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import metrics
+
+
+def _value(name, text=None):
+    """Value of one sample line of the current metrics, 0 if absent."""
+    for line in (text or metrics.render_metrics()).splitlines():
+        if line.startswith(name + " "):
+            return float(line.split()[-1])
+    return 0.0
+
+
+def test_phase_timer_adds_up_phases():
+    timer = metrics.PhaseTimer()
+    with timer.phase("render"):
+        time.sleep(0.02)
+    with timer.phase("render"):
+        time.sleep(0.02)
+    timer.add("deliver", 0.5)
+    timer.add("skipped", None)
+
+    timings = timer.as_dict()
+    assert timings["render"] >= 0.04
+    assert timings["deliver"] == 0.5 and "skipped" not in timings
+    assert timings["total"] >= timings["render"]
+
+
+def test_histogram_text_format():
+    histogram = metrics.Histogram("test_seconds", "Test.", buckets=(1, 5))
+    histogram.observe(0.5, phase="a")
+    histogram.observe(3, phase="a")
+
+    assert histogram.render() == [
+        "# HELP test_seconds Test.",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{phase="a",le="1"} 1',
+        'test_seconds_bucket{phase="a",le="5"} 2',
+        'test_seconds_bucket{phase="a",le="+Inf"} 2',
+        'test_seconds_sum{phase="a"} 3.5',
+        'test_seconds_count{phase="a"} 2',
+    ]
+
+
+def test_record_job_updates_and_writes_metrics(tmp_path, monkeypatch):
+    path = tmp_path / "metrics" / "blender.prom"
+    monkeypatch.setattr(metrics, "METRICS_FILE", str(path))
+    before = metrics.render_metrics()
+
+    metrics.record_job("success", {"render": 2.0, "total": 3.0}, {
+        "file_size_bytes": 1000, "frames_rendered": 20, "frames_reused": 4,
+        "estimate": {"action": "split", "error_ratio": 1.2},
+    })
+
+    text = path.read_text()
+    for name, delta in [('blender_jobs_total{status="success"}', 1), ("blender_output_bytes_total", 1000),
+                        ('blender_frames_total{source="rendered"}', 20),
+                        ('blender_frames_total{source="reused"}', 4),
+                        ('blender_admissions_total{action="split"}', 1),
+                        ('blender_phase_seconds_count{phase="render"}', 1),
+                        ("blender_job_seconds_count", 1), ("blender_prediction_ratio_count", 1)]:
+        assert _value(name, text) - _value(name, before) == delta, name
+
+
+def test_cache_hits_do_not_count_admissions():
+    before = metrics.render_metrics()
+
+    metrics.record_job("cache_hit", {"total": 0.1}, {"frames_rendered": 20, "estimate": {"action": "accept"}})
+
+    assert _value('blender_jobs_total{status="cache_hit"}') - _value('blender_jobs_total{status="cache_hit"}',
+                                                                      before) == 1
+    assert _value('blender_admissions_total{action="accept"}') == \
+        _value('blender_admissions_total{action="accept"}', before)
+    assert _value('blender_frames_total{source="rendered"}') == _value('blender_frames_total{source="rendered"}',
+                                                                       before)
+
+
+@pytest.fixture
+def metrics_server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = metrics.start_metrics_server(port)
+    yield f"http://127.0.0.1:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_metrics_endpoint(metrics_server):
+    with urllib.request.urlopen(metrics_server + "/metrics") as response:
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "# TYPE blender_jobs_total counter" in response.read().decode()
+
+    with pytest.raises(urllib.error.HTTPError):
+        urllib.request.urlopen(metrics_server + "/other")
+    assert metrics.start_metrics_server(0) is None
+
+
+def test_job_reports_timings_and_is_recorded(handler):
+    before = _value('blender_jobs_total{status="success"}')
+
+    result = handler.handler({"id": "timed", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1, "cache": "bypass",
+    }})
+
+    assert "error" not in result, result.get("error")
+    assert {"check_gpu", "blender", "render", "encode", "deliver", "total"} <= set(result["timings"])
+    assert _value('blender_jobs_total{status="success"}') == before + 1
@@ -0,0 +1,85 @@
+import time
+import types
+
+from render_budget import RenderBudget
+
+
+def _scene(frame_end=4):
+    return types.SimpleNamespace(frame_current=1, frame_end=frame_end, frame_step=1,
+                                 cycles=types.SimpleNamespace(samples=64, time_limit=0))
+
+
+def _handlers():
+    return types.SimpleNamespace(render_pre=[], render_post=[], render_stats=[])
+
+
+def _render(budget, scene, frame, seconds=0.01, samples=64):
+    scene.frame_current = frame
+    budget.on_render_pre(scene)
+    budget.on_render_stats(f"Fra:{frame} | Sample 1/{samples}")
+    time.sleep(seconds)
+    budget.on_render_stats(f"Fra:{frame} | Sample {samples}/{samples}")
+    budget.on_render_post(scene)
+
+
+def test_report_excludes_encode_after_last_frame():
+    scene = _scene()
+    budget = RenderBudget(scene, time_budget=0.5)
+    for frame in range(1, 5):
+        _render(budget, scene, frame)
+
+    # ffmpeg encoding after the last frame
+    time.sleep(0.6)
+    report = budget.report()
+
+    assert report["frames"] == 4
+    assert report["render_seconds"] < 0.5
+    assert report["budget_met"] is True
+
+
+def test_budget_missed_by_slow_frames():
+    scene = _scene()
+    budget = RenderBudget(scene, time_budget=0.1)
+    for frame in range(1, 5):
+        _render(budget, scene, frame, seconds=0.05)
+
+    report = budget.report()
+
+    assert report["render_seconds"] >= 0.2
+    assert report["budget_met"] is False
+
+
+def test_paused_renders_are_left_out():
+    scene, handlers = _scene(), _handlers()
+    budget = RenderBudget(scene, time_budget=0.5)
+    budget.register(handlers)
+    _render(budget, scene, 1)
+
+    with budget.paused(handlers):
+        assert handlers.render_post == []
+        time.sleep(0.3)
+    _render(budget, scene, 2)
+    with budget.paused(handlers):
+        time.sleep(0.3)
+    report = budget.report()
+
+    assert handlers.render_post == [budget.on_render_post]
+    assert report["frames"] == 2
+    assert report["render_seconds"] < 0.2
+
+
+def test_frame_time_limit_shares_what_is_left():
+    scene = _scene(frame_end=10)
+    budget = RenderBudget(scene, time_budget=10, frame_time_limit=0.5)
+
+    # A tenth of the budget per frame, capped by frame_time_limit
+    assert 0.45 < budget.frame_time_limit_for(1) <= 0.5
+    assert 0.9 < RenderBudget(scene, time_budget=10).frame_time_limit_for(1) <= 1.0
+    assert budget.frame_time_limit_for(10) == 0.5
+
+
+def test_no_frames_rendered():
+    report = RenderBudget(_scene(), time_budget=5).report()
+
+    assert report == {"frames": 0, "samples_effective": None, "render_seconds": 0.0, "time_budget": 5,
+                      "budget_met": True}
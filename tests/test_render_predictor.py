@@ -0,0 +1,136 @@
+import pytest
+
+import render_predictor
+from render_predictor import frame_range, frames_rendered, predict, split_ranges
+
+GPU = "Test GPU"
+
+
+def _record(gpu=GPU, template="t", frame_seconds=1.1, **overrides):
+    # 1e6 pixels x 100 samples in 1.0s of sampling: 1e-8 s per pixel-sample
+    return {"template": template, "gpu": gpu, "pixels": 1_000_000, "samples": 100, "frames": 24,
+            "frame_seconds": frame_seconds, "setup_seconds": 0.1, "fixed_seconds": 5.0, "peak_mem_mb": 1000.0,
+            "time": 0, **overrides}
+
+
+HISTORY = [_record() for _ in range(3)]
+
+
+def _config(**overrides):
+    return {"resolution": [1000, 1000], "samples": 100, "frame_time_limit": None, "time_budget": None, **overrides}
+
+
+def test_predict_scales_with_pixels_and_samples():
+    estimate = predict(HISTORY, "t", GPU, _config(), 10)
+    assert estimate["seconds"] == pytest.approx(5 + 10 * 1.1)
+    assert estimate["same_gpu"] is True and estimate["basis"] == 3
+
+    # Twice the pixels and half the samples: same sampling time
+    assert predict(HISTORY, "t", GPU, _config(resolution=[2000, 1000], samples=50), 10)["frame_seconds"] == \
+        pytest.approx(1.1)
+    assert predict(HISTORY, "t", GPU, _config(samples=200), 10)["frame_seconds"] == pytest.approx(2.1)
+
+
+def test_predict_needs_enough_history():
+    assert predict(HISTORY[:2], "t", GPU, _config(), 10) is None
+    assert predict(HISTORY, "other", GPU, _config(), 10) is None
+
+
+def test_predict_falls_back_to_other_gpus():
+    history = [_record(gpu="Other GPU", frame_seconds=2.1) for _ in range(3)] + [_record()]
+
+    estimate = predict(history, "t", GPU, _config(), 10)
+
+    assert estimate["same_gpu"] is False and estimate["basis"] == 4
+
+
+def test_predict_applies_limits():
+    assert predict(HISTORY, "t", GPU, _config(frame_time_limit=0.5), 10)["frame_seconds"] == pytest.approx(0.6)
+    # The budget covers setup plus what sampling can use of it
+    assert predict(HISTORY, "t", GPU, _config(time_budget=6), 10)["frame_seconds"] == pytest.approx(0.6)
+    # CPU renders are capped at 32 samples
+    cpu = [_record(gpu="cpu") for _ in range(3)]
+    assert predict(cpu, "t", "", _config(samples=128), 10)["frame_seconds"] == pytest.approx(0.1 + 0.32)
+
+
+def test_predict_vram():
+    assert predict(HISTORY, "t", GPU, _config(), 1)["peak_vram_mb"] == 1000.0
+    film = 1_000_000 * render_predictor.FILM_BYTES_PER_PIXEL / 1024 ** 2
+    assert predict(HISTORY, "t", GPU, _config(resolution=[2000, 1000]), 1)["peak_vram_mb"] == \
+        pytest.approx(1000 + film, abs=0.1)
+
+
+@pytest.mark.parametrize("first, last, step, per_chunk", [(1, 100, 1, 30), (1, 100, 3, 7), (5, 6, 1, 10)])
+def test_split_ranges_render_the_same_frames(first, last, step, per_chunk):
+    chunks = split_ranges(first, last, step, per_chunk)
+
+    rendered = [frame for start, end in chunks for frame in range(start, end + 1, step)]
+    assert rendered == list(range(first, last + 1, step))
+    assert all(frames_rendered(start, end, step) <= per_chunk for start, end in chunks)
+    assert chunks[0][0] == first and chunks[-1][1] == last
+
+
+def test_frame_range():
+    assert frame_range({"duration": 2, "fps": 24}, None) == (1, 48)
+    assert frame_range({"duration": 2, "fps": 24, "shard_index": 1, "shard_count": 3}, None) == (17, 32)
+    assert frame_range({"frame_start": 10, "frame_end": 20}, {"frame_start": 1, "frame_end": 250}) == (10, 20)
+    assert frame_range({}, {"frame_start": 1, "frame_end": 250}) == (1, 250)
+    assert frame_range({}, None) is None
+
+
+@pytest.fixture
+def admission(handler, monkeypatch):
+    """handler.admit() on a 24 GB GPU with a 100s render timeout and HISTORY."""
+    monkeypatch.setattr(handler, "_gpu_name", GPU)
+    monkeypatch.setattr(handler, "_gpu_memory_mb", 24_000)
+    monkeypatch.setattr(handler, "RENDER_TIMEOUT", 100)
+    monkeypatch.setattr(handler, "ADMISSION_HEADROOM", 0.9)
+    monkeypatch.setattr(handler, "load_history", lambda: list(HISTORY))
+
+    def admit(frames=100, **config):
+        config = {**handler.DEFAULT_CONFIG, **_config(), "frame_start": 1, "frame_end": frames, **config}
+        return handler.admit(config, {"template": "t", "scene": None}, "no-such-frame-key")
+    return admit
+
+
+def test_admission_accepts_what_fits(admission):
+    decision = admission(frames=50)
+
+    assert decision["action"] == "accept"
+    assert decision["estimate"]["seconds"] == pytest.approx(5 + 50 * 1.1)
+
+
+def test_admission_splits_into_chunks_that_fit(admission):
+    # 5 + 100 * 1.1 = 115s > 90s: chunks of (90 - 5) // 1.1 = 77 frames
+    decision = admission(admission="split")
+
+    assert decision["action"] == "split"
+    assert decision["chunks"] == [[1, 77], [78, 100]]
+    assert decision["estimate"]["action"] == "split"
+
+
+def test_admission_downgrades_to_a_time_budget(admission):
+    decision = admission(admission="downgrade")
+
+    assert decision == {**decision, "action": "downgrade", "time_budget": 85.0}
+
+
+def test_admission_rejects(admission):
+    decision = admission(admission="reject")
+
+    assert decision["action"] == "reject"
+    assert "Predicted render time 115s" in decision["error"]
+    assert admission(admission="off")["action"] == "accept"
+
+
+def test_admission_rejects_what_does_not_fit_in_vram(admission, handler, monkeypatch):
+    monkeypatch.setattr(handler, "_gpu_memory_mb", 512)
+
+    decision = admission(frames=10, admission="split")
+
+    assert decision["action"] == "reject"
+    assert "GPU memory" in decision["error"]
+
+
+def test_drafts_are_not_predicted(admission):
+    assert admission(quality="draft") == {"action": "accept", "estimate": None}
@@ -0,0 +1,76 @@
+from render_progress import RenderProgress
+
+
+def _feed(progress, lines):
+    for line in lines:
+        progress.feed(line + "\n")
+
+
+def test_parses_frames_samples_and_result():
+    updates = []
+    progress = RenderProgress(updates.append, interval=0)
+    _feed(progress, [
+        "Frame range: 1-10",
+        "Frame cache: 4 frames reused, 6 to render",
+        "Fra:5 Mem:120M | Time:00:01.10 | Sample 32/64",
+        "Fra:5 Mem:120M | Time:00:02.20 | Sample 64/64",
+        "Saved: '/tmp/frames/frame_0005.png'",
+        "Fra:6 Mem:120M | Time:00:00.50 | Sample 16/64",
+    ])
+
+    snapshot = progress.snapshot()
+    assert snapshot["frames_total"] == 10
+    assert snapshot["frames_done"] == 5
+    assert snapshot["frames_reused"] == 4
+    assert (snapshot["frame"], snapshot["sample"], snapshot["samples"]) == (6, 16, 64)
+    assert snapshot["eta_seconds"] is not None
+    assert updates[-1]["frame"] == 6
+
+    _feed(progress, ['RESULT: {"frames_rendered": 6}'])
+    assert progress.result == {"frames_rendered": 6}
+
+
+def test_frame_step_and_stream_mode():
+    progress = RenderProgress(interval=0)
+    _feed(progress, ["Frame range: 1-10", "Frame step: 4", "Streamed frame 1 (1 total)", "Streamed frame 5 (2 total)"])
+
+    assert progress.snapshot()["frames_total"] == 3
+    assert progress.snapshot()["frames_done"] == 2
+
+
+def test_updates_are_throttled():
+    updates = []
+    progress = RenderProgress(updates.append, interval=60)
+    _feed(progress, [f"Saved: '/tmp/frames/frame_{frame:04d}.png'" for frame in range(1, 11)])
+
+    assert len(updates) == 1
+    progress.update(force=True)
+    assert len(updates) == 2 and updates[-1]["frames_done"] == 10
+
+
+def test_failing_callback_does_not_fail_the_render():
+    def broken(update):
+        raise ConnectionError("progress endpoint down")
+
+    progress = RenderProgress(broken, interval=0)
+    _feed(progress, ["Saved: '/tmp/frames/frame_0001.png'"])
+
+    assert progress.snapshot()["frames_done"] == 1
+
+
+def test_log_tail_is_bounded_and_skips_sample_lines():
+    progress = RenderProgress(tail_lines=3)
+    _feed(progress, [f"line {i}" for i in range(10)] + ["Fra:1 Mem:1M | Sample 1/64"])
+
+    assert list(progress.lines) == ["line 7", "line 8", "line 9"]
+    assert progress.tail(max_chars=6) == "line 9"
+
+
+def test_job_sends_progress_updates(handler):
+    result = handler.handler({"id": "progress", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1, "cache": "bypass",
+    }})
+
+    assert "error" not in result, result.get("error")
+    rendering = [u for u in handler.progress_updates if isinstance(u, dict) and u.get("stage") == "rendering"]
+    assert rendering and rendering[-1]["frames_total"] == 24
@@ -0,0 +1,75 @@
+import pytest
+
+import renditions
+
+CONFIG = {"resolution": [1920, 1080], "codec": "h264", "encoder": None, "preset": "fast", "crf": None,
+          "bitrate": "8M"}
+
+
+def test_normalize_fills_defaults_and_resolves_crops():
+    outputs = renditions.normalize([
+        {"name": "landscape"},
+        {"resolution": [1280, 720], "crf": 20, "bitrate": None},
+        {"name": "vertical", "resolution": [608, 1080], "crop": "9:16", "codec": "hevc"},
+    ], CONFIG)
+
+    assert [r["name"] for r in outputs] == ["landscape", "1280x720", "vertical"]
+    assert outputs[0]["resolution"] == [1920, 1080] and outputs[0]["crop"] is None
+    assert outputs[1]["crf"] == 20
+    assert outputs[2]["crop"] == [656, 0, 608, 1080]
+    assert outputs[2]["codec"] == "hevc" and outputs[2]["bitrate"] == "8M"
+
+
+@pytest.mark.parametrize("output, error", [
+    ({"resolution": 720}, "resolution must be two positive even integers"),
+    ({"resolution": "1280x720"}, "resolution must be two positive even integers"),
+    ({"resolution": [1281, 720]}, "resolution must be two positive even integers"),
+    ({"codec": "vp9"}, "Unknown codec: vp9"),
+    ({"preset": "quick"}, "Unknown preset: quick"),
+    ({"crf": "20"}, "crf must be an integer"),
+    ({"crf": -3}, "crf must not be negative"),
+    ({"crop": 5}, "crop must be"),
+    ({"crop": [0, 0, 4000, 1080]}, "does not fit"),
+    ({"name": "my clip"}, "name may only contain"),
+    ({"name": 7}, "name must be a string"),
+    ({"fps": 30}, "unknown keys"),
+])
+def test_normalize_rejects_bad_renditions(output, error):
+    with pytest.raises(ValueError, match=error) as excinfo:
+        renditions.normalize([{"name": "ok"}, output], CONFIG)
+
+    assert str(excinfo.value).startswith("outputs[1]")
+
+
+def test_duplicate_names():
+    with pytest.raises(ValueError, match="unique"):
+        renditions.normalize([{"resolution": [1280, 720]}, {"resolution": [1280, 720]}], CONFIG)
+
+
+def test_render_resolution_ignores_malformed_sizes():
+    outputs = [{"resolution": [1280, 720]}, {"resolution": 5}, {"resolution": [720, 1280], "crop": "9:16"}]
+
+    assert renditions.render_resolution(outputs) == [1280, 720]
+    assert renditions.render_resolution([{"resolution": "big"}]) is None
+
+
+def test_bad_rendition_fails_before_rendering(handler):
+    result = handler.handler({"id": "bad-rendition", "input": {"template": "test", "config": {
+        "outputs": [{"resolution": [64, 64]}, {"resolution": [32, 32], "codec": "vp9"}],
+    }}})
+
+    assert result["error"].startswith("outputs[1]: Unknown codec: vp9")
+
+
+def test_rendition_job(handler):
+    result = handler.handler({"id": "renditions", "input": {
+        "template": "test", "samples": 1, "fps": 24, "duration": 1, "cache": "bypass", "config": {
+            "outputs": [{"name": "square", "resolution": [64, 64]},
+                        {"name": "small", "resolution": [32, 32], "codec": "hevc", "crf": 30}],
+        },
+    }})
+
+    assert "error" not in result, result.get("error")
+    assert [o["name"] for o in result["outputs"]] == ["square", "small"]
+    assert result["outputs"][1]["encoder"] == "libx265"
+    assert all(o["file_size_bytes"] > 0 for o in result["outputs"])
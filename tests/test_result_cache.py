@@ -0,0 +1,104 @@
+import json
+
+import result_cache
+import storage
+
+
+def _write(path, size):
+    with open(path, "wb") as f:
+        f.write(b"\0" * size)
+    return str(path)
+
+
+def test_s3_backend_keeps_large_meta_in_sidecar(s3_bucket, tmp_path):
+    backend = result_cache.ObjectStoreBackend(prefix="render-cache/")
+    # Well past the 2 KB S3 allows for user metadata
+    meta = {"output_format": "mp4", "estimate": {"notes": "x" * 4096}, "branding": {"text": "y" * 1024}}
+
+    stored = backend.store("abc", _write(tmp_path / "render.mp4", 1024), meta)
+
+    assert stored["key"] == "render-cache/abc.mp4"
+    body = s3_bucket.get_object(Bucket="renders-test", Key="render-cache/abc.json")["Body"].read()
+    assert json.loads(body) == meta
+    hit = backend.lookup("abc")
+    assert hit["meta"] == meta and hit["size"] == 1024
+    assert backend.lookup("missing") is None
+
+
+def test_s3_backend_video_without_meta_is_a_miss(s3_bucket, tmp_path):
+    backend = result_cache.ObjectStoreBackend(prefix="render-cache/")
+    storage.upload_file(_write(tmp_path / "render.mp4", 16), "abc.mp4", prefix="render-cache/")
+
+    assert backend.lookup("abc") is None
+
+
+def test_s3_backend_evicts_video_and_meta(s3_bucket, tmp_path):
+    backend = result_cache.ObjectStoreBackend(prefix="render-cache/", max_bytes=1500)
+    backend.store("old", _write(tmp_path / "old.mp4", 1000), {"n": 1})
+    backend.store("new", _write(tmp_path / "new.mp4", 1000), {"n": 2})
+
+    keys = {o["Key"] for o in s3_bucket.list_objects_v2(Bucket="renders-test")["Contents"]}
+    assert keys == {"render-cache/new.mp4", "render-cache/new.json"}
+
+
+def test_local_backend_round_trip(tmp_path):
+    backend = result_cache.LocalDiskBackend(cache_dir=str(tmp_path / "cache"))
+    backend.store("abc", _write(tmp_path / "render.mp4", 64), {"n": 1})
+
+    hit = backend.lookup("abc")
+    assert hit["meta"] == {"n": 1} and hit["size"] == 64
+
+
+def test_frame_key_uses_cpu_sample_cap():
+    config = {"resolution": [64, 64], "samples": 128, "duration": 2}
+
+    gpu = result_cache.frame_cache_key("abc", config, "v1")
+    cpu = result_cache.frame_cache_key("abc", config, "v1", gpu=False)
+
+    # A CPU worker renders 32 samples, which a GPU job asking for 128 must not reuse
+    assert cpu != gpu
+    assert cpu == result_cache.frame_cache_key("abc", {**config, "samples": 32}, "v1")
+    assert cpu == result_cache.frame_cache_key("abc", {**config, "samples": 64}, "v1", gpu=False)
+    # Under the cap CPU and GPU frames are the same
+    assert result_cache.frame_cache_key("abc", {**config, "samples": 16}, "v1", gpu=False) == \
+        result_cache.frame_cache_key("abc", {**config, "samples": 16}, "v1")
+    assert config["samples"] == 128
+
+
+def test_render_key_treats_defaults_as_omitted():
+    base = {"resolution": [64, 64], "samples": 16, "fps": 24, "duration": 2, "quality": None, "codec": None,
+            "frame_step": None}
+
+    def key(**config):
+        return result_cache.render_cache_key("abc", {**base, **config}, "v1")
+
+    assert key(quality="final") == key()
+    assert key(codec="h264") == key()
+    assert key(frame_step=1) == key()
+    assert key(quality="final", codec="h264", frame_step=1, encoder="auto", output_format="mp4") == key()
+    assert key(codec="hevc") != key()
+    # A draft's frame_step defaults to 2, so 1 is a different render
+    assert key(quality="draft", frame_step=2) == key(quality="draft")
+    assert key(quality="draft", frame_step=1) != key(quality="draft")
+
+
+def test_rendition_key_treats_defaults_as_omitted():
+    config = {"resolution": [64, 64], "samples": 16, "codec": None}
+    rendition = {"name": "small", "resolution": [32, 32], "crop": None, "codec": None, "encoder": None,
+                 "preset": None, "crf": None, "bitrate": None}
+
+    assert result_cache.rendition_cache_key("abc", config, {**rendition, "codec": "h264", "preset": "fast"}, "v1") \
+        == result_cache.rendition_cache_key("abc", config, rendition, "v1")
+
+
+def test_jobs_spelling_out_defaults_hit_the_cache(handler):
+    job_input = {"template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1}
+
+    first = handler.handler({"id": "implicit", "input": job_input})
+    second = handler.handler({"id": "explicit", "input": {
+        **job_input, "quality": "final", "codec": "h264", "frame_step": 1,
+    }})
+
+    assert first["render_cache"]["status"] == "miss"
+    assert second["render_cache"]["status"] == "hit"
+    assert second["render_cache"]["key"] == first["render_cache"]["key"]
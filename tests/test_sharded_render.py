@@ -0,0 +1,98 @@
+"""
+Sharded fan-out end to end: render.py submits the shards to a local stand-in
+for the RunPod queue, which runs them through handler.handler() with the stub
+Blender and ffmpeg; render.py then stitches the returned segments.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def client(local_queue, tmp_path, monkeypatch):
+    """render.py pointed at the local queue, writing into tmp_path."""
+    monkeypatch.setenv("RUNPOD_API_KEY", "test")
+    import render
+
+    monkeypatch.setattr(render, "BASE_URL", local_queue.url)
+    monkeypatch.setitem(render.CONFIG, "template", "test")
+    monkeypatch.setitem(render.CONFIG, "duration", 1)
+    monkeypatch.setitem(render.CONFIG, "poll_interval", 0.05)
+    monkeypatch.chdir(tmp_path)
+    render.queue = local_queue
+    return render
+
+
+def test_sharded_render_covers_every_frame_once(client, tmp_path):
+    client.run_sharded_render(3)
+
+    outputs = sorted((job["output"] for job in client.queue.jobs.values()), key=lambda o: o["frame_start"])
+    assert [(o["frame_start"], o["frame_end"]) for o in outputs] == [(1, 8), (9, 16), (17, 24)]
+    # Stitched with -c copy: the output is exactly the segments in order
+    assert (tmp_path / "output.mp4").stat().st_size == sum(o["file_size_bytes"] for o in outputs)
+
+
+def _stitch_calls(client, monkeypatch):
+    calls = []
+    run = client.subprocess.run
+
+    def recording_run(cmd, *args, **kwargs):
+        if "concat" in cmd:
+            calls.append(cmd)
+        return run(cmd, *args, **kwargs)
+
+    monkeypatch.setattr(client.subprocess, "run", recording_run)
+    return calls
+
+
+def test_same_encoder_shards_are_copied(client, monkeypatch):
+    calls = _stitch_calls(client, monkeypatch)
+    client.run_sharded_render(2)
+
+    assert len(calls) == 1 and calls[0][-3:-1] == ["-c", "copy"]
+
+
+def test_mixed_encoder_shards_are_reencoded(client, handler, tmp_path, monkeypatch):
+    # One shard lands on a worker with a working NVENC
+    run_handler = handler.handler
+
+    def handler_with_nvenc(job):
+        result = run_handler(job)
+        if job["input"].get("shard_index") == 1:
+            result["encode"] = {**result["encode"], "encoder": "h264_nvenc", "fallback": False, "reason": None}
+        return result
+
+    monkeypatch.setattr(handler, "handler", handler_with_nvenc)
+    calls = _stitch_calls(client, monkeypatch)
+    client.run_sharded_render(2)
+
+    assert len(calls) == 1
+    assert "copy" not in calls[0]
+    assert calls[0][calls[0].index("-c:v") + 1] == "libx264"
+    assert (tmp_path / "output.mp4").exists()
+
+
+def test_failed_shard_fails_the_render(client, tmp_path, monkeypatch):
+    monkeypatch.setitem(client.CONFIG, "template", "missing")
+    client.run_sharded_render(2)
+
+    assert "FAILED" in {job["status"] for job in client.queue.jobs.values()}
+    assert not (tmp_path / "output.mp4").exists()
+
+
+@pytest.mark.parametrize("key, value", [
+    ("shard_index", "2"),
+    ("shard_count", 2.0),
+    ("frame_start", "1"),
+    ("frame_end", True),
+])
+def test_shard_and_frame_bounds_must_be_integers(handler, key, value):
+    job_input = {"template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "cache": "bypass"}
+    if key.startswith("shard"):
+        job_input.update(shard_index=0, shard_count=2)
+    else:
+        job_input.update(frame_start=1, frame_end=4)
+    job_input[key] = value
+
+    result = handler.handler({"id": "bad-shard", "input": job_input})
+
+    assert result == {"error": f"{key} must be an integer, got {value!r}"}
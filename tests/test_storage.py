@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+import pytest
+
+import storage
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    # The smallest part size S3 accepts, so a multipart upload needs only a few MB
+    monkeypatch.setattr(storage, "PART_SIZE", 5 * MB)
+
+
+def _video(path, size):
+    data = os.urandom(size)
+    path.write_bytes(data)
+    return str(path), data
+
+
+def test_multipart_upload(s3_bucket, small_parts, tmp_path):
+    path, data = _video(tmp_path / "render.mp4", 12 * MB)
+
+    upload = storage.upload_file(path, "job.mp4", prefix="renders/")
+
+    assert upload["key"] == "renders/job.mp4"
+    assert upload["size"] == len(data)
+    assert upload["sha256"] == hashlib.sha256(data).hexdigest()
+    stored = s3_bucket.get_object(Bucket="renders-test", Key="renders/job.mp4")
+    assert stored["Body"].read() == data
+    assert stored["ContentType"] == "video/mp4"
+    # Three parts: 5 + 5 + 2 MB
+    assert stored["ETag"].endswith('-3"')
+
+
+def test_small_upload_is_a_single_put(s3_bucket, tmp_path):
+    path, data = _video(tmp_path / "render.mp4", 1 * MB)
+
+    upload = storage.upload_file(path, "job.mp4")
+
+    head = s3_bucket.head_object(Bucket="renders-test", Key=upload["key"])
+    assert head["Metadata"]["sha256"] == hashlib.sha256(data).hexdigest()
+    assert "-" not in head["ETag"]
+
+
+def test_failed_part_aborts_the_upload(s3_bucket, small_parts, tmp_path, monkeypatch):
+    path, _ = _video(tmp_path / "render.mp4", 12 * MB)
+    client = storage._client()
+    calls = []
+
+    def upload_part(**kwargs):
+        calls.append(kwargs["PartNumber"])
+        if kwargs["PartNumber"] == 2:
+            raise ConnectionError("connection reset")
+        return type(client).upload_part(client, **kwargs)
+
+    monkeypatch.setattr(client, "upload_part", upload_part)
+    monkeypatch.setattr(storage, "_client", lambda: client)
+
+    with pytest.raises(ConnectionError):
+        storage.upload_file(path, "job.mp4")
+
+    assert calls == [1, 2]
+    assert not s3_bucket.list_multipart_uploads(Bucket="renders-test").get("Uploads")
+    assert "Contents" not in s3_bucket.list_objects_v2(Bucket="renders-test")
+
+
+def test_handler_s3_output_mode(handler, s3_bucket):
+    result = handler.handler({"id": "s3-output", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1,
+        "output_mode": "s3", "cache": "bypass",
+    }})
+
+    assert "error" not in result, result.get("error")
+    assert "video_base64" not in result
+    assert result["video_key"] == "renders/s3-output.mp4"
+    body = s3_bucket.get_object(Bucket="renders-test", Key=result["video_key"])["Body"].read()
+    assert len(body) == result["file_size_bytes"]
+    assert hashlib.sha256(body).hexdigest() == result["video_sha256"]
@@ -0,0 +1,41 @@
+"""Stream encode mode: frames piped into ffmpeg as they render, no frame files."""
+
+
+def _job(job_id, **config):
+    return {"id": job_id, "input": {
+        "template": "test", "resolution": [64, 64], "samples": 2, "fps": 24, "duration": 1,
+        "config": {"encode_mode": "stream", **config},
+    }}
+
+
+def test_stream_mode_pipes_every_frame(handler):
+    result = handler.handler(_job("stream"))
+
+    assert "error" not in result, result.get("error")
+    assert (result["frames_rendered"], result["frames_reused"]) == (24, 0)
+    # The stub ffmpeg writes BENCH_ENCODED_FRAME_BYTES per frame it read from the pipe
+    assert result["file_size_bytes"] == 24 * 1024
+    # The encoder runs at the render's pace: no separate encode fps
+    assert result["encode"]["fps"] is None
+    streamed = [u for u in handler.progress_updates if isinstance(u, dict) and u.get("stage") == "rendering"]
+    assert streamed and streamed[-1]["frames_done"] > 0
+
+
+def test_stream_mode_does_not_reuse_cached_frames(handler):
+    assert handler.handler(_job("frames-first", encode_mode="frames"))["frames_rendered"] == 24
+    # Another frames-mode encode restores every frame from the frame cache...
+    reencoded = handler.handler(_job("frames-again", encode_mode="frames", crf=30))
+    assert (reencoded["frames_rendered"], reencoded["frames_reused"]) == (0, 24)
+
+    # ...but stream mode has no frame files to restore into
+    result = handler.handler(_job("stream-after"))
+
+    assert (result["frames_rendered"], result["frames_reused"]) == (24, 0)
+
+
+def test_stream_mode_encoder_failure(handler, failing_ffmpeg):
+    failing_ffmpeg(".mp4")
+
+    result = handler.handler({**_job("stream-fails"), "input": {**_job("stream-fails")["input"], "cache": "bypass"}})
+
+    assert "FFmpeg encoding failed" in result["error"]
@@ -0,0 +1,83 @@
+import hashlib
+import os
+
+import pytest
+
+from template_cache import TemplateCache
+
+
+def _blend(size):
+    return b"BLENDER-v402" + os.urandom(size - 12)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TemplateCache(str(tmp_path / "template_cache"), max_bytes=250_000)
+
+
+def test_revalidates_with_etag(cache, template_server):
+    template_server.body = _blend(100_000)
+
+    path, info = cache.fetch(template_server.url)
+    assert info["status"] == "miss"
+    assert info["sha256"] == hashlib.sha256(template_server.body).hexdigest()
+
+    cached_path, info = cache.fetch(template_server.url)
+
+    # Answered 304: the same blob, nothing transferred
+    assert template_server.requests[-1]["If-None-Match"] == '"v1"'
+    assert (cached_path, info["status"], info["bytes_saved"]) == (path, "hit", 100_000)
+    assert len(template_server.requests) == 2
+
+
+def test_changed_template_is_downloaded_again(cache, template_server):
+    template_server.body = _blend(100_000)
+    old_path, _ = cache.fetch(template_server.url)
+
+    template_server.body, template_server.etag = _blend(120_000), '"v2"'
+    path, info = cache.fetch(template_server.url)
+
+    assert info["status"] == "miss"
+    assert path != old_path
+    with open(path, "rb") as f:
+        assert f.read() == template_server.body
+
+
+def test_known_sha256_skips_the_request(cache, template_server):
+    template_server.body = _blend(100_000)
+    _, info = cache.fetch(template_server.url)
+
+    _, info = cache.fetch(template_server.base_url + "/same-template.blend", expected_sha256=info["sha256"])
+
+    assert info["status"] == "hit"
+    assert len(template_server.requests) == 1
+
+
+def test_unreachable_origin_serves_stale_copy(cache, template_server):
+    template_server.body = _blend(100_000)
+    path, _ = cache.fetch(template_server.url)
+    template_server.close()
+
+    stale_path, info = cache.fetch(template_server.url)
+
+    assert (stale_path, info["status"]) == (path, "stale")
+
+
+def test_least_recently_used_is_evicted(cache, template_server):
+    paths = {}
+    for name in ("a", "b"):
+        template_server.body, template_server.etag = _blend(100_000), f'"{name}"'
+        paths[name], _ = cache.fetch(f"{template_server.base_url}/{name}.blend")
+    # Revalidating "a" makes "b" the least recently used
+    template_server.etag = '"a"'
+    cache.fetch(f"{template_server.base_url}/a.blend")
+
+    template_server.body, template_server.etag = _blend(100_000), '"c"'
+    paths["c"], _ = cache.fetch(f"{template_server.base_url}/c.blend")
+
+    assert os.path.exists(paths["a"]) and os.path.exists(paths["c"])
+    assert not os.path.exists(paths["b"])
+    assert cache.total_bytes() == 200_000
+    # The evicted URL is a plain miss next time
+    template_server.body, template_server.etag = _blend(100_000), '"b"'
+    assert cache.fetch(f"{template_server.base_url}/b.blend")[1]["status"] == "miss"
@@ -0,0 +1,91 @@
+"""The template registry: manifests, staleness checks and request validation against the scene."""
+
+import json
+
+import pytest
+
+from result_cache import file_hash
+from template_registry import load_registry, validate_request, verify
+
+SCENE = {"frame_start": 1, "frame_end": 250, "fps": 30.0, "resolution": [1920, 1080], "engine": "CYCLES"}
+
+
+@pytest.fixture
+def registry_dir(tmp_path):
+    """manifests/ next to templates/ and scripts/, with paths relative to the manifest as in the image."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "promo.blend").write_bytes(b"BLENDER-v402 promo")
+    manifests = tmp_path / "manifests"
+    manifests.mkdir()
+    (manifests / "promo.json").write_text(json.dumps({
+        "blend": "../templates/promo.blend",
+        "variant_script": "../scripts/promo.py",
+        "scene": SCENE,
+    }))
+    (manifests / "README.txt").write_text("not a manifest")
+    return tmp_path
+
+
+def test_manifests_are_loaded_with_absolute_paths(registry_dir):
+    registry = load_registry(str(registry_dir / "manifests"))
+
+    assert list(registry) == ["promo"]
+    assert registry["promo"]["blend"] == str(registry_dir / "templates" / "promo.blend")
+    assert registry["promo"]["variant_script"] == str(registry_dir / "scripts" / "promo.py")
+
+
+def test_missing_manifest_dir_is_an_empty_registry(tmp_path):
+    assert load_registry(str(tmp_path / "nowhere")) == {}
+
+
+def test_stale_manifest_loses_its_scene(registry_dir):
+    manifest = load_registry(str(registry_dir / "manifests"))["promo"]
+    manifest["sha256"] = file_hash(manifest["blend"])
+    assert verify(manifest) is None and manifest["scene"] == SCENE
+
+    with open(manifest["blend"], "ab") as f:
+        f.write(b" re-exported")
+
+    assert "manifest is stale" in verify(manifest)
+    assert "scene" not in manifest
+    # ...so requests are no longer checked against the old animation
+    assert validate_request(manifest, {"fps": 24}) is None
+
+
+def test_missing_template_raises(registry_dir):
+    manifest = load_registry(str(registry_dir / "manifests"))["promo"]
+    (registry_dir / "templates" / "promo.blend").unlink()
+
+    with pytest.raises(OSError):
+        verify(manifest)
+
+
+@pytest.mark.parametrize("config, error", [
+    ({"fps": 30}, None),
+    ({"fps": 24}, "fps 24 does not match the template's animation (30 fps)"),
+    ({"frame_start": 1, "frame_end": 250}, None),
+    ({"frame_start": 200, "frame_end": 260}, "Frames 200-260 are outside the template's animation (1-250)"),
+    # A duration re-times the animation to frames 1..duration*fps
+    ({"fps": 30, "duration": 2, "frame_start": 1, "frame_end": 60}, None),
+    ({"fps": 30, "duration": 2, "frame_start": 50, "frame_end": 61},
+     "Frames 50-61 are outside the template's animation (1-60)"),
+    ({"shard_count": 250}, None),
+    ({"shard_count": 251}, "shard_count 251 is more than the template's 250 frames"),
+])
+def test_requests_are_checked_against_the_scene(config, error):
+    assert validate_request({"scene": SCENE}, config) == error
+
+
+def test_manifest_without_scene_accepts_anything():
+    assert validate_request({}, {"fps": 24, "frame_start": 1, "frame_end": 10_000}) is None
+
+
+def test_handler_rejects_a_request_before_launching_blender(handler, monkeypatch):
+    manifest = {**handler.TEMPLATES["test"], "scene": SCENE}
+    monkeypatch.setitem(handler.TEMPLATES, "test", manifest)
+
+    result = handler.handler({"id": "bad-fps", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1,
+    }})
+
+    assert result == {"error": "Template test: fps 24 does not match the template's animation (30 fps)"}
@@ -0,0 +1,134 @@
+"""Parameterized templates: parameter validation and the variant cache, built with the stub Blender."""
+
+import json
+import os
+
+import pytest
+
+import template_variants
+from template_variants import VariantCache, resolve_params
+
+# Stands in for scripts/ai_cpu_activation.py: "saves" the parameters it was given
+VARIANT_SCRIPT = """
+import json, sys
+argv = sys.argv[sys.argv.index("--") + 1:]
+params = json.loads(argv[argv.index("--params") + 1])
+if params.get("text") == "fail":
+    sys.exit("bad branding")
+with open(argv[argv.index("--save-as") + 1], "w") as f:
+    json.dump(params, f)
+"""
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    blend = tmp_path / "template.blend"
+    blend.write_bytes(b"BLENDER-v402" + os.urandom(1024))
+    script = tmp_path / "variant.py"
+    script.write_text(VARIANT_SCRIPT)
+    return {
+        "blend": str(blend),
+        "variant_script": str(script),
+        "parameters": {
+            "text": {"type": "text", "default": "Channel", "max_length": 16},
+            "primary": {"type": "color", "default": "#4cc9f0"},
+        },
+    }
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return VariantCache(str(tmp_path / "variants"))
+
+
+@pytest.fixture
+def blender(stub_path):
+    return os.path.join(stub_path, "blender")
+
+
+def test_all_default_params_use_the_shipped_blend(manifest):
+    assert resolve_params(manifest, {}) is None
+    # Colors compare case-insensitively
+    assert resolve_params(manifest, {"text": "Channel", "primary": "#4CC9F0"}) is None
+
+
+def test_params_are_completed_with_defaults(manifest):
+    assert resolve_params(manifest, {"primary": "#FF0000"}) == {"text": "Channel", "primary": "#ff0000"}
+
+
+@pytest.mark.parametrize("params, error", [
+    ({"logo": "x"}, "Unknown template_params ['logo']"),
+    ({"primary": "red"}, "template_params.primary must be a \"#rrggbb\" color"),
+    ({"primary": 0xff0000}, "template_params.primary must be a \"#rrggbb\" color"),
+    ({"text": 42}, "template_params.text must be a string"),
+    ({"text": "x" * 17}, "template_params.text is longer than 16 characters"),
+    ("text", "template_params must be an object"),
+])
+def test_invalid_params_are_rejected(manifest, params, error):
+    with pytest.raises(ValueError, match=error.replace("[", r"\[").replace("]", r"\]")):
+        resolve_params(manifest, params)
+
+
+def test_template_without_parameters(manifest):
+    with pytest.raises(ValueError, match="this template has no parameters"):
+        resolve_params({"blend": manifest["blend"]}, {"text": "x"})
+
+
+def test_variant_is_built_once(manifest, cache, blender):
+    values = resolve_params(manifest, {"text": "Acme"})
+
+    path, miss = cache.get_or_build(manifest, values, blender)
+    again, hit = cache.get_or_build(manifest, values, blender)
+
+    assert (miss["status"], hit["status"]) == ("miss", "hit")
+    assert again == path and "build_seconds" in miss
+    with open(path) as f:
+        assert json.load(f) == {"text": "Acme", "primary": "#4cc9f0"}
+
+
+def test_edited_script_builds_a_new_variant(manifest, cache, blender):
+    values = resolve_params(manifest, {"text": "Acme"})
+    path, _ = cache.get_or_build(manifest, values, blender)
+
+    with open(manifest["variant_script"], "a") as f:
+        f.write("# v2\n")
+    rebuilt, info = cache.get_or_build(manifest, values, blender)
+
+    assert info["status"] == "miss" and rebuilt != path
+
+
+def test_failed_build_leaves_nothing_behind(manifest, cache, blender):
+    with pytest.raises(RuntimeError, match="bad branding"):
+        cache.get_or_build(manifest, resolve_params(manifest, {"text": "fail"}), blender)
+
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_least_recently_used_variants_are_evicted(manifest, cache, blender):
+    first, _ = cache.get_or_build(manifest, resolve_params(manifest, {"text": "one"}), blender)
+    second, _ = cache.get_or_build(manifest, resolve_params(manifest, {"text": "two"}), blender)
+    os.utime(first, (0, 0))
+    os.utime(second, (1, 1))
+    cache.get_or_build(manifest, resolve_params(manifest, {"text": "one"}), blender)
+    # Room for two variants only
+    cache.max_bytes = os.path.getsize(first) + os.path.getsize(second)
+
+    third, _ = cache.get_or_build(manifest, resolve_params(manifest, {"text": "six"}), blender)
+
+    assert os.path.exists(first) and os.path.exists(third)
+    assert not os.path.exists(second)
+
+
+def test_handler_renders_the_variant(handler, manifest, cache, monkeypatch):
+    monkeypatch.setattr(template_variants, "_cache", cache)
+    monkeypatch.setitem(handler.TEMPLATES, "test", manifest)
+    job_input = {"template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1,
+                 "template_params": {"text": "Acme"}}
+
+    first = handler.handler({"id": "variant-1", "input": {**job_input, "cache": "bypass"}})
+    second = handler.handler({"id": "variant-2", "input": {**job_input, "cache": "bypass"}})
+    invalid = handler.handler({"id": "variant-3", "input": {**job_input, "template_params": {"primary": "red"}}})
+
+    assert "error" not in first, first.get("error")
+    assert (first["template_cache"]["status"], second["template_cache"]["status"]) == ("miss", "hit")
+    assert invalid["error"].startswith("Template test: template_params.primary")
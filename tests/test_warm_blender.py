@@ -0,0 +1,83 @@
+"""The warm Blender server: blender_server.py running under the stub Blender, driven by the handler."""
+
+import os
+
+import pytest
+
+from conftest import REPO_DIR
+
+
+@pytest.fixture
+def warm(handler, tmp_path, monkeypatch):
+    """handler.py with BLENDER_WARM on and its server on a socket in tmp_path."""
+    import warm_blender
+
+    monkeypatch.setattr(warm_blender, "SERVER_SCRIPT", os.path.join(REPO_DIR, "blender_server.py"))
+    monkeypatch.setattr(handler, "BLENDER_WARM", True)
+    server = warm_blender.WarmBlender(handler.blender_command(), socket_path=str(tmp_path / "blender.sock"))
+    monkeypatch.setattr(handler, "_warm_blender", server)
+    yield server
+    server.stop()
+
+
+def _job(job_id, samples=2):
+    return {"id": job_id, "input": {
+        "template": "test", "resolution": [64, 64], "samples": samples, "fps": 24, "duration": 1,
+        "cache": "bypass",
+    }}
+
+
+def test_jobs_share_one_blender_process(handler, warm):
+    first = handler.handler(_job("warm-1"))
+    proc = warm.proc
+    second = handler.handler(_job("warm-2", samples=4))
+
+    assert "error" not in first and "error" not in second, first.get("error") or second.get("error")
+    assert first["warm_blender"] and second["warm_blender"]
+    assert warm.proc is proc and warm.alive()
+    assert first["frames_rendered"] == second["frames_rendered"] == 24
+
+
+def test_dead_server_is_restarted(handler, warm):
+    handler.handler(_job("before-crash"))
+    crashed = warm.proc
+    crashed.kill()
+    crashed.wait()
+
+    result = handler.handler(_job("after-crash"))
+
+    assert result["warm_blender"] and result["frames_rendered"] == 24
+    assert warm.proc is not crashed
+
+
+def test_unusable_server_falls_back_to_a_launch_per_job(handler, warm, monkeypatch):
+    import warm_blender
+
+    monkeypatch.setattr(warm_blender, "SERVER_SCRIPT", os.path.join(REPO_DIR, "missing_server.py"))
+
+    result = handler.handler(_job("cold"))
+
+    assert "error" not in result, result.get("error")
+    assert result["warm_blender"] is False and result["frames_rendered"] == 24
+
+
+def test_scene_settings_are_restored_between_jobs(render_blend, tmp_path, monkeypatch):
+    import bpy
+    import blender_server
+
+    template = tmp_path / "template.blend"
+    template.write_bytes(b"BLENDER-v402")
+    server = blender_server.RenderServer(str(tmp_path / "unused.sock"))
+    scene = bpy.context.scene
+    monkeypatch.setattr(scene.cycles, "samples", scene.cycles.samples)
+    monkeypatch.setattr(scene.render, "resolution_x", scene.render.resolution_x)
+    samples, width = scene.cycles.samples, scene.render.resolution_x
+
+    assert server.load_template(str(template)) is True
+    # What a job leaves behind...
+    scene.cycles.samples = 7
+    scene.render.resolution_x = 320
+
+    # ...is gone when the next job reuses the loaded template
+    assert server.load_template(str(template)) is False
+    assert (scene.cycles.samples, scene.render.resolution_x) == (samples, width)
@@ -0,0 +1,63 @@
+"""Worker warmup against the stub nvidia-smi and Blender, with and without a GPU."""
+
+import json
+
+import pytest
+
+
+@pytest.fixture
+def fresh_worker(handler, tmp_path, monkeypatch):
+    """A worker that hasn't probed its devices yet."""
+    probe_file = str(tmp_path / "device_probe.json")
+    monkeypatch.setenv("BLENDER_DEVICE_PROBE", probe_file)
+    monkeypatch.setattr(handler, "DEVICE_PROBE_FILE", probe_file)
+    monkeypatch.setattr(handler, "_gpu_name", None)
+    monkeypatch.setattr(handler, "_gpu_memory_mb", None)
+    monkeypatch.setattr(handler, "_warmup_report", None)
+    return handler
+
+
+def test_warmup_probes_once_and_primes(fresh_worker, capfd):
+    report = fresh_worker.warmup()
+
+    assert report["errors"] == []
+    assert report["gpu"] == "NVIDIA GeForce RTX 4090"
+    assert report["device_type"] == "OPTIX"
+    assert {"check_gpu", "templates", "prime_render"} <= set(report["steps"])
+    with open(fresh_worker.DEVICE_PROBE_FILE) as f:
+        assert json.load(f)["device_type"] == "OPTIX"
+    assert "Trying OPTIX" in capfd.readouterr().out
+
+    # Later launches enable the recorded devices instead of trying every backend
+    result = fresh_worker.handler({"id": "after-warmup", "input": {
+        "template": "test", "resolution": [64, 64], "samples": 1, "fps": 24, "duration": 1, "cache": "bypass",
+    }})
+    out = capfd.readouterr().out
+    assert "error" not in result
+    assert result["worker_warmup"] == report
+    assert "Using cached device probe" in out and "Trying OPTIX" not in out
+    assert fresh_worker._gpu_memory_mb == 24564
+
+
+def test_warmup_on_cpu_only_worker_is_not_fatal(fresh_worker, monkeypatch):
+    monkeypatch.setenv("BENCH_GPU", "0")
+
+    report = fresh_worker.warmup()
+
+    assert report["gpu"] is None
+    assert report["device_type"] is None
+    assert len(report["errors"]) == 1 and report["errors"][0].startswith("Warmup render failed")
+    assert "No GPU found" in report["errors"][0]
+    assert fresh_worker.check_gpu() is False
+
+
+def test_stale_device_probe_falls_back_to_probing(fresh_worker, monkeypatch, capfd):
+    with open(fresh_worker.DEVICE_PROBE_FILE, "w") as f:
+        json.dump({"device_type": "OPTIX", "devices": [], "blender_version": "4.2.0"}, f)
+    monkeypatch.setenv("BENCH_GPU", "0")
+
+    fresh_worker.warmup()
+
+    out = capfd.readouterr().out
+    assert "Cached device probe unusable" in out
+    assert "Trying OPTIX" in out
@@ -0,0 +1,120 @@
+"""
+Handler-side management of the long-lived Blender render server.
+
+WarmBlender starts blender_server.py once (under xvfb-run) and sends it render
+requests over a Unix socket, so repeated jobs skip Xvfb startup, Blender init,
+Cycles device enumeration and - for the same template - the .blend parse.
+If the server dies or times out it is killed and restarted on next use.
+
+The server's output is read by a background thread and echoed to the worker
+log; while a render is running each line is also handed to that render's
+on_line callback (progress parsing, log tail).
+"""
+
+import json
+import os
+import socket
+import subprocess
+import threading
+import time
+
+WARM_SOCKET = os.environ.get("BLENDER_WARM_SOCKET", "/tmp/blender_render.sock")
+SERVER_SCRIPT = os.environ.get("BLENDER_SERVER_SCRIPT", "/workspace/blender_server.py")
+STARTUP_TIMEOUT = 180
+
+
+class WarmBlender:
+    """Client for one blender_server.py process."""
+
+    def __init__(self, blender_cmd: list, socket_path: str = WARM_SOCKET):
+        """
+        Args:
+            blender_cmd: Command prefix that launches Blender (e.g. xvfb-run ... blender)
+            socket_path: Unix socket the server listens on
+        """
+        self.blender_cmd = blender_cmd
+        self.socket_path = socket_path
+        self.proc = None
+        self.on_line = None
+
+    def alive(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    def start(self):
+        """Launch the server and wait until it answers a ping."""
+        if self.alive():
+            return
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        cmd = [*self.blender_cmd, "--background", "--python", SERVER_SCRIPT, "--", "--socket", self.socket_path]
+        print(f"Starting warm Blender: {' '.join(cmd)}")
+        start_time = time.time()
+        self.proc = subprocess.Popen(
+            cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors="replace", bufsize=1
+        )
+        threading.Thread(target=self._read_output, args=(self.proc,), daemon=True).start()
+
+        while time.time() - start_time < STARTUP_TIMEOUT:
+            if not self.alive():
+                raise Exception(f"Warm Blender exited during startup (code {self.proc.returncode})")
+            if os.path.exists(self.socket_path):
+                try:
+                    self.request({"cmd": "ping"}, timeout=5)
+                    print(f"Warm Blender ready in {time.time() - start_time:.1f}s")
+                    return
+                except OSError:
+                    pass
+            time.sleep(0.2)
+
+        self.stop()
+        raise Exception(f"Warm Blender did not start within {STARTUP_TIMEOUT}s")
+
+    def _read_output(self, proc):
+        for line in proc.stdout:
+            on_line = self.on_line
+            if on_line:
+                on_line(line)
+            else:
+                print(line, end="")
+
+    def request(self, payload: dict, timeout: float) -> dict:
+        """Send one request and wait for its response."""
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(self.socket_path)
+            with sock.makefile("rwb") as stream:
+                stream.write(json.dumps(payload).encode() + b"\n")
+                stream.flush()
+                line = stream.readline()
+        if not line:
+            raise ConnectionError("Warm Blender closed the connection")
+        return json.loads(line)
+
+    def render(self, template_path: str, argv: list, timeout: float, on_line=None) -> dict:
+        """
+        Render template_path with render_blend.py arguments argv.
+
+        on_line, if given, receives every line the server prints during the render.
+        Raises OSError/ConnectionError if the server is unusable; the server is
+        stopped in that case so the next start() brings up a fresh one.
+        """
+        self.on_line = on_line
+        try:
+            return self.request({"cmd": "render", "template": template_path, "argv": argv}, timeout)
+        except (OSError, ValueError):
+            # Timed out mid-render or crashed - a stuck Blender can't be reused
+            self.stop()
+            raise
+        finally:
+            self.on_line = None
+
+    def stop(self):
+        if self.proc is None:
+            return
+        if self.alive():
+            self.proc.kill()
+        self.proc.wait()
+        self.proc = None
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)